@@ -7,17 +7,25 @@ https://github.com/ludeeus/xpeng
 
 from __future__ import annotations
 
-from datetime import timedelta
-from typing import TYPE_CHECKING
+import time
+from typing import TYPE_CHECKING, Any
 
 from homeassistant.const import CONF_CLIENT_ID, CONF_CLIENT_SECRET, Platform
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.importlib import async_import_module
 from homeassistant.loader import async_get_loaded_integration
 
-from .api import XpengApiClient
-from .const import DOMAIN, LOGGER
-from .coordinator import XpengDataUpdateCoordinator
+from .const import (
+    CONF_PRICE_ENTITY,
+    CONF_SMART_CHARGING,
+    CONF_USER_ID,
+    LOGGER,
+    SIGNAL_OPTIONS_UPDATED,
+)
 from .data import XpengData
+from .estimator import XpengChargeCurves
+from .shared import async_get_registry, token_store
+from .snapshot import XpengFleetSnapshot
 
 if TYPE_CHECKING:
     from homeassistant.core import HomeAssistant
@@ -28,7 +36,7 @@ PLATFORMS: list[Platform] = [
     Platform.SENSOR,
     Platform.DEVICE_TRACKER,
     Platform.BINARY_SENSOR,
-    # Platform.SWITCH,
+    Platform.SWITCH,
 ]
 
 
@@ -38,28 +46,37 @@ async def async_setup_entry(
     entry: XpengConfigEntry,
 ) -> bool:
     """Set up this integration using UI."""
-    coordinator = XpengDataUpdateCoordinator(
-        hass=hass,
-        logger=LOGGER,
-        name=DOMAIN,
-        update_interval=timedelta(minutes=1),
-    )
+    start = time.perf_counter()
+    registry = async_get_registry(hass)
+    account = await registry.async_subscribe(entry)
+    subscribed = time.perf_counter()
+    entry.async_on_unload(lambda: registry.async_unsubscribe(entry))
     entry.runtime_data = XpengData(
-        client=XpengApiClient(
-            client_id=entry.data[CONF_CLIENT_ID],
-            client_secret=entry.data[CONF_CLIENT_SECRET],
-            session=async_get_clientsession(hass),
-        ),
+        client=account.client,
+        coordinator=account.coordinator,
         integration=async_get_loaded_integration(hass, entry.domain),
-        coordinator=coordinator,
+        user_id=entry.data.get(CONF_USER_ID) or None,
+        setup_data=_setup_data(entry),
     )
-
-    await entry.runtime_data.client.async_get_token()
-    # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
-    await coordinator.async_config_entry_first_refresh()
+    # Vehicles unlinked while Home Assistant was not running.
+    account.coordinator.async_remove_stale_devices(account.coordinator.data)
+    if _plans_charging(entry):
+        # Only entries that plan charging pay for importing numpy.
+        smart_charging = await async_import_module(hass, f"{__name__}.smart_charging")
+        entry.runtime_data.planner = smart_charging.XpengChargePlanner(entry)
+        entry.async_on_unload(entry.runtime_data.planner.async_start())
+    planned = time.perf_counter()
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
+    LOGGER.debug(
+        "Set up %s in %.3f s: account %.3f s, planner %.3f s, platforms %.3f s",
+        entry.title,
+        time.perf_counter() - start,
+        subscribed - start,
+        planned - subscribed,
+        time.perf_counter() - planned,
+    )
 
     return True
 
@@ -72,10 +89,66 @@ async def async_unload_entry(
     return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
 
+async def async_remove_entry(
+    hass: HomeAssistant,
+    entry: XpengConfigEntry,
+) -> None:
+    """Remove data persisted for an entry that was deleted."""
+    client_id = entry.data[CONF_CLIENT_ID]
+    if not async_get_registry(hass).is_in_use(client_id):
+        await token_store(hass, client_id).async_remove()
+        await XpengFleetSnapshot(hass, client_id).async_remove()
+        await XpengChargeCurves(hass, client_id).async_remove()
+
+
+def _setup_data(entry: XpengConfigEntry) -> dict[str, Any]:
+    """
+    Return the entry data the entry is set up with.
+
+    The webhook id and secret are left out, the entry writes them itself.
+    """
+    return {
+        key: entry.data.get(key)
+        for key in (CONF_CLIENT_ID, CONF_CLIENT_SECRET, CONF_USER_ID)
+    }
+
+
+def _plans_charging(entry: XpengConfigEntry) -> bool:
+    """Return whether an entry has a price sensor to plan charging on."""
+    return bool(entry.options.get(CONF_SMART_CHARGING, {}).get(CONF_PRICE_ENTITY))
+
+
+async def async_update_options(
+    hass: HomeAssistant,
+    entry: XpengConfigEntry,
+) -> None:
+    """
+    Apply changed options to the running entry, reloading only when needed.
+
+    The write filters of the entities and the charging planner take new
+    options in place, so the shared client, the fleet and the entities stay
+    up. Changed credentials, or turning smart charging on or off, which adds
+    or removes entities, still take a reload.
+    """
+    runtime_data = entry.runtime_data
+    if _setup_data(entry) != runtime_data.setup_data or _plans_charging(entry) != (
+        runtime_data.planner is not None
+    ):
+        await async_reload_entry(hass, entry)
+        return
+    if runtime_data.planner is not None:
+        runtime_data.planner.async_update_options()
+    async_dispatcher_send(
+        hass, SIGNAL_OPTIONS_UPDATED.format(entry.entry_id), entry.options
+    )
+    LOGGER.debug("Applied the options of %s without reloading", entry.title)
+
+
 async def async_reload_entry(
     hass: HomeAssistant,
     entry: XpengConfigEntry,
 ) -> None:
     """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    # Go through the config entry manager so on-unload callbacks such as the
+    # webhook registration are released before setting up again.
+    await hass.config_entries.async_reload(entry.entry_id)
@@ -0,0 +1,151 @@
+"""Queue of charge actions sent to vehicles."""
+
+from __future__ import annotations
+
+import asyncio
+from enum import StrEnum
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import callback
+
+from .api import XpengApiClientError
+from .const import LOGGER
+from .ratelimit import RequestPriority, request_priority
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from homeassistant.core import CALLBACK_TYPE
+
+    from .coordinator import XpengDataUpdateCoordinator
+    from .enode_models import Action
+
+# Actions running at the same time per account, the rest wait their turn.
+ACTION_CONCURRENCY = 4
+ACTION_POLL_INITIAL = 2.0
+ACTION_POLL_MAX = 30.0
+# Stop following an action the vehicle has not confirmed after this long.
+ACTION_TIMEOUT = 300.0
+
+
+class ActionKind(StrEnum):
+    """What a queued action changes on the vehicle."""
+
+    CHARGING = "charging"
+
+
+class XpengActionQueue:
+    """
+    Send charge actions, collapsing rapid requests into the latest one.
+
+    Requests for the same vehicle and kind replace each other while they
+    wait, so a burst of toggles costs at most one action in flight and one
+    for the state asked for last. Only ACTION_CONCURRENCY actions run per
+    account, and each is followed with backoff until the vehicle confirms
+    it. The vehicle alone is then refreshed.
+    """
+
+    def __init__(
+        self,
+        coordinator: XpengDataUpdateCoordinator,
+        concurrency: int = ACTION_CONCURRENCY,
+    ) -> None:
+        """Create an empty queue for the vehicles of a coordinator."""
+        self._coordinator = coordinator
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._desired: dict[tuple[str, ActionKind], Any] = {}
+        self._workers: dict[tuple[str, ActionKind], asyncio.Task] = {}
+        self._listeners: dict[str, list[CALLBACK_TYPE]] = {}
+
+    def desired(self, vehicle_id: str, kind: ActionKind) -> Any | None:
+        """Return the value waiting to be sent or being sent, if any."""
+        return self._desired.get((vehicle_id, kind))
+
+    @callback
+    def async_request(self, vehicle_id: str, kind: ActionKind, value: Any) -> None:
+        """Ask for a new value, replacing a request that has not been sent."""
+        key = (vehicle_id, kind)
+        self._desired[key] = value
+        if key not in self._workers:
+            self._workers[key] = self._coordinator.hass.async_create_background_task(
+                self._async_run(key), f"xpeng {kind} action for {vehicle_id}"
+            )
+
+    @callback
+    def async_subscribe(
+        self, vehicle_id: str, update_callback: CALLBACK_TYPE
+    ) -> Callable[[], None]:
+        """Call back when the actions of a vehicle have finished."""
+        listeners = self._listeners.setdefault(vehicle_id, [])
+        listeners.append(update_callback)
+
+        @callback
+        def _unsubscribe() -> None:
+            listeners.remove(update_callback)
+
+        return _unsubscribe
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop every request and stop the running actions."""
+        self._desired.clear()
+        for task in self._workers.values():
+            task.cancel()
+
+    async def _async_run(self, key: tuple[str, ActionKind]) -> None:
+        """Send the latest value for a vehicle until none is left."""
+        vehicle_id, kind = key
+        # Runs in a task of its own, so this only affects its requests.
+        request_priority.set(RequestPriority.USER)
+        try:
+            # Requests made during the refresh start another round.
+            while key in self._desired:
+                async with self._semaphore:
+                    while key in self._desired:
+                        value = self._desired[key]
+                        try:
+                            await self._async_execute(vehicle_id, value)
+                        except XpengApiClientError as exception:
+                            LOGGER.warning(
+                                "Setting %s of %s failed: %s",
+                                kind,
+                                vehicle_id,
+                                exception,
+                            )
+                        if self._desired.get(key) == value:
+                            del self._desired[key]
+                await self._coordinator.async_refresh_vehicle(vehicle_id)
+        finally:
+            del self._workers[key]
+            for update_callback in self._listeners.get(vehicle_id, ()):
+                update_callback()
+
+    async def _async_execute(self, vehicle_id: str, value: Any) -> None:
+        """Send a single action unless the vehicle is already there."""
+        client = self._coordinator.client
+        vehicle = (self._coordinator.data or {}).get(vehicle_id)
+        if vehicle is not None and vehicle.charge_state.is_charging == value:
+            return
+        action = await client.async_set_charging(vehicle_id, start=value)
+        await self._async_follow(action)
+
+    async def _async_follow(self, action: Action) -> None:
+        """Poll an action with backoff until the vehicle settles it."""
+        delay = ACTION_POLL_INITIAL
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ACTION_TIMEOUT
+        while action.is_pending:
+            if loop.time() + delay > deadline:
+                LOGGER.warning("Gave up waiting for action %s", action.id)
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, ACTION_POLL_MAX)
+            action = await self._coordinator.client.async_get_action(action.id)
+        if action.state != "CONFIRMED":
+            LOGGER.warning(
+                "Action %s %s on %s: %s",
+                action.kind,
+                action.state.lower(),
+                action.target_id,
+                action.failure_reason,
+            )
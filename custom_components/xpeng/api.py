@@ -2,19 +2,40 @@
 
 from __future__ import annotations
 
-import datetime
+import asyncio
+import contextlib
 import socket
-from typing import Any
+import time
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
 
 import aiohttp
 import async_timeout
-from aiohttp import BasicAuth
 
-from .const import LOGGER
-from .enode_models import EnodeResponse
+from .auth import XpengTokenManager
+from .const import LOGGER, WEBHOOK_EVENT_VEHICLE_UPDATED
+from .enode_models import Action, Pagination, Vehicle, json_loads
+from .jsonstream import JsonArrayStream
+from .metrics import XpengMetrics
+from .ratelimit import (
+    CircuitOpenError,
+    XpengRequestScheduler,
+    parse_retry_after,
+)
+from .transport import ContentDecodeError, async_iter_body, async_read_body
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable
+
+    from homeassistant.helpers.storage import Store
 
 ENODE_URL = "https://enode-api.production.enode.io"
 ENODE_OAUTH_URL = "https://oauth.production.enode.io"
+DEFAULT_PAGE_SIZE = 50
+MAX_RETRIES = 3
+# Methods sent again when a request failed in a way it may have been carried
+# out, others are only retried when throttled.
+IDEMPOTENT_METHODS = frozenset({"get", "head", "options", "put", "delete"})
 
 
 class XpengApiClientError(Exception):
@@ -33,9 +54,39 @@ class XpengApiClientAuthenticationError(
     """Exception to indicate an authentication error."""
 
 
+class XpengApiClientDecodeError(
+    XpengApiClientError,
+):
+    """Exception to indicate a vehicle that could not be decoded."""
+
+    def __init__(self, vehicle_id: str | None, exception: Exception) -> None:
+        """Remember which vehicle failed to decode."""
+        super().__init__(f"Unable to decode vehicle {vehicle_id} - {exception!r}")
+        self.vehicle_id = vehicle_id
+
+
+class _RetryableResponseError(Exception):
+    """A throttled or failed response that is worth retrying."""
+
+    def __init__(self, status: int, retry_after: float | None) -> None:
+        """Remember the status and how long the server asked us to wait."""
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
 def _verify_response_or_raise(response: aiohttp.ClientResponse) -> None:
     """Verify that the response is valid."""
+    if (
+        response.status == HTTPStatus.TOO_MANY_REQUESTS
+        or response.status >= HTTPStatus.INTERNAL_SERVER_ERROR
+    ):
+        response.release()
+        raise _RetryableResponseError(
+            response.status, parse_retry_after(response.headers)
+        )
     if response.status in (401, 403):
+        response.release()
         msg = "Invalid credentials"
         raise XpengApiClientAuthenticationError(
             msg,
@@ -46,73 +97,297 @@ def _verify_response_or_raise(response: aiohttp.ClientResponse) -> None:
 class XpengApiClient:
     """Sample API Client."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         client_id: str,
         client_secret: str,
         session: aiohttp.ClientSession,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        token_store: Store | None = None,
+        base_url: str = ENODE_URL,
+        oauth_url: str = ENODE_OAUTH_URL,
+        metrics: XpengMetrics | None = None,
+        *,
+        streaming: bool = False,
     ) -> None:
         """Sample API Client."""
-        self._client_id = client_id
-        self._client_secret = client_secret
         self._session = session
-        self._token = None
-        self.vehicles = []
-
-    async def async_get_token(self) -> Any:
-        """Get oauth token."""
-        LOGGER.debug("async_get_token()")
-        auth = BasicAuth(self._client_id, self._client_secret)
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-        }
-        data = {"grant_type": "client_credentials"}
-        async with aiohttp.ClientSession(auth=auth) as session:
-            response = await session.post(
-                f"{ENODE_OAUTH_URL}/oauth2/token", data=data, headers=headers
-            )
-
-            result = await response.json()
-
-        self._token = result["access_token"]
-        self._token_expires = result["expires_in"]
-        self._token_expires_at = datetime.datetime.now(
-            tz=datetime.UTC
-        ) + datetime.timedelta(seconds=self._token_expires)
-
-    async def async_refresh_token(self) -> None:
-        """Refresh oauth token before expiry."""
-        expires_in = self._token_expires_at - datetime.datetime.now(tz=datetime.UTC)
-        if expires_in < datetime.timedelta(seconds=180):
-            LOGGER.debug("Refreshing token, expires in %s", expires_in)
-            await self.async_get_token()
-
-    async def async_get_data(self) -> Any:
+        self._base_url = base_url
+        self._page_size = page_size
+        # Decode vehicle pages while they arrive, see _async_read_stream.
+        self._streaming = streaming
+        self._scheduler = XpengRequestScheduler()
+        # Shared with the transport of the session, when it has one.
+        self.metrics = metrics if metrics is not None else XpengMetrics()
+        self._tokens = XpengTokenManager(
+            f"{oauth_url}/oauth2/token",
+            client_id,
+            client_secret,
+            session,
+            token_store,
+        )
+        self._tokens.fetch_latency = self.metrics.token_latency
+
+    async def async_get_token(self) -> str:
+        """Get oauth token, reusing a valid one when possible."""
+        try:
+            return await self._tokens.async_get_token()
+        except aiohttp.ClientResponseError as exception:
+            if exception.status in (400, 401, 403):
+                msg = "Invalid credentials"
+                raise XpengApiClientAuthenticationError(msg) from exception
+            msg = f"Error fetching token - {exception}"
+            raise XpengApiClientCommunicationError(msg) from exception
+        except (
+            TimeoutError,
+            aiohttp.ClientError,
+            socket.gaierror,
+            ContentDecodeError,
+        ) as exception:
+            msg = f"Error fetching token - {exception}"
+            raise XpengApiClientCommunicationError(msg) from exception
+
+    def shutdown(self) -> None:
+        """Stop background work such as the token refresh."""
+        self._tokens.stop()
+
+    async def async_get_data(
+        self, errors: dict[str, XpengApiClientDecodeError] | None = None
+    ) -> list[Vehicle]:
         """Get data from the API."""
+        return [vehicle async for vehicle in self.async_iter_vehicles(errors)]
+
+    async def async_iter_vehicles(
+        self, errors: dict[str, XpengApiClientDecodeError] | None = None
+    ) -> AsyncIterator[Vehicle]:
+        """
+        Yield every vehicle on the account, following the pagination cursors.
+
+        The next page is downloaded while the current one is being parsed, so
+        at most two raw pages are held in memory regardless of fleet size.
+        When streaming, the vehicles of a page are decoded while it arrives
+        instead. Its pagination follows the vehicles in the body, so the
+        cursor, and with it the next request, is only known once the whole
+        page has arrived and been decoded. Vehicles that fail to decode are
+        collected in errors by vehicle id when it is given, and raise
+        otherwise.
+        """
+        next_page: asyncio.Task | None = asyncio.create_task(
+            self._async_get_vehicle_page(None)
+        )
+        try:
+            while next_page is not None:
+                result = await next_page
+                pagination = Pagination.from_json(result["pagination"])
+                next_page = (
+                    asyncio.create_task(self._async_get_vehicle_page(pagination.after))
+                    if pagination.after
+                    else None
+                )
+                for item in result["data"]:
+                    try:
+                        vehicle = self._as_vehicle(item)
+                    except XpengApiClientDecodeError as exception:
+                        if errors is None or exception.vehicle_id is None:
+                            raise
+                        LOGGER.warning(exception)
+                        errors[exception.vehicle_id] = exception
+                        continue
+                    yield vehicle
+                del result
+        finally:
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await next_page
+
+    async def async_get_vehicle(self, vehicle_id: str) -> Vehicle:
+        """Get a single vehicle from the API."""
+        result = await self._api_wrapper(
+            method="get",
+            url=f"{self._base_url}/vehicles/{vehicle_id}",
+        )
+        return self._decode_vehicle(result)
+
+    async def async_set_charging(self, vehicle_id: str, *, start: bool) -> Action:
+        """Ask a vehicle to start or stop charging."""
+        result = await self._api_wrapper(
+            method="post",
+            url=f"{self._base_url}/vehicles/{vehicle_id}/charging",
+            data={"action": "START" if start else "STOP"},
+        )
+        return Action.from_json(result)
+
+    async def async_get_action(self, action_id: str) -> Action:
+        """Get the current state of a charge action."""
         result = await self._api_wrapper(
             method="get",
-            url=f"{ENODE_URL}/vehicles",
+            url=f"{self._base_url}/vehicles/actions/{action_id}",
         )
+        return Action.from_json(result)
+
+    def _decode_vehicle(self, data: dict[str, Any]) -> Vehicle:
+        """Decode a vehicle, recording how long it took."""
+        start = time.perf_counter()
+        try:
+            vehicle = Vehicle.from_json(data)
+        except (AttributeError, KeyError, TypeError, ValueError) as exception:
+            self.metrics.decode_failures += 1
+            vehicle_id = data.get("id") if isinstance(data, dict) else None
+            raise XpengApiClientDecodeError(vehicle_id, exception) from exception
+        self.metrics.parse_time.observe(time.perf_counter() - start)
+        return vehicle
 
-        enode_response = EnodeResponse.from_json(result)
-        self.vehicles = enode_response.data
-        return self.vehicles
+    def _decode_streamed_vehicle(
+        self, data: dict[str, Any]
+    ) -> Vehicle | XpengApiClientDecodeError:
+        """Decode a vehicle of a streamed page, returning why it failed."""
+        try:
+            return self._decode_vehicle(data)
+        except XpengApiClientDecodeError as exception:
+            return exception
 
-    async def _api_wrapper(
+    def _as_vehicle(self, item: Any) -> Vehicle:
+        """Return a vehicle of a page, decoding it unless it was streamed."""
+        if isinstance(item, dict):
+            return self._decode_vehicle(item)
+        if isinstance(item, XpengApiClientDecodeError):
+            raise item
+        return item
+
+    async def _async_get_vehicle_page(self, after: str | None) -> Any:
+        """Fetch a single page of vehicles starting after the given cursor."""
+        params = {"pageSize": str(self._page_size)}
+        if after is not None:
+            params["after"] = after
+        return await self._api_wrapper(
+            method="get",
+            url=f"{self._base_url}/vehicles",
+            params=params,
+            stream_item=self._decode_streamed_vehicle if self._streaming else None,
+        )
+
+    async def async_upsert_webhook(self, url: str, secret: str) -> str:
+        """Register a webhook for vehicle updates, reusing one for the same url."""
+        result = await self._api_wrapper(
+            method="get",
+            url=f"{self._base_url}/webhooks",
+        )
+        data = {
+            "url": url,
+            "secret": secret,
+            "events": [WEBHOOK_EVENT_VEHICLE_UPDATED],
+        }
+        for webhook in result["data"]:
+            if webhook["url"] == url:
+                LOGGER.debug("Updating existing Enode webhook %s", webhook["id"])
+                await self._api_wrapper(
+                    method="patch",
+                    url=f"{self._base_url}/webhooks/{webhook['id']}",
+                    data=data,
+                )
+                return webhook["id"]
+
+        result = await self._api_wrapper(
+            method="post",
+            url=f"{self._base_url}/webhooks",
+            data=data,
+        )
+        LOGGER.debug("Created Enode webhook %s", result["id"])
+        return result["id"]
+
+    async def async_delete_webhook(self, webhook_id: str) -> None:
+        """Remove a webhook registration from Enode."""
+        await self._api_wrapper(
+            method="delete",
+            url=f"{self._base_url}/webhooks/{webhook_id}",
+        )
+
+    async def _api_wrapper(  # noqa: PLR0913
         self,
         method: str,
         url: str,
         data: dict | None = None,
         headers: dict | None = None,
+        params: dict | None = None,
+        stream_item: Callable[[Any], Any] | None = None,
     ) -> Any:
-        """Get information from the API."""
-        await self.async_refresh_token()
+        """
+        Get information from the API, retrying throttled or failed requests.
+
+        Failed requests that may have been carried out are only sent again
+        for idempotent methods, so an action is not sent twice.
+
+        With stream_item, the elements of data[] are passed through it while
+        the response arrives, see _async_read_stream.
+        """
+        token = await self.async_get_token()
         if headers is None:
             headers = {}
-        if "Authorization" in headers:
-            headers.pop("Authorization")
-        headers["Authorization"] = f"Bearer {self._token}"
+        headers["Authorization"] = f"Bearer {token}"
+
+        idempotent = method.lower() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            trial = False
+            try:
+                # Priority comes from the request_priority context variable.
+                trial = await self._scheduler.async_acquire()
+                result = await self._async_request(
+                    method, url, data, headers, params, stream_item
+                )
+            except CircuitOpenError as exception:
+                raise XpengApiClientCommunicationError(str(exception)) from exception
+            except _RetryableResponseError as exception:
+                self._record_failure()
+                if exception.retry_after is not None:
+                    self._scheduler.pause(exception.retry_after)
+                throttled = exception.status == HTTPStatus.TOO_MANY_REQUESTS
+                if attempt == MAX_RETRIES or not (throttled or idempotent):
+                    msg = f"Error fetching information - {exception}"
+                    raise XpengApiClientCommunicationError(msg) from exception
+                retry_after = exception.retry_after
+            except XpengApiClientCommunicationError:
+                self._record_failure()
+                if attempt == MAX_RETRIES or not idempotent:
+                    raise
+                retry_after = None
+            except XpengApiClientError:
+                # The API answered, a client error says nothing about its health.
+                self._scheduler.record_success()
+                raise
+            else:
+                self._scheduler.record_success()
+                return result
+            finally:
+                if trial:
+                    # Cancelled, or settled above, either way the next
+                    # request may try the circuit.
+                    self._scheduler.release_trial()
+
+            delay = self._scheduler.backoff(attempt, retry_after)
+            LOGGER.debug("Retrying %s %s in %.1f s", method, url, delay)
+            self.metrics.retries += 1
+            await asyncio.sleep(delay)
+            attempt += 1
 
+    def _record_failure(self) -> None:
+        """Count a failed request attempt."""
+        self.metrics.failures += 1
+        self._scheduler.record_failure()
+
+    async def _async_request(  # noqa: PLR0913
+        self,
+        method: str,
+        url: str,
+        data: dict | None,
+        headers: dict,
+        params: dict | None,
+        stream_item: Callable[[Any], Any] | None,
+    ) -> Any:
+        """Perform a single request and decode its response."""
+        self.metrics.requests += 1
+        start = time.perf_counter()
         try:
             async with async_timeout.timeout(10):
                 response = await self._session.request(
@@ -120,16 +395,38 @@ class XpengApiClient:
                     url=url,
                     headers=headers,
                     json=data,
+                    params=params,
                 )
+                self._scheduler.update_from_headers(response.headers)
                 _verify_response_or_raise(response)
-                return await response.json()
+                if response.status == HTTPStatus.NO_CONTENT:
+                    self.metrics.record_response(time.perf_counter() - start, 0, 0)
+                    return None
+                if stream_item is not None:
+                    return await self._async_read_stream(response, start, stream_item)
+                wire_size, body = await async_read_body(self._session, response)
+                self.metrics.record_response(
+                    time.perf_counter() - start, len(body), wire_size
+                )
+                return json_loads(body)
 
+        except _RetryableResponseError:
+            raise
+        except XpengApiClientAuthenticationError:
+            raise
+        except aiohttp.ClientResponseError as exception:
+            # Other client errors will not go away by retrying.
+            msg = f"Unexpected response - {exception}"
+            raise XpengApiClientError(
+                msg,
+            ) from exception
         except TimeoutError as exception:
+            self.metrics.timeouts += 1
             msg = f"Timeout error fetching information - {exception}"
             raise XpengApiClientCommunicationError(
                 msg,
             ) from exception
-        except (aiohttp.ClientError, socket.gaierror) as exception:
+        except (aiohttp.ClientError, socket.gaierror, ContentDecodeError) as exception:
             msg = f"Error fetching information - {exception}"
             raise XpengApiClientCommunicationError(
                 msg,
@@ -139,3 +436,26 @@ class XpengApiClient:
             raise XpengApiClientError(
                 msg,
             ) from exception
+
+    async def _async_read_stream(
+        self,
+        response: aiohttp.ClientResponse,
+        start: float,
+        stream_item: Callable[[Any], Any],
+    ) -> dict[str, Any]:
+        """
+        Decode a response with a data[] array while it arrives.
+
+        Every element is passed through stream_item as soon as it is complete,
+        so neither the whole body nor a dict tree of all elements is held.
+        """
+        stream = JsonArrayStream("data")
+        items = []
+        size = wire_size = 0
+        async for chunk_wire_size, chunk in async_iter_body(self._session, response):
+            wire_size += chunk_wire_size
+            size += len(chunk)
+            items.extend(map(stream_item, stream.feed(chunk)))
+        items.extend(map(stream_item, stream.finish()))
+        self.metrics.record_response(time.perf_counter() - start, size, wire_size)
+        return {**stream.members, "data": items}
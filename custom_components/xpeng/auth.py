@@ -0,0 +1,178 @@
+"""OAuth token management for the Xpeng API client."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import time
+from typing import TYPE_CHECKING, Any
+
+import async_timeout
+from aiohttp import BasicAuth
+
+from .const import LOGGER
+from .enode_models import json_loads
+from .transport import async_read_body
+
+if TYPE_CHECKING:
+    import aiohttp
+    from homeassistant.helpers.storage import Store
+
+    from .metrics import Histogram
+
+# Refresh this long before the token expires, so requests never wait on it.
+REFRESH_MARGIN = datetime.timedelta(seconds=180)
+# Retry delay for a failed background refresh while the old token is valid.
+REFRESH_RETRY = datetime.timedelta(seconds=30)
+
+
+class XpengTokenManager:
+    """
+    Hand out client credentials tokens and keep them fresh.
+
+    Concurrent callers share a single in-flight token request, the token is
+    refreshed in the background ahead of expiry, and it is persisted in the
+    optional store so a restart can reuse it without an OAuth round-trip.
+    """
+
+    def __init__(
+        self,
+        token_url: str,
+        client_id: str,
+        client_secret: str,
+        session: aiohttp.ClientSession,
+        store: Store | None = None,
+    ) -> None:
+        """Create a token manager for the given client credentials."""
+        self._token_url = token_url
+        self._auth = BasicAuth(client_id, client_secret)
+        self._session = session
+        self._store = store
+        self._store_loaded = store is None
+        self._loading: asyncio.Task | None = None
+        self._token: str | None = None
+        self._token_expires_at: datetime.datetime | None = None
+        self._inflight: asyncio.Task | None = None
+        self._refresh_handle: asyncio.TimerHandle | None = None
+        self._background: asyncio.Task | None = None
+        # Records the duration of every successful token request when set.
+        self.fetch_latency: Histogram | None = None
+
+    @property
+    def token_valid(self) -> bool:
+        """Return whether the current token can still be used."""
+        return (
+            self._token is not None
+            and self._token_expires_at is not None
+            and self._token_expires_at > _now()
+        )
+
+    async def async_get_token(self) -> str:
+        """Return a valid token, fetching one only when needed."""
+        if not self._store_loaded:
+            # Concurrent callers share the load, so none of them fetches a
+            # token before the stored one was looked at.
+            if self._loading is None:
+                self._loading = asyncio.create_task(self._async_load())
+                self._loading.add_done_callback(self._clear_loading)
+            await asyncio.shield(self._loading)
+        if not self.token_valid:
+            await self.async_refresh()
+        return self._token
+
+    async def async_refresh(self) -> None:
+        """Fetch a new token, joining a fetch that is already in flight."""
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._async_fetch())
+            self._inflight.add_done_callback(self._clear_inflight)
+        await asyncio.shield(self._inflight)
+
+    def stop(self) -> None:
+        """Cancel the scheduled background refresh."""
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+        for task in (self._loading, self._inflight, self._background):
+            if task is not None:
+                task.cancel()
+
+    async def _async_fetch(self) -> None:
+        """Request a token from the OAuth endpoint."""
+        LOGGER.debug("Fetching oauth token")
+        start = time.perf_counter()
+        async with async_timeout.timeout(10):
+            response = await self._session.post(
+                self._token_url,
+                data={"grant_type": "client_credentials"},
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                auth=self._auth,
+            )
+            response.raise_for_status()
+            _, body = await async_read_body(self._session, response)
+            result = json_loads(body)
+        if self.fetch_latency is not None:
+            self.fetch_latency.observe(time.perf_counter() - start)
+        self._set_token(
+            result["access_token"],
+            _now() + datetime.timedelta(seconds=result["expires_in"]),
+        )
+        if self._store is not None:
+            await self._store.async_save(
+                {
+                    "access_token": self._token,
+                    "expires_at": self._token_expires_at.isoformat(),
+                }
+            )
+
+    async def _async_load(self) -> None:
+        """Restore a persisted token, if it has not expired yet."""
+        data: dict[str, Any] | None = await self._store.async_load()
+        self._store_loaded = True
+        if not data:
+            return
+        expires_at = datetime.datetime.fromisoformat(data["expires_at"])
+        if expires_at > _now():
+            LOGGER.debug("Reusing stored oauth token valid until %s", expires_at)
+            self._set_token(data["access_token"], expires_at)
+
+    def _set_token(self, token: str, expires_at: datetime.datetime) -> None:
+        """Store the token and schedule its background refresh."""
+        self._token = token
+        self._token_expires_at = expires_at
+        self._schedule_refresh(expires_at - REFRESH_MARGIN - _now())
+
+    def _schedule_refresh(self, delay: datetime.timedelta) -> None:
+        """Run a background refresh after the given delay."""
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+        self._refresh_handle = asyncio.get_running_loop().call_later(
+            max(delay.total_seconds(), 0), self._start_background_refresh
+        )
+
+    def _start_background_refresh(self) -> None:
+        """Kick off a refresh from the timer."""
+        self._refresh_handle = None
+        self._background = asyncio.create_task(self._async_background_refresh())
+
+    async def _async_background_refresh(self) -> None:
+        """Refresh ahead of expiry, retrying while the old token is valid."""
+        try:
+            await self.async_refresh()
+        except Exception as exception:  # noqa: BLE001
+            LOGGER.warning("Background token refresh failed: %s", exception)
+            if self.token_valid:
+                self._schedule_refresh(REFRESH_RETRY)
+
+    def _clear_loading(self, _task: asyncio.Task) -> None:
+        """Forget a finished load, a failed one is tried again."""
+        self._loading = None
+
+    def _clear_inflight(self, task: asyncio.Task) -> None:
+        """Forget a finished token request."""
+        if self._inflight is task:
+            self._inflight = None
+
+
+def _now() -> datetime.datetime:
+    """Return the current time in UTC."""
+    return datetime.datetime.now(tz=datetime.UTC)
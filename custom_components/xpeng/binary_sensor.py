@@ -1,18 +1,61 @@
 """Xpeng binary sensors."""
 
-import logging
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
     BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.core import callback
+
+from .entity import (
+    XpengEntity,
+    XpengEntityDescription,
+    async_add_vehicle_entities,
+    described,
 )
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .data import XpengConfigEntry
-from .entity import XpengEntity
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-_LOGGER = logging.getLogger(__name__)
+    from .data import XpengConfigEntry
+    from .enode_models import Vehicle
+
+
+@dataclass(frozen=True, kw_only=True)
+class XpengBinarySensorEntityDescription(
+    BinarySensorEntityDescription, XpengEntityDescription
+):
+    """Describes a binary sensor of a vehicle."""
+
+    is_on_fn: Callable[[Vehicle], bool]
+
+
+BINARY_SENSORS = (
+    XpengBinarySensorEntityDescription(
+        key="charging",
+        name="charging",
+        icon="mdi:ev-station",
+        device_class=BinarySensorDeviceClass.BATTERY_CHARGING,
+        watched_fields=("charge_state.is_charging",),
+        is_on_fn=lambda vehicle: vehicle.charge_state.is_charging,
+    ),
+    XpengBinarySensorEntityDescription(
+        key="plugged_in",
+        name="plugged in",
+        icon="mdi:ev-station",
+        device_class=BinarySensorDeviceClass.PLUG,
+        watched_fields=("charge_state.is_plugged_in",),
+        is_on_fn=lambda vehicle: vehicle.charge_state.is_plugged_in,
+    ),
+)
 
 
 async def async_setup_entry(
@@ -21,36 +64,20 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the sensor platform."""
-    entities = []
-    for vehicle_id, vehicle in enumerate(entry.runtime_data.client.vehicles):
-        _LOGGER.debug("Setting up binary sensors for %s", vehicle)
-        entities.append(XpengCarCharging(vehicle_id, entry.runtime_data.coordinator))
-        entities.append(XpengCarPluggedIn(vehicle_id, entry.runtime_data.coordinator))
-
-    async_add_entities(entities, update_before_add=True)
-
-
-class XpengCarCharging(XpengEntity, BinarySensorEntity):
-    """Representation of Xpeng car charging binary sensor."""
-
-    entity_name = "charging"
-    _attr_icon = "mdi:ev-station"
-    _attr_device_class = BinarySensorDeviceClass.BATTERY_CHARGING
-
-    @property
-    def is_on(self) -> bool:
-        """Return the state of the binary sensor."""
-        return self.vehicle.charge_state.is_charging
+    async_add_vehicle_entities(
+        entry,
+        async_add_entities,
+        described(XpengCarBinarySensor, BINARY_SENSORS),
+    )
 
 
-class XpengCarPluggedIn(XpengEntity, BinarySensorEntity):
-    """Representation of Xpeng car charging binary sensor."""
+class XpengCarBinarySensor(XpengEntity, BinarySensorEntity):
+    """Representation of a Xpeng car binary sensor."""
 
-    entity_name = "plugged in"
-    _attr_icon = "mdi:ev-station"
-    _attr_device_class = BinarySensorDeviceClass.PLUG
+    entity_description: XpengBinarySensorEntityDescription
 
-    @property
-    def is_on(self) -> bool:
-        """Return the state of the binary sensor."""
-        return self.vehicle.charge_state.is_plugged_in
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Compute the state from the vehicle data."""
+        super()._async_update_attrs()
+        self._attr_is_on = self.entity_description.is_on_fn(self.vehicle)
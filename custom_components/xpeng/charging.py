@@ -0,0 +1,163 @@
+"""Charging session detection and energy integration."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from .enode_models import format_datetime, parse_datetime
+from .ringbuffer import RingBuffer
+
+if TYPE_CHECKING:
+    from datetime import datetime, timedelta
+
+    from .enode_models import ChargeState
+
+# Recent samples kept per vehicle, the oldest are overwritten first.
+SAMPLE_BUFFER_SIZE = 256
+# Do not integrate across gaps longer than this, in seconds.
+MAX_SAMPLE_GAP = 7200.0
+
+
+@dataclass(slots=True, frozen=True)
+class ChargingSession:
+    """Summary of a finished charging session."""
+
+    started: datetime
+    ended: datetime
+    energy: float
+    soc_start: int
+    soc_end: int
+    peak_power: float
+
+    @property
+    def duration(self) -> timedelta:
+        """Return the time from the first charging sample until unplugging."""
+        return self.ended - self.started
+
+    @property
+    def soc_delta(self) -> int:
+        """Return the battery level gained during the session."""
+        return self.soc_end - self.soc_start
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the summary as state attributes or event data."""
+        return {
+            "started": format_datetime(self.started),
+            "ended": format_datetime(self.ended),
+            "energy_kwh": round(self.energy, 3),
+            "duration_s": int(self.duration.total_seconds()),
+            "soc_start": self.soc_start,
+            "soc_end": self.soc_end,
+            "soc_delta": self.soc_delta,
+            "peak_power_kw": self.peak_power,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ChargingSession:
+        """Create a summary from the output of as_dict."""
+        return cls(
+            started=parse_datetime(data["started"]),
+            ended=parse_datetime(data["ended"]),
+            energy=data["energy_kwh"],
+            soc_start=data["soc_start"],
+            soc_end=data["soc_end"],
+            peak_power=data["peak_power_kw"],
+        )
+
+
+class ChargingSessionTracker:
+    """
+    Integrate the charge rate of one vehicle into energy counters.
+
+    A session starts with the first charging sample and ends when the
+    vehicle is unplugged, so pauses while plugged in stay in one session.
+    Energy is integrated with the trapezoid rule over the data timestamps,
+    and memory stays constant however long a session runs.
+    """
+
+    def __init__(self, capacity: int = SAMPLE_BUFFER_SIZE) -> None:
+        """Create a tracker without a session in progress."""
+        # Energy charged over the lifetime of the tracker, in kWh.
+        self.total_energy = 0.0
+        self.last_session: ChargingSession | None = None
+        # Rows of (timestamp, power in kW).
+        self._samples = RingBuffer(2, capacity)
+        self._started: datetime | None = None
+        self._soc_start = 0
+        self._energy = 0.0
+        self._peak_power = 0.0
+
+    @property
+    def in_session(self) -> bool:
+        """Return whether a charging session is in progress."""
+        return self._started is not None
+
+    def update(self, charge_state: ChargeState) -> ChargingSession | None:
+        """Add a charge state sample, returning the session it finished."""
+        timestamp = charge_state.last_updated
+        if timestamp is None:
+            return None
+        seconds = timestamp.timestamp()
+        previous = self._samples.last()
+        if previous is not None and seconds <= previous[0]:
+            # Already seen, or older than what we have.
+            return None
+
+        power = (charge_state.charge_rate or 0.0) if charge_state.is_charging else 0.0
+        if self._started is None:
+            if not charge_state.is_charging:
+                return None
+            self._started = timestamp
+            self._soc_start = charge_state.battery_level
+            self._energy = self._peak_power = 0.0
+            self._samples.clear()
+        elif previous is not None and seconds - previous[0] <= MAX_SAMPLE_GAP:
+            energy = (previous[1] + power) / 2 * (seconds - previous[0]) / 3600
+            self._energy += energy
+            self.total_energy += energy
+        self._peak_power = max(self._peak_power, power)
+        self._samples.append(seconds, power)
+
+        if charge_state.is_plugged_in or charge_state.is_charging:
+            return None
+        self.last_session = ChargingSession(
+            started=self._started,
+            ended=timestamp,
+            energy=self._energy,
+            soc_start=self._soc_start,
+            soc_end=charge_state.battery_level,
+            peak_power=self._peak_power,
+        )
+        self._started = None
+        self._samples.clear()
+        return self.last_session
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state needed to continue after a restart."""
+        data: dict[str, Any] = {"total_energy": self.total_energy}
+        if self.last_session is not None:
+            data["last_session"] = self.last_session.as_dict()
+        if self._started is not None:
+            data["session"] = {
+                "started": format_datetime(self._started),
+                "soc_start": self._soc_start,
+                "energy": self._energy,
+                "peak_power": self._peak_power,
+                "last_sample": self._samples.last(),
+            }
+        return data
+
+    def restore(self, data: dict[str, Any]) -> None:
+        """Continue from the output of as_dict."""
+        self.total_energy = data["total_energy"]
+        if last_session := data.get("last_session"):
+            self.last_session = ChargingSession.from_dict(last_session)
+        if session := data.get("session"):
+            self._started = parse_datetime(session["started"])
+            self._soc_start = session["soc_start"]
+            self._energy = session["energy"]
+            self._peak_power = session["peak_power"]
+            self._samples.clear()
+            if session["last_sample"] is not None:
+                self._samples.append(*session["last_sample"])
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_CLIENT_ID, CONF_CLIENT_SECRET
+from homeassistant.core import callback
+from homeassistant.data_entry_flow import section
 from homeassistant.helpers import selector
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from slugify import slugify
 
 from .api import (
@@ -15,7 +19,22 @@ from .api import (
     XpengApiClientCommunicationError,
     XpengApiClientError,
 )
-from .const import DOMAIN, LOGGER
+from .const import (
+    CONF_CHARGE_CONTROL,
+    CONF_DEADBAND,
+    CONF_DEADBAND_TYPE,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_MIN_WRITE_INTERVAL,
+    CONF_POWER_LIMIT,
+    CONF_PRICE_ENTITY,
+    CONF_SMART_CHARGING,
+    CONF_USER_ID,
+    DEADBAND_ABSOLUTE,
+    DEADBAND_PERCENT,
+    DEADBAND_SENSORS,
+    DOMAIN,
+    LOGGER,
+)
 
 
 class XpengFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -23,6 +42,14 @@ class XpengFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,  # noqa: ARG004
+    ) -> XpengOptionsFlowHandler:
+        """Return the options flow for an entry."""
+        return XpengOptionsFlowHandler()
+
     async def async_step_user(
         self,
         user_input: dict | None = None,
@@ -49,11 +76,17 @@ class XpengFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                     ## Do NOT use this in production code
                     ## The unique_id should never be something that can change
                     ## https://developers.home-assistant.io/docs/config_entries_config_flow_handler#unique-ids
-                    unique_id=slugify(user_input[CONF_CLIENT_ID])
+                    unique_id=slugify(
+                        f"{user_input[CONF_CLIENT_ID]} {user_input[CONF_USER_ID]}"
+                        if user_input.get(CONF_USER_ID)
+                        else user_input[CONF_CLIENT_ID]
+                    )
                 )
                 self._abort_if_unique_id_configured()
+                if self._overlaps_entry(user_input):
+                    return self.async_abort(reason="overlapping_entry")
                 return self.async_create_entry(
-                    title=user_input[CONF_CLIENT_ID],
+                    title=user_input.get(CONF_USER_ID) or user_input[CONF_CLIENT_ID],
                     data=user_input,
                 )
 
@@ -74,16 +107,121 @@ class XpengFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                             type=selector.TextSelectorType.PASSWORD,
                         ),
                     ),
+                    vol.Optional(
+                        CONF_USER_ID,
+                        default=(user_input or {}).get(CONF_USER_ID, vol.UNDEFINED),
+                    ): selector.TextSelector(
+                        selector.TextSelectorConfig(
+                            type=selector.TextSelectorType.TEXT,
+                        ),
+                    ),
                 },
             ),
             errors=_errors,
         )
 
+    def _overlaps_entry(self, user_input: dict) -> bool:
+        """Return whether an entry of the same client already has the vehicles."""
+        return any(
+            # An entry without a user holds the vehicles of every user.
+            not user_input.get(CONF_USER_ID) or not entry.data.get(CONF_USER_ID)
+            for entry in self._async_current_entries(include_ignore=False)
+            if entry.data[CONF_CLIENT_ID] == user_input[CONF_CLIENT_ID]
+        )
+
     async def _test_credentials(self, client_id: str, client_secret: str) -> None:
         """Validate credentials."""
         client = XpengApiClient(
             client_id=client_id,
             client_secret=client_secret,
-            session=async_create_clientsession(self.hass),
+            session=async_get_clientsession(self.hass),
+        )
+        try:
+            await client.async_get_token()
+        finally:
+            client.shutdown()
+
+
+class XpengOptionsFlowHandler(config_entries.OptionsFlow):
+    """Options flow for Xpeng."""
+
+    async def async_step_init(
+        self,
+        user_input: dict[str, Any] | None = None,
+    ) -> config_entries.ConfigFlowResult:
+        """Manage how often sensor states are written and smart charging."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        def _seconds(maximum: int) -> selector.NumberSelector:
+            return selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=0,
+                    max=maximum,
+                    unit_of_measurement="s",
+                    mode=selector.NumberSelectorMode.BOX,
+                ),
+            )
+
+        deadband_schema = vol.Schema(
+            {
+                vol.Required(CONF_DEADBAND, default=0): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0,
+                        step="any",
+                        mode=selector.NumberSelectorMode.BOX,
+                    ),
+                ),
+                vol.Required(
+                    CONF_DEADBAND_TYPE, default=DEADBAND_ABSOLUTE
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[DEADBAND_ABSOLUTE, DEADBAND_PERCENT],
+                        translation_key=CONF_DEADBAND_TYPE,
+                    ),
+                ),
+            },
+        )
+        smart_charging_schema = vol.Schema(
+            {
+                vol.Optional(CONF_PRICE_ENTITY): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="sensor"),
+                ),
+                vol.Required(CONF_POWER_LIMIT, default=0): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0,
+                        step="any",
+                        unit_of_measurement="kW",
+                        mode=selector.NumberSelectorMode.BOX,
+                    ),
+                ),
+                vol.Required(
+                    CONF_CHARGE_CONTROL, default=False
+                ): selector.BooleanSelector(),
+            },
+        )
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                vol.Schema(
+                    {
+                        vol.Required(CONF_MIN_WRITE_INTERVAL, default=0): _seconds(
+                            3600
+                        ),
+                        vol.Required(CONF_HEARTBEAT_INTERVAL, default=0): _seconds(
+                            86400
+                        ),
+                        **{
+                            vol.Required(key): section(
+                                deadband_schema, {"collapsed": True}
+                            )
+                            for key in DEADBAND_SENSORS
+                        },
+                        vol.Required(CONF_SMART_CHARGING): section(
+                            smart_charging_schema, {"collapsed": True}
+                        ),
+                    },
+                ),
+                self.config_entry.options,
+            ),
         )
-        await client.async_get_token()
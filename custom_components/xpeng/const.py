@@ -1,7 +1,52 @@
 """Constants for xpeng."""
 
+from datetime import timedelta
 from logging import Logger, getLogger
 
 LOGGER: Logger = getLogger(__package__)
 
 DOMAIN = "xpeng"
+
+STORAGE_VERSION = 1
+
+CONF_USER_ID = "user_id"
+CONF_WEBHOOK_SECRET = "webhook_secret"  # noqa: S105
+CONF_DEADBAND = "deadband"
+CONF_DEADBAND_TYPE = "deadband_type"
+CONF_MIN_WRITE_INTERVAL = "min_write_interval"
+CONF_HEARTBEAT_INTERVAL = "heartbeat_interval"
+CONF_SMART_CHARGING = "smart_charging"
+CONF_PRICE_ENTITY = "price_entity"
+CONF_POWER_LIMIT = "power_limit"
+CONF_CHARGE_CONTROL = "charge_control"
+
+DEADBAND_ABSOLUTE = "absolute"
+DEADBAND_PERCENT = "percent"
+# Sensors with a configurable deadband, by options section.
+DEADBAND_SENSORS = ("battery", "range", "charge_time_remaining")
+
+# Full fleet polls pick up newly linked vehicles, in between each vehicle is
+# refreshed on its own schedule.
+FULL_SWEEP_INTERVAL = timedelta(minutes=30)
+# Never poll more often than this, even when several vehicles are due.
+MIN_REFRESH_INTERVAL = timedelta(seconds=5)
+# When Enode pushes vehicle updates to us, polling is only a safety net.
+RECONCILE_INTERVAL = timedelta(minutes=30)
+# Retry delay while entities still show the restored fleet snapshot.
+STALE_RETRY_INTERVAL = timedelta(minutes=1)
+# Seconds to collect updates before the fleet snapshot is written to disk.
+SNAPSHOT_SAVE_DELAY = 300
+# Seconds to collect learned charging curve samples before writing them.
+CHARGE_CURVE_SAVE_DELAY = 600
+
+ATTR_STALE = "stale"
+ATTR_ESTIMATED = "estimated"
+
+EVENT_CHARGING_SESSION_ENDED = f"{DOMAIN}_charging_session_ended"
+EVENT_TRIP_ENDED = f"{DOMAIN}_trip_ended"
+# Sent with the new options when the options of an entry were applied in
+# place, formatted with the entry id.
+SIGNAL_OPTIONS_UPDATED = f"{DOMAIN}_options_updated_{{}}"
+
+WEBHOOK_SIGNATURE_HEADER = "X-Enode-Signature"
+WEBHOOK_EVENT_VEHICLE_UPDATED = "user:vehicle:updated"
@@ -2,31 +2,388 @@
 
 from __future__ import annotations
 
+import asyncio
+import time
 from typing import TYPE_CHECKING, Any
 
-from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.core import callback
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
+from .actions import XpengActionQueue
 from .api import (
+    XpengApiClient,
     XpengApiClientAuthenticationError,
+    XpengApiClientDecodeError,
     XpengApiClientError,
 )
+from .const import (
+    DOMAIN,
+    FULL_SWEEP_INTERVAL,
+    MIN_REFRESH_INTERVAL,
+    RECONCILE_INTERVAL,
+    STALE_RETRY_INTERVAL,
+)
+from .diff import ALL_FIELDS, diff_vehicles
+from .enode_models import Vehicle
+from .scheduler import XpengVehicleScheduler
 
 if TYPE_CHECKING:
-    from .data import XpengConfigEntry
+    from collections.abc import Iterable
+    from datetime import datetime
+    from logging import Logger
+
+    from homeassistant.core import HomeAssistant
+
+    from .estimator import XpengChargeCurves
+    from .snapshot import XpengFleetSnapshot
 
 
 # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
 class XpengDataUpdateCoordinator(DataUpdateCoordinator):
-    """Class to manage fetching data from the API."""
+    """
+    Class to manage fetching data from the API.
+
+    Fetches the whole fleet and feeds every vehicle to a coordinator of its
+    own, which the entities of that vehicle listen to.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        hass: HomeAssistant,
+        logger: Logger,
+        name: str,
+        client: XpengApiClient,
+        snapshot: XpengFleetSnapshot | None = None,
+        curves: XpengChargeCurves | None = None,
+    ) -> None:
+        """Initialize the coordinator with a per-vehicle refresh schedule."""
+        # Not bound to one config entry, every entry sharing the Enode
+        # credentials subscribes to the same coordinator.
+        super().__init__(
+            hass=hass,
+            logger=logger,
+            name=name,
+            config_entry=None,
+            update_interval=FULL_SWEEP_INTERVAL,
+        )
+        self.client = client
+        self.metrics = client.metrics
+        self.snapshot = snapshot
+        self.curves = curves
+        # Whether the data was restored from the snapshot and not yet refreshed.
+        self.stale = False
+        # Config entries subscribed to this coordinator.
+        self.entry_ids: set[str] = set()
+        # Changed field paths per vehicle id for the latest update.
+        self.changes: dict[str, frozenset[str]] = {}
+        self.scheduler: XpengVehicleScheduler | None = XpengVehicleScheduler()
+        self.actions = XpengActionQueue(self)
+        self.vehicles: dict[str, XpengVehicleCoordinator] = {}
+        # Vehicles whose latest data could not be decoded.
+        self._decode_errors: dict[str, XpengApiClientDecodeError] = {}
+        self._full_sweep_interval = FULL_SWEEP_INTERVAL
+        self._next_full_sweep: datetime | None = None
 
-    config_entry: XpengConfigEntry
+    async def async_first_refresh(self) -> None:
+        """
+        Fetch the fleet for the first time.
+
+        Works like async_config_entry_first_refresh, which needs the
+        coordinator to belong to a single config entry.
+        """
+        await self.async_refresh()
+        if self.last_update_success:
+            return
+        if isinstance(self.last_exception, ConfigEntryAuthFailed):
+            raise self.last_exception
+        raise ConfigEntryNotReady(str(self.last_exception)) from self.last_exception
+
+    async def async_shutdown(self) -> None:
+        """Stop polling and drop queued actions."""
+        await super().async_shutdown()
+        self.actions.async_cancel()
+
+    async def async_refresh_vehicle(self, vehicle_id: str) -> None:
+        """Refresh a single vehicle, e.g. after an action changed it."""
+        try:
+            vehicle = await self.client.async_get_vehicle(vehicle_id)
+        except XpengApiClientDecodeError as exception:
+            self._decode_errors[vehicle_id] = exception
+            if (coordinator := self.vehicles.get(vehicle_id)) is not None:
+                coordinator.async_set_failed(exception)
+            return
+        except XpengApiClientError as exception:
+            self.logger.debug("Refreshing %s failed: %s", vehicle_id, exception)
+            return
+        self.async_apply_vehicle_update(vehicle)
+
+    @callback
+    def async_restore(self, vehicles: dict[str, Vehicle]) -> None:
+        """Serve a restored fleet, marked stale, until the first refresh."""
+        self.data = vehicles
+        self.changes = dict.fromkeys(vehicles, ALL_FIELDS)
+        self.stale = True
+        self.update_interval = STALE_RETRY_INTERVAL
+        self._async_update_vehicle_coordinators()
+
+    @callback
+    def async_enable_push(self) -> None:
+        """Rely on pushed updates and only poll to reconcile missed events."""
+        self.scheduler = None
+        self._full_sweep_interval = RECONCILE_INTERVAL
+        self.update_interval = RECONCILE_INTERVAL
 
     async def _async_update_data(self) -> Any:
         """Update data via library."""
+        client = self.client
+        now = dt_util.utcnow()
+        start = time.perf_counter()
+        try:
+            if (
+                self.scheduler is None
+                or self._next_full_sweep is None
+                or now >= self._next_full_sweep
+            ):
+                vehicles = await self._async_full_sweep(client, now)
+            else:
+                vehicles = await self._async_refresh_due(client, now)
+        except XpengApiClientAuthenticationError as exception:
+            raise ConfigEntryAuthFailed(exception) from exception
+        except XpengApiClientError as exception:
+            if self.stale:
+                self.update_interval = STALE_RETRY_INTERVAL
+            raise UpdateFailed(exception) from exception
+
+        self.metrics.cycle_duration.observe(time.perf_counter() - start)
+        self._schedule_next_update()
+        if self.stale:
+            # Every entity has to drop its stale marker.
+            self.stale = False
+            self.changes = dict.fromkeys(vehicles, ALL_FIELDS)
+        else:
+            self.changes = diff_vehicles(self.data, vehicles)
+        self._async_save_snapshot(vehicles)
+        self._async_learn_charge_curves(vehicles)
+        return vehicles
+
+    async def _async_full_sweep(
+        self, client: XpengApiClient, now: datetime
+    ) -> dict[str, Vehicle]:
+        """Fetch the whole fleet and reschedule every vehicle."""
+        errors: dict[str, XpengApiClientDecodeError] = {}
+        vehicles = {
+            vehicle.id: vehicle for vehicle in await client.async_get_data(errors)
+        }
+        # Vehicles that failed to decode are still on the account.
+        for vehicle_id in errors.keys() & (self.data or {}).keys():
+            vehicles[vehicle_id] = self.data[vehicle_id]
+        self._decode_errors = errors
+        self._next_full_sweep = now + self._full_sweep_interval
+        removed_ids = (self.data or {}).keys() - vehicles.keys()
+        if self.scheduler is not None:
+            for vehicle_id in removed_ids:
+                self.scheduler.remove(vehicle_id)
+            for vehicle in vehicles.values():
+                self.scheduler.schedule(vehicle, now)
+        if removed_ids:
+            self.async_remove_stale_devices(vehicles.keys())
+        return vehicles
+
+    async def _async_refresh_due(
+        self, client: XpengApiClient, now: datetime
+    ) -> dict[str, Vehicle]:
+        """Refresh only the vehicles whose schedule says they are due."""
+        scheduler = self.scheduler
+        vehicle_ids = scheduler.due(now)
+        if not vehicle_ids:
+            return self.data
+
+        results = await asyncio.gather(
+            *(client.async_get_vehicle(vehicle_id) for vehicle_id in vehicle_ids),
+            return_exceptions=True,
+        )
+        refreshed = []
+        for vehicle_id, result in zip(vehicle_ids, results, strict=True):
+            if isinstance(result, XpengApiClientAuthenticationError):
+                raise result
+            if isinstance(result, XpengApiClientDecodeError):
+                self._decode_errors[vehicle_id] = result
+                scheduler.schedule_failure(vehicle_id, now)
+            elif isinstance(result, XpengApiClientError):
+                self.logger.debug("Refreshing %s failed: %s", vehicle_id, result)
+                scheduler.schedule_failure(vehicle_id, now)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                self._decode_errors.pop(vehicle_id, None)
+                scheduler.schedule(result, now)
+                refreshed.append(result)
+        return self._merge_vehicles(refreshed)
+
+    def _schedule_next_update(self) -> None:
+        """Wake up when the next vehicle or the next full sweep is due."""
+        if self.scheduler is None or self._next_full_sweep is None:
+            self.update_interval = self._full_sweep_interval
+            return
+        next_update = self._next_full_sweep
+        if (next_due := self.scheduler.next_due()) is not None:
+            next_update = min(next_update, next_due)
+        self.update_interval = max(next_update - dt_util.utcnow(), MIN_REFRESH_INTERVAL)
+
+    def _merge_vehicles(self, vehicles: list[Vehicle]) -> dict[str, Vehicle]:
+        """Return the current fleet with the given vehicles replaced or added."""
+        merged = dict(self.data or {})
+        for vehicle in vehicles:
+            merged[vehicle.id] = vehicle
+        return merged
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify the vehicles and listeners, counting the state writes made."""
+        self.metrics.begin_cycle()
+        try:
+            self._async_update_vehicle_coordinators()
+            super().async_update_listeners()
+        finally:
+            self.metrics.end_cycle()
+
+    @callback
+    def _async_update_vehicle_coordinators(self) -> None:
+        """Feed every vehicle coordinator its vehicle or why it has none."""
+        vehicles = self.data or {}
+        for vehicle_id in self.vehicles.keys() - vehicles.keys():
+            del self.vehicles[vehicle_id]
+        for vehicle_id, vehicle in vehicles.items():
+            coordinator = self.vehicles.get(vehicle_id)
+            if coordinator is None:
+                coordinator = XpengVehicleCoordinator(self, vehicle)
+                self.vehicles[vehicle_id] = coordinator
+            if not self.last_update_success:
+                # A restored fleet stays shown, marked stale, until a refresh
+                # succeeds.
+                if not self.stale:
+                    coordinator.async_set_failed(self.last_exception)
+            elif (error := self._decode_errors.get(vehicle_id)) is not None:
+                coordinator.async_set_failed(error)
+            else:
+                coordinator.async_set_vehicle(
+                    vehicle, self.changes.get(vehicle_id, frozenset())
+                )
+
+    @callback
+    def async_remove_stale_devices(self, vehicle_ids: Iterable[str]) -> None:
+        """Remove the devices, and with them the entities, of unlinked vehicles."""
+        current = {(DOMAIN, vehicle_id) for vehicle_id in vehicle_ids}
+        device_registry = dr.async_get(self.hass)
+        for entry_id in self.entry_ids:
+            for device in dr.async_entries_for_config_entry(device_registry, entry_id):
+                # The service device of the entry carries the API metrics.
+                if device.identifiers.isdisjoint(current | {(DOMAIN, entry_id)}):
+                    self.logger.debug(
+                        "Removing device of unlinked vehicle %s", device.name
+                    )
+                    device_registry.async_update_device(
+                        device.id, remove_config_entry_id=entry_id
+                    )
+
+    @callback
+    def async_apply_vehicle_update(self, vehicle: Vehicle) -> None:
+        """
+        Merge a single pushed or refreshed vehicle and notify listeners.
+
+        Unlike async_set_updated_data the refresh timer is left alone, so
+        frequent pushes do not put off the reconciling poll, nor the poll of
+        the other vehicles.
+        """
+        if self.scheduler is not None:
+            self.scheduler.schedule(vehicle, dt_util.utcnow())
+        self._decode_errors.pop(vehicle.id, None)
+        vehicles = self._merge_vehicles([vehicle])
+        self.changes = diff_vehicles(self.data, vehicles)
+        self._async_save_snapshot(vehicles)
+        self._async_learn_charge_curves(vehicles)
+        self.data = vehicles
+        self.last_update_success = True
+        self.async_update_listeners()
+
+    @callback
+    def _async_learn_charge_curves(self, vehicles: dict[str, Vehicle]) -> None:
+        """Feed the charge state of changed vehicles to their charging curves."""
+        if self.curves is None:
+            return
+        self.curves.async_update(
+            vehicles[vehicle_id]
+            for vehicle_id in self.changes
+            if vehicle_id in vehicles
+        )
+
+    @callback
+    def _async_save_snapshot(self, vehicles: dict[str, Vehicle]) -> None:
+        """Persist the fleet, unless no vehicle changed, joined or left."""
+        if self.snapshot is None:
+            return
+        if self.changes or vehicles.keys() != (self.data or {}).keys():
+            self.snapshot.async_schedule_save(vehicles)
+
+
+class XpengVehicleCoordinator(DataUpdateCoordinator[Vehicle]):
+    """
+    Data of a single vehicle, fed by the fleet coordinator.
+
+    The entities of a vehicle listen here, so they are only woken when their
+    vehicle changed or became available or unavailable, and a vehicle that
+    fails to decode does not take the others down with it. There is no poll
+    timer of its own, the fleet schedules the refresh of every vehicle.
+    """
+
+    def __init__(self, fleet: XpengDataUpdateCoordinator, vehicle: Vehicle) -> None:
+        """Create the coordinator of a vehicle of the fleet."""
+        super().__init__(
+            hass=fleet.hass,
+            logger=fleet.logger,
+            name=f"{fleet.name} {vehicle.id}",
+            config_entry=None,
+        )
+        self.fleet = fleet
+        self.vehicle_id = vehicle.id
+        self.data = vehicle
+        # Changed field paths of the latest update.
+        self.changes: frozenset[str] = ALL_FIELDS
+
+    @callback
+    def async_set_vehicle(self, vehicle: Vehicle, changes: frozenset[str]) -> None:
+        """Take new data from the fleet, waking the listeners if it matters."""
+        if self.last_update_success and (vehicle is self.data or not changes):
+            # Nothing the entities show changed.
+            self.data = vehicle
+            return
+        self.changes = changes
+        self.async_set_updated_data(vehicle)
+
+    @callback
+    def async_set_failed(self, exception: Exception | None) -> None:
+        """Make the vehicle unavailable until it is fed new data."""
+        self.last_exception = exception
+        if self.last_update_success:
+            self.last_update_success = False
+            self.changes = frozenset()
+            self.async_update_listeners()
+
+    async def _async_update_data(self) -> Vehicle:
+        """Refresh only this vehicle, when one of its entities asks for it."""
         try:
-            return await self.config_entry.runtime_data.client.async_get_data()
+            vehicle = await self.fleet.client.async_get_vehicle(self.vehicle_id)
         except XpengApiClientAuthenticationError as exception:
             raise ConfigEntryAuthFailed(exception) from exception
         except XpengApiClientError as exception:
             raise UpdateFailed(exception) from exception
+        self.changes = diff_vehicles(
+            {self.vehicle_id: self.data}, {self.vehicle_id: vehicle}
+        ).get(self.vehicle_id, frozenset())
+        # Taken before the fleet merges it, so it is not fed back to us.
+        self.data = vehicle
+        self.fleet.async_apply_vehicle_update(vehicle)
+        return vehicle
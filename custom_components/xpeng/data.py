@@ -2,8 +2,8 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
     from homeassistant.config_entries import ConfigEntry
@@ -11,6 +11,7 @@ if TYPE_CHECKING:
 
     from .api import XpengApiClient
     from .coordinator import XpengDataUpdateCoordinator
+    from .smart_charging import XpengChargePlanner
 
 
 type XpengConfigEntry = ConfigEntry[XpengData]
@@ -23,3 +24,9 @@ class XpengData:
     client: XpengApiClient
     coordinator: XpengDataUpdateCoordinator
     integration: Integration
+    # Only vehicles of this Enode user belong to the entry, None means all.
+    user_id: str | None = None
+    # Charging plans, when a price sensor is configured.
+    planner: XpengChargePlanner | None = None
+    # Credentials the entry was set up with, changing them takes a reload.
+    setup_data: dict[str, Any] = field(default_factory=dict)
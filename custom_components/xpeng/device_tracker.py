@@ -2,13 +2,21 @@
 
 from __future__ import annotations
 
-import logging
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from homeassistant.components.device_tracker import const
 from homeassistant.components.device_tracker.config_entry import TrackerEntity
-
-from .entity import XpengEntity
+from homeassistant.core import callback
+
+from .const import EVENT_TRIP_ENDED
+from .diff import ALL_FIELDS
+from .entity import (
+    XpengEntity,
+    XpengEntityDescription,
+    async_add_vehicle_entities,
+    described,
+)
+from .trips import TripTracker
 
 if TYPE_CHECKING:
     from homeassistant.core import HomeAssistant
@@ -16,7 +24,13 @@ if TYPE_CHECKING:
 
     from .data import XpengConfigEntry
 
-_LOGGER = logging.getLogger(__name__)
+TRACKERS = (
+    XpengEntityDescription(
+        key="location_tracker",
+        name="location tracker",
+        watched_fields=("location.latitude", "location.longitude"),
+    ),
+)
 
 
 async def async_setup_entry(
@@ -25,35 +39,68 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the sensor platform."""
-    entities = []
-    for vehicle_id, vehicle in enumerate(entry.runtime_data.client.vehicles):
-        _LOGGER.debug("Setting up device tracker for %s", vehicle)
-        entities.append(XpengCarLocation(vehicle_id, entry.runtime_data.coordinator))
-
-    async_add_entities(entities, update_before_add=True)
+    async_add_vehicle_entities(
+        entry,
+        async_add_entities,
+        described(XpengCarLocation, TRACKERS),
+    )
 
 
 class XpengCarLocation(XpengEntity, TrackerEntity):
     """Representation of a Xpeng car location device tracker."""
 
-    entity_name = "location tracker"
-
-    @property
-    def source_type(self) -> str:
-        """Return device tracker source type."""
-        return const.ATTR_GPS
-
-    @property
-    def longitude(self) -> float:
-        """Return longitude."""
-        return self.vehicle.location.longitude
+    _attr_source_type = const.SourceType.GPS
 
-    @property
-    def latitude(self) -> float:
-        """Return latitude."""
-        return self.vehicle.location.latitude
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Create the tracker entity with an empty trip history."""
+        super().__init__(*args, **kwargs)
+        self._trips = TripTracker()
+        self._trips.update(self.vehicle.location)
 
     @property
     def force_update(self) -> bool:
         """Disable forced updated since we are polling via the coordinator updates."""
         return False
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Show the position the car last moved to and the last trip."""
+        super()._async_update_attrs()
+        # Locations without a timestamp are not tracked, show them as reported.
+        location = self.vehicle.location
+        self._attr_latitude, self._attr_longitude = self._trips.position or (
+            location.latitude,
+            location.longitude,
+        )
+        self._attr_extra_state_attributes = (
+            {
+                "on_trip": self._trips.in_trip,
+                "last_trip": self._trips.last_trip.as_dict(),
+            }
+            if self._trips.last_trip is not None
+            else None
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the car moved past the GPS noise or a trip ended."""
+        update = self._trips.update(self.vehicle.location)
+        if update.trip is not None:
+            self.hass.bus.async_fire(
+                EVENT_TRIP_ENDED,
+                {
+                    "vehicle_id": self._vehicle_id,
+                    **update.trip.as_dict(include_track=True),
+                },
+            )
+        available = self.coordinator.last_update_success
+        if (
+            available == self._last_update_success
+            and not update.moved
+            and update.trip is None
+            and self.coordinator.changes is not ALL_FIELDS
+        ):
+            return
+        self._last_update_success = available
+        self._async_update_attrs()
+        self.async_write_ha_state()
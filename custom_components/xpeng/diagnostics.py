@@ -0,0 +1,54 @@
+"""Diagnostics support for xpeng."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_CLIENT_ID, CONF_CLIENT_SECRET, CONF_WEBHOOK_ID
+
+from .const import CONF_WEBHOOK_SECRET
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .data import XpengConfigEntry
+
+TO_REDACT = {
+    CONF_CLIENT_ID,
+    CONF_CLIENT_SECRET,
+    CONF_WEBHOOK_ID,
+    CONF_WEBHOOK_SECRET,
+    "id",
+    "userId",
+    "vin",
+    "latitude",
+    "longitude",
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant,  # noqa: ARG001 Unused function argument: `hass`
+    entry: XpengConfigEntry,
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data.coordinator
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "last_exception": repr(coordinator.last_exception),
+            "update_interval_s": coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None,
+            "push": coordinator.scheduler is None,
+            "stale": coordinator.stale,
+            "subscribed_entries": len(coordinator.entry_ids),
+            "vehicles": len(coordinator.data or {}),
+        },
+        "metrics": coordinator.metrics.as_dict(),
+        "vehicles": [
+            async_redact_data(vehicle.to_json(), TO_REDACT)
+            for vehicle in (coordinator.data or {}).values()
+        ],
+    }
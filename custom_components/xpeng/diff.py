@@ -0,0 +1,72 @@
+"""Field level change detection between coordinator updates."""
+
+from __future__ import annotations
+
+from dataclasses import fields, is_dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+    from .enode_models import Vehicle
+
+# Marker for vehicles that are new, every field counts as changed.
+ALL_FIELDS: frozenset[str] = frozenset({"*"})
+
+
+def diff_vehicles(
+    old: dict[str, Vehicle] | None, new: dict[str, Vehicle]
+) -> dict[str, frozenset[str]]:
+    """
+    Return the changed field paths of every vehicle that changed.
+
+    Paths are dotted attribute names such as ``charge_state.battery_level``.
+    Vehicles whose data timestamps did not advance are skipped without
+    comparing their fields.
+    """
+    previous = old or {}
+    changes: dict[str, frozenset[str]] = {}
+    for vehicle in new.values():
+        before = previous.get(vehicle.id)
+        if before is None:
+            changes[vehicle.id] = ALL_FIELDS
+        elif (
+            before is not vehicle
+            and _timestamps_advanced(before, vehicle)
+            and (changed := frozenset(_changed_fields(before, vehicle)))
+        ):
+            changes[vehicle.id] = changed
+    return changes
+
+
+def _timestamps_advanced(old: Vehicle, new: Vehicle) -> bool:
+    """Return whether any of the vehicle data timestamps moved forward."""
+    pairs = (
+        (old.charge_state.last_updated, new.charge_state.last_updated),
+        (old.location.last_updated, new.location.last_updated),
+        (old.odometer.last_updated, new.odometer.last_updated),
+    )
+    if all(after is None for _, after in pairs):
+        # Nothing to go by, fall back to comparing the fields.
+        return True
+    return any(_advanced(before, after) for before, after in pairs)
+
+
+def _advanced(before: datetime | None, after: datetime | None) -> bool:
+    """Return whether a timestamp moved forward."""
+    return after is not None and (before is None or after > before)
+
+
+def _changed_fields(old: Any, new: Any, prefix: str = "") -> list[str]:
+    """Return the dotted paths of the dataclass fields that differ."""
+    changed = []
+    for field in fields(old):
+        before = getattr(old, field.name)
+        after = getattr(new, field.name)
+        if before == after:
+            continue
+        if is_dataclass(before) and is_dataclass(after):
+            changed.extend(_changed_fields(before, after, f"{prefix}{field.name}."))
+        else:
+            changed.append(f"{prefix}{field.name}")
+    return changed
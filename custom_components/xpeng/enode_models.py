@@ -2,17 +2,40 @@
 
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from typing import Any
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads  # noqa: F401
+
+# Enough to hold every timestamp of a large fleet between two polls, so the
+# unchanged timestamps of idle vehicles are never parsed twice.
+DATETIME_CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=DATETIME_CACHE_SIZE)
+def _parse_iso_datetime(dt_str: str) -> datetime:
+    """Parse and memoize a non-empty ISO format datetime string."""
+    return datetime.fromisoformat(dt_str)
+
 
 def parse_datetime(dt_str: str | None) -> datetime | None:
     """Parse an ISO format datetime string to a datetime object."""
     if not dt_str:
         return None
-    return datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
+    return _parse_iso_datetime(dt_str)
+
+
+def format_datetime(value: datetime | None) -> str | None:
+    """Format a datetime object the way parse_datetime reads it back."""
+    if value is None:
+        return None
+    return value.isoformat()
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Information:
     """Vehicle information data."""
 
@@ -33,8 +56,18 @@ class Information:
             year=data["year"],
         )
 
+    def to_json(self) -> dict[str, Any]:
+        """Return the JSON data this instance was created from."""
+        return {
+            "displayName": self.display_name,
+            "vin": self.vin,
+            "brand": self.brand,
+            "model": self.model,
+            "year": self.year,
+        }
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class ChargeState:
     """Vehicle charging state data."""
 
@@ -69,8 +102,25 @@ class ChargeState:
             max_current=data["maxCurrent"],
         )
 
-
-@dataclass
+    def to_json(self) -> dict[str, Any]:
+        """Return the JSON data this instance was created from."""
+        return {
+            "chargeRate": self.charge_rate,
+            "chargeTimeRemaining": self.charge_time_remaining,
+            "isFullyCharged": self.is_fully_charged,
+            "isPluggedIn": self.is_plugged_in,
+            "isCharging": self.is_charging,
+            "batteryLevel": self.battery_level,
+            "range": self.range,
+            "batteryCapacity": self.battery_capacity,
+            "chargeLimit": self.charge_limit,
+            "lastUpdated": format_datetime(self.last_updated),
+            "powerDeliveryState": self.power_delivery_state,
+            "maxCurrent": self.max_current,
+        }
+
+
+@dataclass(slots=True, frozen=True)
 class SmartChargingPolicy:
     """Vehicle smart charging policy data."""
 
@@ -87,8 +137,16 @@ class SmartChargingPolicy:
             minimum_charge_limit=data["minimumChargeLimit"],
         )
 
+    def to_json(self) -> dict[str, Any]:
+        """Return the JSON data this instance was created from."""
+        return {
+            "deadline": format_datetime(self.deadline),
+            "isEnabled": self.is_enabled,
+            "minimumChargeLimit": self.minimum_charge_limit,
+        }
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Location:
     """Vehicle location data."""
 
@@ -107,8 +165,17 @@ class Location:
             last_updated=parse_datetime(data["lastUpdated"]),
         )
 
+    def to_json(self) -> dict[str, Any]:
+        """Return the JSON data this instance was created from."""
+        return {
+            "id": self.id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "lastUpdated": format_datetime(self.last_updated),
+        }
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Odometer:
     """Vehicle odometer data."""
 
@@ -123,24 +190,46 @@ class Odometer:
             last_updated=parse_datetime(data["lastUpdated"]),
         )
 
+    def to_json(self) -> dict[str, Any]:
+        """Return the JSON data this instance was created from."""
+        return {
+            "distance": self.distance,
+            "lastUpdated": format_datetime(self.last_updated),
+        }
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Capability:
     """Vehicle capability data."""
 
-    intervention_ids: list[str]
+    intervention_ids: tuple[str, ...]
     is_capable: bool
 
     @classmethod
     def from_json(cls, data: dict[str, Any]) -> "Capability":
         """Create a Capability instance from JSON data."""
-        return cls(
-            intervention_ids=data.get("interventionIds", []),
+        return _intern_capability(
+            tuple(data.get("interventionIds", ())),
             is_capable=data.get("isCapable", False),
         )
 
+    def to_json(self) -> dict[str, Any]:
+        """Return the JSON data this instance was created from."""
+        return {
+            "interventionIds": list(self.intervention_ids),
+            "isCapable": self.is_capable,
+        }
+
 
-@dataclass
+@lru_cache(maxsize=256)
+def _intern_capability(
+    intervention_ids: tuple[str, ...], *, is_capable: bool
+) -> Capability:
+    """Share one instance per distinct capability, most vehicles repeat them."""
+    return Capability(intervention_ids=intervention_ids, is_capable=is_capable)
+
+
+@dataclass(slots=True, frozen=True)
 class Capabilities:
     """Vehicle capabilities data."""
 
@@ -167,8 +256,21 @@ class Capabilities:
             smart_charging=Capability.from_json(data["smartCharging"]),
         )
 
-
-@dataclass
+    def to_json(self) -> dict[str, Any]:
+        """Return the JSON data this instance was created from."""
+        return {
+            "information": self.information.to_json(),
+            "chargeState": self.charge_state.to_json(),
+            "location": self.location.to_json(),
+            "odometer": self.odometer.to_json(),
+            "setMaxCurrent": self.set_max_current.to_json(),
+            "startCharging": self.start_charging.to_json(),
+            "stopCharging": self.stop_charging.to_json(),
+            "smartCharging": self.smart_charging.to_json(),
+        }
+
+
+@dataclass(slots=True, frozen=True)
 class Vehicle:
     """Vehicle data."""
 
@@ -205,8 +307,57 @@ class Vehicle:
             scopes=data["scopes"],
         )
 
+    def to_json(self) -> dict[str, Any]:
+        """Return the JSON data this instance was created from."""
+        return {
+            "id": self.id,
+            "userId": self.user_id,
+            "vendor": self.vendor,
+            "isReachable": self.is_reachable,
+            "lastSeen": format_datetime(self.last_seen),
+            "information": self.information.to_json(),
+            "chargeState": self.charge_state.to_json(),
+            "smartChargingPolicy": self.smart_charging_policy.to_json(),
+            "location": self.location.to_json(),
+            "odometer": self.odometer.to_json(),
+            "capabilities": self.capabilities.to_json(),
+            "scopes": self.scopes,
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class Action:
+    """Charge action sent to a vehicle."""
+
+    id: str
+    target_id: str
+    kind: str
+    state: str
+    failure_reason: str | None
+
+    @property
+    def is_pending(self) -> bool:
+        """Return whether the vehicle has not confirmed or failed it yet."""
+        return self.state == "PENDING"
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "Action":
+        """Create an Action instance from JSON data."""
+        failure_reason = data.get("failureReason")
+        return cls(
+            id=data["id"],
+            target_id=data["targetId"],
+            kind=data["kind"],
+            state=data["state"],
+            failure_reason=(
+                failure_reason.get("detail") or failure_reason.get("type")
+                if failure_reason
+                else None
+            ),
+        )
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Pagination:
     """Pagination data for API responses."""
 
@@ -222,7 +373,7 @@ class Pagination:
         )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class EnodeResponse:
     """Complete Enode API response data."""
 
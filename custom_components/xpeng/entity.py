@@ -2,32 +2,113 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any
 
+from homeassistant.core import callback
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import EntityDescription
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
 
-from .const import DOMAIN
-from .coordinator import XpengDataUpdateCoordinator
+from .const import ATTR_STALE, DOMAIN, LOGGER, SIGNAL_OPTIONS_UPDATED
+from .coordinator import XpengDataUpdateCoordinator, XpengVehicleCoordinator
+from .diff import ALL_FIELDS
+from .ratelimit import RequestPriority, request_priority
+from .throttle import StateWriteFilter
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping
+    from datetime import datetime
+
+    from homeassistant.core import CALLBACK_TYPE
+    from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+    from .data import XpengConfigEntry
     from .enode_models import Vehicle
 
 
-class XpengEntity(CoordinatorEntity[XpengDataUpdateCoordinator]):
-    """Base class for Xpeng entities."""
+def is_affected(
+    watched_fields: tuple[str, ...], changes: frozenset[str] | None
+) -> bool:
+    """Return whether a vehicle change touches any of the watched fields."""
+    return bool(changes) and (
+        changes is ALL_FIELDS
+        or not watched_fields
+        or not changes.isdisjoint(watched_fields)
+    )
+
+
+@dataclass(frozen=True, kw_only=True)
+class XpengEntityDescription(EntityDescription):
+    """Describes an entity of a vehicle, the name goes after the vehicle name."""
+
+    # Vehicle fields the entity renders, an empty tuple means all of them.
+    watched_fields: tuple[str, ...] = ()
+    # Options section holding the deadband of a numeric sensor, if it has one.
+    deadband_key: str | None = None
+    # Fields the value is computed from, the deadband only holds back changes
+    # to these alone.
+    value_fields: tuple[str, ...] = ()
+    attributes_fn: (
+        Callable[[Vehicle, XpengDataUpdateCoordinator], dict[str, Any] | None] | None
+    ) = None
+
+
+type XpengEntityFactory = Callable[
+    [str, XpengVehicleCoordinator, Mapping[str, Any]], XpengEntity
+]
+
+
+def described(
+    entity_class: type[XpengEntity], descriptions: Iterable[XpengEntityDescription]
+) -> tuple[XpengEntityFactory, ...]:
+    """Return factories creating an entity of a class for every description."""
+    return tuple(
+        partial(entity_class, description=description) for description in descriptions
+    )
+
+
+class XpengEntity(CoordinatorEntity[XpengVehicleCoordinator]):
+    """
+    Base class for Xpeng entities.
+
+    Entities either set entity_name and watched_fields as class attributes,
+    or take them from an XpengEntityDescription. They listen to the
+    coordinator of their vehicle, the state is computed in
+    _async_update_attrs, once when added and then only for coordinator
+    updates that touch the watched fields.
+    """
 
     entity_name = ""
+    # Vehicle fields this entity renders, an empty tuple means all of them.
+    watched_fields: tuple[str, ...] = ()
+    # Options section holding the deadband of a numeric sensor, if it has one.
+    deadband_key: str | None = None
+    # Fields the value is computed from, the deadband only holds back changes
+    # to these alone.
+    value_fields: tuple[str, ...] = ()
 
     def __init__(
         self,
-        vehicle_id: int,
-        coordinator: XpengDataUpdateCoordinator,
+        vehicle_id: str,
+        coordinator: XpengVehicleCoordinator,
+        options: Mapping[str, Any] | None = None,
+        description: XpengEntityDescription | None = None,
     ) -> None:
         """Create base entity for Xpeng car data."""
         super().__init__(coordinator)
 
+        if description is not None:
+            self.entity_description = description
+            self.entity_name = description.name
+            self.watched_fields = description.watched_fields
+            self.deadband_key = description.deadband_key
+            self.value_fields = description.value_fields
         self._vehicle_id = vehicle_id
         display_name = (
             f"{self.vehicle.information.brand} {self.vehicle.information.model}"
@@ -44,8 +125,183 @@ class XpengEntity(CoordinatorEntity[XpengDataUpdateCoordinator]):
         )
         self._last_update_success: bool | None = None
         self.last_update_time: float | None = None
+        self._write_filter = (
+            StateWriteFilter.from_options(options or {}, self.deadband_key)
+            if self.deadband_key is not None
+            else None
+        )
+        self._written_value: Any = None
+        self._written_at: float | None = None
+        self._cancel_write: CALLBACK_TYPE | None = None
 
     @property
     def vehicle(self) -> Vehicle:
         """Returns the vehicle data assiciated with this entity."""
-        return self.coordinator.data[self._vehicle_id]
+        return self.coordinator.data
+
+    @property
+    def available(self) -> bool:
+        """Return whether the vehicle is still on the account."""
+        return super().available and self._vehicle_id in (
+            self.coordinator.fleet.data or {}
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Flag states that still come from the restored fleet snapshot."""
+        attributes = getattr(self, "_attr_extra_state_attributes", None)
+        if self.coordinator.fleet.stale:
+            return {**(attributes or {}), ATTR_STALE: True}
+        return attributes
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Compute the state from the vehicle data into the _attr_ attributes."""
+        description = getattr(self, "entity_description", None)
+        if isinstance(description, XpengEntityDescription) and (
+            description.attributes_fn is not None
+        ):
+            self._attr_extra_state_attributes = description.attributes_fn(
+                self.vehicle, self.coordinator.fleet
+            )
+
+    async def async_update(self) -> None:
+        """Refresh on user request, ahead of queued background requests."""
+        token = request_priority.set(RequestPriority.USER)
+        try:
+            await super().async_update()
+        finally:
+            request_priority.reset(token)
+
+    async def async_added_to_hass(self) -> None:
+        """Compute the first state before it is written."""
+        await super().async_added_to_hass()
+        self._async_update_attrs()
+        if self.deadband_key is not None:
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass,
+                    SIGNAL_OPTIONS_UPDATED.format(self.platform.config_entry.entry_id),
+                    self._async_options_updated,
+                )
+            )
+
+    @callback
+    def _async_options_updated(self, options: Mapping[str, Any]) -> None:
+        """Filter the following writes with the new options."""
+        self._write_filter = StateWriteFilter.from_options(options, self.deadband_key)
+        # Written right away, a wider deadband or shorter heartbeat counts from now.
+        self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel a pending deferred or heartbeat write."""
+        await super().async_will_remove_from_hass()
+        if self._cancel_write is not None:
+            self._cancel_write()
+            self._cancel_write = None
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state and remember it for the write filter."""
+        super().async_write_ha_state()
+        self.coordinator.fleet.metrics.record_state_write()
+        if self._write_filter is None:
+            return
+        self._written_value = getattr(self, "native_value", None)
+        self._written_at = time.monotonic()
+        if self._write_filter.heartbeat:
+            self._schedule_write(self._write_filter.heartbeat)
+        elif self._cancel_write is not None:
+            self._cancel_write()
+            self._cancel_write = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when availability or a watched field changed."""
+        available = self.coordinator.last_update_success
+        changes = self.coordinator.changes
+        affected = is_affected(self.watched_fields, changes)
+        if affected:
+            self._async_update_attrs()
+        if available == self._last_update_success:
+            if not affected:
+                return
+            if changes is not ALL_FIELDS and not self._write_allowed():
+                return
+        self._last_update_success = available
+        super()._handle_coordinator_update()
+
+    @callback
+    def _write_allowed(self) -> bool:
+        """Apply the write filter, deferring writes that come too soon."""
+        write_filter = self._write_filter
+        if write_filter is None or not write_filter.enabled:
+            return True
+        # Changes of other watched fields, e.g. to the icon or attributes, are
+        # written anyway.
+        other_fields = set(self.watched_fields).difference(self.value_fields)
+        value_only = self.coordinator.changes.isdisjoint(other_fields)
+        if value_only and not write_filter.outside_deadband(
+            self._written_value, getattr(self, "native_value", None)
+        ):
+            return False
+        if delay := write_filter.delay(self._written_at, time.monotonic()):
+            self._schedule_write(delay)
+            return False
+        return True
+
+    @callback
+    def _schedule_write(self, delay: float) -> None:
+        """Write the then current state after a delay."""
+        if self._cancel_write is not None:
+            self._cancel_write()
+        self._cancel_write = async_call_later(self.hass, delay, self._async_timed_write)
+
+    @callback
+    def _async_timed_write(self, _now: datetime) -> None:
+        """Write a deferred change or a heartbeat."""
+        self._cancel_write = None
+        self.async_write_ha_state()
+
+
+@callback
+def async_add_vehicle_entities(
+    entry: XpengConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+    entity_classes: tuple[XpengEntityFactory, ...],
+) -> None:
+    """Add entities for every vehicle, including vehicles linked later on."""
+    coordinator = entry.runtime_data.coordinator
+    user_id = entry.runtime_data.user_id
+    known_ids: set[str] = set()
+
+    @callback
+    def _async_add_new_vehicles() -> None:
+        """Create entities for vehicles that do not have them yet."""
+        vehicle_ids = (
+            coordinator.data.keys()
+            if user_id is None
+            else {
+                vehicle.id
+                for vehicle in coordinator.data.values()
+                if vehicle.user_id == user_id
+            }
+        )
+        known_ids.intersection_update(vehicle_ids)
+        new_ids = vehicle_ids - known_ids
+        if not new_ids:
+            return
+        known_ids.update(new_ids)
+        LOGGER.debug("Setting up %s for %s", entity_classes, new_ids)
+        async_add_entities(
+            (
+                entity_class(
+                    vehicle_id, coordinator.vehicles[vehicle_id], entry.options
+                )
+                for vehicle_id in new_ids
+                for entity_class in entity_classes
+            ),
+        )
+
+    _async_add_new_vehicles()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_new_vehicles))
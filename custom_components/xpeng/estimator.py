@@ -0,0 +1,189 @@
+"""Charging curves learned per vehicle, for values Enode leaves empty."""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .const import CHARGE_CURVE_SAVE_DELAY, DOMAIN, LOGGER, STORAGE_VERSION
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from homeassistant.core import HomeAssistant
+
+    from .enode_models import ChargeState, Vehicle
+
+# Battery level percent covered by each bin of a charging curve.
+SOC_BIN_WIDTH = 5
+SOC_BINS = 100 // SOC_BIN_WIDTH
+# Weight of a new sample once a bin has seen enough of them.
+EWMA_ALPHA = 0.2
+# Battery levels further apart in time are not used to derive a charge rate.
+MAX_DERIVE_GAP = 3600.0
+
+
+def _bin(level: float) -> int:
+    """Return the curve bin of a battery level."""
+    return min(max(int(level // SOC_BIN_WIDTH), 0), SOC_BINS - 1)
+
+
+class ChargeCurve:
+    """
+    Charging power of one vehicle by battery level, learned online.
+
+    Each bin keeps an exponentially weighted mean of the power observed at
+    its battery levels, so a sample costs constant time and memory. Power is
+    taken from the charge rate, or derived from how fast the battery level
+    rises when Enode leaves the charge rate empty.
+    """
+
+    __slots__ = ("_anchor", "_counts", "_power")
+
+    def __init__(self) -> None:
+        """Create a curve that has not learned anything yet."""
+        self._power = array("d", bytes(8 * SOC_BINS))
+        self._counts = array("I", bytes(4 * SOC_BINS))
+        # Timestamp and battery level a derived charge rate is measured from.
+        self._anchor: tuple[float, int] | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        """Return whether no bin has been learned yet."""
+        return not any(self._counts)
+
+    def update(self, charge_state: ChargeState) -> bool:
+        """Learn from a charge state sample, returning whether it was used."""
+        if charge_state.last_updated is None:
+            return False
+        seconds = charge_state.last_updated.timestamp()
+        level = charge_state.battery_level
+        anchor = self._anchor
+        if anchor is not None and seconds <= anchor[0]:
+            return False
+        if not charge_state.is_charging:
+            self._anchor = None
+            return False
+        if charge_state.charge_rate:
+            power: float | None = charge_state.charge_rate
+            observed_level = float(level)
+        elif anchor is None or seconds - anchor[0] > MAX_DERIVE_GAP:
+            power = None
+        elif level <= anchor[1]:
+            # Measure from when the battery reached its current level.
+            return False
+        else:
+            energy = (level - anchor[1]) / 100 * charge_state.battery_capacity
+            power = energy / ((seconds - anchor[0]) / 3600)
+            observed_level = (level + anchor[1]) / 2
+        self._anchor = (seconds, level)
+        if power is None:
+            return False
+        self._observe(observed_level, power)
+        return True
+
+    def _observe(self, level: float, power: float) -> None:
+        """Move the mean of a bin towards a power sample."""
+        index = _bin(level)
+        count = self._counts[index] + 1
+        self._counts[index] = count
+        # A plain mean until the bin has enough samples for the moving one.
+        self._power[index] += max(EWMA_ALPHA, 1 / count) * (power - self._power[index])
+
+    def power(self, level: float) -> float | None:
+        """Return the expected charging power at a battery level, in kW."""
+        index = _bin(level)
+        for offset in range(SOC_BINS):
+            for candidate in (index - offset, index + offset):
+                if 0 <= candidate < SOC_BINS and self._counts[candidate]:
+                    return self._power[candidate]
+        return None
+
+    def time_to_limit(self, charge_state: ChargeState) -> float | None:
+        """Return the expected minutes until the charge limit is reached."""
+        level = float(charge_state.battery_level)
+        limit = charge_state.charge_limit
+        hours = 0.0
+        while level < limit:
+            upper = min((_bin(level) + 1) * SOC_BIN_WIDTH, limit)
+            power = self.power(level)
+            if not power:
+                return None
+            hours += (upper - level) / 100 * charge_state.battery_capacity / power
+            level = upper
+        return hours * 60
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the learned bins, without the in progress measurement."""
+        return {
+            "power": [round(power, 2) for power in self._power],
+            "count": list(self._counts),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ChargeCurve:
+        """Create a curve from the output of as_dict."""
+        curve = cls()
+        if len(data["power"]) != SOC_BINS or len(data["count"]) != SOC_BINS:
+            msg = f"Expected {SOC_BINS} bins"
+            raise ValueError(msg)
+        curve._power = array("d", data["power"])
+        curve._counts = array("I", data["count"])
+        return curve
+
+
+class XpengChargeCurves:
+    """The charging curves of every vehicle of an Enode client, persisted."""
+
+    def __init__(self, hass: HomeAssistant, client_id: str) -> None:
+        """Create the curves of the given Enode client."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass,
+            STORAGE_VERSION,
+            f"{DOMAIN}.{slugify(client_id)}.charge_curves",
+            private=True,
+        )
+        self._curves: dict[str, ChargeCurve] = {}
+
+    async def async_load(self) -> None:
+        """Load the curves learned before the restart."""
+        data = await self._store.async_load() or {}
+        for vehicle_id, curve in data.items():
+            try:
+                self._curves[vehicle_id] = ChargeCurve.from_dict(curve)
+            except (KeyError, TypeError, ValueError, OverflowError) as exception:
+                LOGGER.warning(
+                    "Discarding charging curve of %s: %s", vehicle_id, exception
+                )
+
+    def get(self, vehicle_id: str) -> ChargeCurve | None:
+        """Return the curve of a vehicle, if it has one."""
+        return self._curves.get(vehicle_id)
+
+    @callback
+    def async_update(self, vehicles: Iterable[Vehicle]) -> None:
+        """Learn from the charge state of vehicles, saving what changed."""
+        learned = False
+        for vehicle in vehicles:
+            curve = self._curves.get(vehicle.id)
+            if curve is None:
+                curve = self._curves[vehicle.id] = ChargeCurve()
+            learned |= curve.update(vehicle.charge_state)
+        if learned:
+            self._store.async_delay_save(self._data_to_save, CHARGE_CURVE_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Delete the persisted curves."""
+        await self._store.async_remove()
+
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the curves that learned anything, by vehicle id."""
+        return {
+            vehicle_id: curve.as_dict()
+            for vehicle_id, curve in self._curves.items()
+            if not curve.is_empty
+        }
@@ -0,0 +1,118 @@
+"""Incremental decoding of a JSON array as the document arrives."""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from enum import Enum, auto
+from typing import Any
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _State(Enum):
+    """What the stream expects next."""
+
+    START = auto()
+    KEY = auto()
+    COLON = auto()
+    VALUE = auto()
+    ARRAY = auto()
+    END = auto()
+
+
+class JsonArrayStream:
+    """
+    Decode the elements of one array member of a JSON object as they arrive.
+
+    Every element is decoded on its own as soon as it is complete, so the
+    document is never held or decoded as a whole. The other members of the
+    object are decoded as usual and kept in members. Elements are decoded
+    with the C scanner of the json module, as orjson has no incremental
+    interface.
+    """
+
+    def __init__(self, key: str) -> None:
+        """Create a stream splitting out the array under the given key."""
+        self.members: dict[str, Any] = {}
+        self._key = key
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._raw_decode = json.JSONDecoder().raw_decode
+        self._buffer = ""
+        self._state = _State.START
+        self._member: str | None = None
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        """Add the next chunk of the document, returning completed elements."""
+        self._buffer += self._text.decode(chunk)
+        return self._parse(final=False)
+
+    def finish(self) -> list[Any]:
+        """Return the last elements, raising if the document is incomplete."""
+        self._buffer += self._text.decode(b"", final=True)
+        elements = self._parse(final=True)
+        if self._state is not _State.END:
+            msg = "Unexpected end of JSON document"
+            raise ValueError(msg)
+        return elements
+
+    def _parse(self, *, final: bool) -> list[Any]:
+        """Consume the buffer up to the first incomplete value."""
+        buffer = self._buffer
+        elements: list[Any] = []
+        pos = 0
+        while (pos := _WHITESPACE.match(buffer, pos).end()) < len(buffer):
+            if self._punctuation(buffer[pos]):
+                pos += 1
+                continue
+            # Values are only taken once something follows them, as a number
+            # at the end of the buffer may continue in the next chunk.
+            try:
+                value, end = self._raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            if end == len(buffer) and not final:
+                break
+            pos = end
+            self._value(value, elements)
+        self._buffer = buffer[pos:]
+        return elements
+
+    def _punctuation(self, char: str) -> bool:
+        """Follow the structure of the object, returning whether char is part of it."""
+        state = self._state
+        if state is _State.START and char == "{":
+            self._state = _State.KEY
+        elif state in (_State.KEY, _State.ARRAY) and char == ",":
+            pass
+        elif state is _State.KEY and char == "}":
+            self._state = _State.END
+        elif state is _State.ARRAY and char == "]":
+            self._state = _State.KEY
+        elif state is _State.COLON and char == ":":
+            self._state = _State.VALUE
+        elif state is _State.VALUE and char == "[" and self._member == self._key:
+            self._state = _State.ARRAY
+        elif state in (_State.KEY, _State.VALUE, _State.ARRAY) and char != ",":
+            return False
+        else:
+            msg = f"Unexpected {char!r} in JSON document"
+            raise ValueError(msg)
+        return True
+
+    def _value(self, value: Any, elements: list[Any]) -> None:
+        """Take a decoded key, member or element."""
+        if self._state is _State.ARRAY:
+            elements.append(value)
+        elif self._state is _State.VALUE:
+            self.members[self._member] = value
+            self._state = _State.KEY
+        elif isinstance(value, str):
+            self._member = value
+            self._state = _State.COLON
+        else:
+            msg = f"Expected a key in JSON document, got {value!r}"
+            raise ValueError(msg)
@@ -0,0 +1,159 @@
+"""Fixed memory performance metrics for the API client and coordinator."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Any
+
+# Upper bounds of the histogram buckets, values above the last one go into
+# an extra open ended bucket.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PARSE_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class Histogram:
+    """Bucketed distribution of observed values, in constant memory."""
+
+    __slots__ = ("_bounds", "_counts", "count", "maximum", "total")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        """Create an empty histogram with the given bucket upper bounds."""
+        self._bounds = bounds
+        self._counts = array("Q", bytes(8 * (len(bounds) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a value."""
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of the observed values."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, fraction: float) -> float | None:
+        """Return the upper bound of the bucket holding the given quantile."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self._bounds, self._counts, strict=False):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a summary and the bucket counts."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.maximum,
+            "buckets": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(self._bounds, self._counts, strict=False)
+                },
+                "le_inf": self._counts[-1],
+            },
+        }
+
+
+class XpengMetrics:
+    """Counters and histograms of one Enode client and its coordinator."""
+
+    def __init__(self) -> None:
+        """Start with empty counters."""
+        # Seconds per request attempt and per token fetch.
+        self.request_latency = Histogram(LATENCY_BUCKETS)
+        self.token_latency = Histogram(LATENCY_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+        # Seconds to decode a single vehicle.
+        self.parse_time = Histogram(PARSE_BUCKETS)
+        # Seconds per coordinator update and state writes it caused.
+        self.cycle_duration = Histogram(LATENCY_BUCKETS)
+        self.state_writes = Histogram(COUNT_BUCKETS)
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.decode_failures = 0
+        # Response bytes after and before removing the content encoding.
+        self.bytes_received = 0
+        self.wire_bytes = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.last_cycle_writes = 0
+        self._cycle_writes: int | None = None
+
+    def record_response(self, latency: float, size: int, wire_size: int) -> None:
+        """Count a completed request attempt."""
+        self.request_latency.observe(latency)
+        self.response_bytes.observe(size)
+        self.bytes_received += size
+        self.wire_bytes += wire_size
+
+    @property
+    def compression_ratio(self) -> float | None:
+        """Return the decoded bytes received per byte on the wire."""
+        if not self.wire_bytes:
+            return None
+        return self.bytes_received / self.wire_bytes
+
+    @property
+    def connection_reuse(self) -> float | None:
+        """Return the fraction of requests sent over an open connection."""
+        connections = self.connections_opened + self.connections_reused
+        if not connections:
+            return None
+        return self.connections_reused / connections
+
+    def record_state_write(self) -> None:
+        """Count an entity state write."""
+        if self._cycle_writes is not None:
+            self._cycle_writes += 1
+
+    def begin_cycle(self) -> None:
+        """Start counting the state writes of a coordinator update."""
+        self._cycle_writes = 0
+
+    def end_cycle(self) -> None:
+        """Record the state writes of the coordinator update."""
+        if self._cycle_writes is None:
+            return
+        self.last_cycle_writes = self._cycle_writes
+        self.state_writes.observe(self._cycle_writes)
+        self._cycle_writes = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return every counter and histogram."""
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "decode_failures": self.decode_failures,
+            "bytes_received": self.bytes_received,
+            "wire_bytes": self.wire_bytes,
+            "compression_ratio": self.compression_ratio,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "connection_reuse": self.connection_reuse,
+            "last_cycle_writes": self.last_cycle_writes,
+            "request_latency_s": self.request_latency.as_dict(),
+            "token_latency_s": self.token_latency.as_dict(),
+            "response_bytes": self.response_bytes.as_dict(),
+            "parse_time_per_vehicle_s": self.parse_time.as_dict(),
+            "cycle_duration_s": self.cycle_duration.as_dict(),
+            "state_writes_per_cycle": self.state_writes.as_dict(),
+        }
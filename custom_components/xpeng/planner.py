@@ -0,0 +1,302 @@
+"""Price aware charging plans for a whole fleet, computed with array maths."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+
+    from .enode_models import Vehicle
+
+# Charging power per ampere of charge current, on three phases at 230 V.
+KW_PER_AMP = 3 * 230 / 1000
+# Assumed charge current of vehicles that do not report their maximum.
+DEFAULT_MAX_CURRENT = 16
+# Energy below this is rounding noise, not demand.
+ENERGY_EPSILON = 1e-6
+
+# Attributes of price sensors holding the upcoming prices, as used by the
+# common electricity price integrations.
+PRICE_ATTRIBUTES = ("raw_today", "raw_tomorrow", "prices", "forecast", "rates")
+START_KEYS = ("start", "starts_at", "startsAt", "start_time", "hour", "time")
+END_KEYS = ("end", "ends_at", "endsAt", "end_time")
+PRICE_KEYS = ("value", "price", "total", "value_inc_vat")
+
+
+def _timestamp(value: Any) -> float | None:
+    """Return a datetime or ISO format string as a POSIX timestamp."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.timestamp()
+
+
+def _first(item: Mapping[str, Any], keys: tuple[str, ...]) -> Any:
+    """Return the value of the first key an item has."""
+    for key in keys:
+        if (value := item.get(key)) is not None:
+            return value
+    return None
+
+
+@dataclass(slots=True, frozen=True)
+class PriceSeries:
+    """Consecutive price slots, as POSIX timestamps sorted by start."""
+
+    starts: np.ndarray
+    ends: np.ndarray
+    prices: np.ndarray
+
+    @classmethod
+    def from_items(cls, items: Iterable[Mapping[str, Any]]) -> PriceSeries:
+        """
+        Create a series from price entries of any slot length.
+
+        Entries without an end run until the next entry starts, the last one
+        for as long as the one before it.
+        """
+        parsed: dict[float, tuple[float | None, float]] = {}
+        for item in items:
+            start = _timestamp(_first(item, START_KEYS))
+            price = _first(item, PRICE_KEYS)
+            if start is None or not isinstance(price, int | float):
+                continue
+            parsed[start] = (_timestamp(_first(item, END_KEYS)), float(price))
+        starts = np.array(sorted(parsed), dtype=float)
+        ends = np.array([parsed[start][0] or np.nan for start in starts], dtype=float)
+        prices = np.array([parsed[start][1] for start in starts], dtype=float)
+        if len(starts):
+            following = np.append(starts[1:], np.nan)
+            ends = np.where(np.isnan(ends), following, ends)
+            if np.isnan(ends[-1]):
+                ends[-1] = starts[-1] + (
+                    starts[-1] - starts[-2] if len(starts) > 1 else 3600
+                )
+        return cls(starts=starts, ends=ends, prices=prices)
+
+    @classmethod
+    def from_attributes(cls, attributes: Mapping[str, Any]) -> PriceSeries:
+        """Create a series from the attributes of a price sensor."""
+        items = []
+        for key in PRICE_ATTRIBUTES:
+            value = attributes.get(key)
+            if isinstance(value, list):
+                items.extend(item for item in value if isinstance(item, dict))
+        return cls.from_items(items)
+
+    def __len__(self) -> int:
+        """Return the number of slots."""
+        return len(self.starts)
+
+
+@dataclass(slots=True, frozen=True)
+class FleetDemand:
+    """Energy every vehicle needs and how fast it can take it, as arrays."""
+
+    vehicle_ids: tuple[str, ...]
+    # kWh up to the charge limit, and the part of it below the minimum
+    # charge limit that is charged straight away, regardless of price.
+    energy: np.ndarray
+    urgent_energy: np.ndarray
+    # kW while charging.
+    power: np.ndarray
+    # POSIX timestamp the energy is needed by.
+    deadlines: np.ndarray
+
+    @classmethod
+    def from_vehicles(cls, vehicles: Sequence[Vehicle], horizon: float) -> FleetDemand:
+        """Return the demand of plugged in vehicles, due by horizon by default."""
+        count = len(vehicles)
+
+        def _column(values: Iterable[float]) -> np.ndarray:
+            return np.fromiter(values, dtype=float, count=count)
+
+        plugged_in = _column(v.charge_state.is_plugged_in for v in vehicles)
+        level = _column(v.charge_state.battery_level for v in vehicles)
+        capacity = _column(v.charge_state.battery_capacity for v in vehicles) / 100
+        energy = np.clip(
+            _column(v.charge_state.charge_limit for v in vehicles) - level, 0, None
+        )
+        urgent = np.clip(
+            _column(v.smart_charging_policy.minimum_charge_limit for v in vehicles)
+            - level,
+            0,
+            energy,
+        )
+        return cls(
+            vehicle_ids=tuple(vehicle.id for vehicle in vehicles),
+            energy=energy * capacity * plugged_in,
+            urgent_energy=urgent * capacity * plugged_in,
+            power=_column(
+                v.charge_state.max_current or DEFAULT_MAX_CURRENT for v in vehicles
+            )
+            * KW_PER_AMP,
+            deadlines=_column(
+                min(deadline.timestamp(), horizon)
+                if (deadline := v.smart_charging_policy.deadline) is not None
+                else horizon
+                for v in vehicles
+            ),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class ChargePlan:
+    """Charging slots of every vehicle, rows follow FleetDemand.vehicle_ids."""
+
+    vehicle_ids: tuple[str, ...]
+    starts: np.ndarray
+    ends: np.ndarray
+    # Whether a vehicle charges in a slot, and the kWh it takes there.
+    selected: np.ndarray
+    charged: np.ndarray
+    cost: np.ndarray
+    shortfall: np.ndarray
+
+    def index(self, vehicle_id: str) -> int | None:
+        """Return the row of a vehicle, if it is part of the plan."""
+        try:
+            return self.vehicle_ids.index(vehicle_id)
+        except ValueError:
+            return None
+
+    def charging_at(self, when: float) -> np.ndarray:
+        """Return for every vehicle whether it charges at a point in time."""
+        slot = int(np.searchsorted(self.starts, when, side="right")) - 1
+        if slot < 0 or when >= self.ends[slot]:
+            return np.zeros(len(self.vehicle_ids), dtype=bool)
+        return self.selected[:, slot]
+
+    def next_change(self, after: float) -> float | None:
+        """Return the first slot boundary after a point in time."""
+        boundaries = np.union1d(self.starts, self.ends)
+        later = boundaries[boundaries > after]
+        return float(later[0]) if len(later) else None
+
+    def windows(self, row: int) -> list[tuple[float, float]]:
+        """Return the charging windows of a vehicle, adjacent slots merged."""
+        windows: list[tuple[float, float]] = []
+        for slot in np.flatnonzero(self.selected[row]):
+            start, end = float(self.starts[slot]), float(self.ends[slot])
+            if windows and windows[-1][1] == start:
+                windows[-1] = (windows[-1][0], end)
+            else:
+                windows.append((start, end))
+        return windows
+
+    def summary(self, row: int) -> dict[str, Any]:
+        """Return the plan of a vehicle as state attributes."""
+        return {
+            "plan": [
+                {
+                    "start": datetime.fromtimestamp(start, UTC).isoformat(),
+                    "end": datetime.fromtimestamp(end, UTC).isoformat(),
+                }
+                for start, end in self.windows(row)
+            ],
+            "planned_energy": round(float(self.charged[row].sum()), 2),
+            "planned_cost": round(float(self.cost[row]), 2),
+            "shortfall": round(float(self.shortfall[row]), 2),
+        }
+
+
+def _select(
+    cost: np.ndarray, slot_energy: np.ndarray, need: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Pick the cheapest slots of every vehicle until its need is covered."""
+    order = np.argsort(cost, axis=1, kind="stable")
+    sorted_energy = np.take_along_axis(slot_energy, order, axis=1)
+    before = np.cumsum(sorted_energy, axis=1) - sorted_energy
+    take = (before < need[:, None] - ENERGY_EPSILON) & np.isfinite(
+        np.take_along_axis(cost, order, axis=1)
+    )
+    selected = np.zeros_like(take)
+    np.put_along_axis(selected, order, take, axis=1)
+    charged = np.zeros_like(sorted_energy)
+    np.put_along_axis(
+        charged,
+        order,
+        np.where(take, np.minimum(sorted_energy, need[:, None] - before), 0.0),
+        axis=1,
+    )
+    return selected, charged
+
+
+def plan_charging(
+    prices: PriceSeries,
+    demand: FleetDemand,
+    now: float,
+    power_limit: float | None = None,
+) -> ChargePlan:
+    """
+    Plan the cheapest charging slots of every vehicle before its deadline.
+
+    Energy below the minimum charge limit goes into the earliest slots. With
+    a power limit in kW, slots where the fleet would draw more keep the
+    vehicles due first and the others move to their next cheapest slot,
+    until no slot is over the limit.
+    """
+    starts = np.maximum(prices.starts, now)
+    # Hours a vehicle can charge in each slot, cut short by its deadline.
+    hours = (
+        np.clip(
+            np.minimum(prices.ends[None, :], demand.deadlines[:, None])
+            - starts[None, :],
+            0,
+            None,
+        )
+        / 3600
+    )
+    slot_energy = demand.power[:, None] * hours
+    allowed = (slot_energy > 0) & (demand.energy > ENERGY_EPSILON)[:, None]
+    earlier = np.cumsum(np.where(allowed, slot_energy, 0.0), axis=1) - slot_energy
+    urgent = allowed & (earlier < demand.urgent_energy[:, None] - ENERGY_EPSILON)
+    price = np.broadcast_to(prices.prices, slot_energy.shape)
+    # Urgent slots cost less than any price, but stay finite to be selected.
+    # Being equal, the stable sort then takes them earliest first.
+    urgent_cost = prices.prices.min(initial=0.0) - 1.0
+    cost = np.where(allowed, np.where(urgent, urgent_cost, price), np.inf)
+    selected, charged = _select(cost, slot_energy, demand.energy)
+
+    if power_limit:
+        # Vehicles due first keep their slot when the fleet is over the limit.
+        priority = np.where(urgent, -np.inf, demand.deadlines[:, None])
+        power = np.broadcast_to(demand.power[:, None], slot_energy.shape)
+        # Every round takes at least one slot away from one vehicle.
+        for _ in range(int(allowed.sum())):
+            over = (selected * power).sum(axis=0) > power_limit + ENERGY_EPSILON
+            if not over.any():
+                break
+            order = np.argsort(
+                np.where(selected[:, over], priority[:, over], np.inf),
+                axis=0,
+                kind="stable",
+            )
+            load = np.cumsum(np.take_along_axis(power[:, over], order, axis=0), axis=0)
+            keep = np.zeros(order.shape, dtype=bool)
+            np.put_along_axis(keep, order, load <= power_limit + ENERGY_EPSILON, axis=0)
+            dropped = np.zeros_like(selected)
+            dropped[:, over] = selected[:, over] & ~keep
+            cost = np.where(dropped, np.inf, cost)
+            selected, charged = _select(cost, slot_energy, demand.energy)
+
+    return ChargePlan(
+        vehicle_ids=demand.vehicle_ids,
+        starts=starts,
+        ends=prices.ends,
+        selected=selected,
+        charged=charged,
+        cost=(charged * price).sum(axis=1),
+        shortfall=np.clip(demand.energy - charged.sum(axis=1), 0, None),
+    )
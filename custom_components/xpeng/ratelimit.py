@@ -0,0 +1,229 @@
+"""Rate limiting, prioritisation and backoff for Enode API requests."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import random
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import TYPE_CHECKING
+
+from .const import LOGGER
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+# Until Enode tells us its limits through response headers.
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 10
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30.0
+CIRCUIT_MAX_COOLDOWN = 600.0
+
+
+class RequestPriority(IntEnum):
+    """Priority of an API request, lower values are served first."""
+
+    USER = 0
+    BACKGROUND = 1
+
+
+# Lets callers such as a user requested entity update raise the priority of
+# the requests made on their behalf without passing it through every layer.
+request_priority: ContextVar[RequestPriority] = ContextVar(
+    "request_priority", default=RequestPriority.BACKGROUND
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when requests are refused after repeated failures."""
+
+
+class XpengRequestScheduler:
+    """
+    Hand out request slots from a token bucket in priority order.
+
+    The bucket is resized from the rate limit headers Enode returns. After
+    repeated failures the circuit opens and requests fail fast until a
+    single trial request succeeds again.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST) -> None:
+        """Create a scheduler with a full bucket."""
+        self._rate = rate
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated: float | None = None
+        self._paused_until = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._failures = 0
+        self._cooldown = CIRCUIT_COOLDOWN
+        self._open_until: float | None = None
+        self._trial_pending = False
+
+    async def async_acquire(self, priority: RequestPriority | None = None) -> bool:
+        """
+        Wait for a request slot, serving higher priorities first.
+
+        Returns whether the request is the trial of an open circuit, which
+        has to be released with release_trial whatever its outcome.
+        """
+        trial = self._check_circuit()
+        if priority is None:
+            priority = request_priority.get()
+        if not self._waiters and self._take():
+            return trial
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                # Hand the slot we were given to the next waiter.
+                self._tokens += 1
+                self._dispatch()
+            if trial:
+                self.release_trial()
+            raise
+        return trial
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Resize the bucket from the rate limit headers of a response."""
+        limit = _header_number(headers, "RateLimit-Limit")
+        remaining = _header_number(headers, "RateLimit-Remaining")
+        reset = _header_number(headers, "RateLimit-Reset")
+        if limit is None or remaining is None or not reset:
+            return
+        self._refill()
+        self._capacity = max(limit, 1.0)
+        self._tokens = min(self._tokens, remaining)
+        # Spread what is left of this window evenly over its remaining time.
+        self._rate = max(remaining / reset, limit / (reset * 10))
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out slots for a while, e.g. after a 429 response."""
+        loop = asyncio.get_running_loop()
+        self._paused_until = max(self._paused_until, loop.time() + seconds)
+        self._tokens = min(self._tokens, 0.0)
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        if self._open_until is not None:
+            LOGGER.info("Enode API recovered, closing circuit")
+        self._failures = 0
+        self._cooldown = CIRCUIT_COOLDOWN
+        self._open_until = None
+        self._trial_pending = False
+
+    def release_trial(self) -> None:
+        """Let the next request try the open circuit, if it is still open."""
+        self._trial_pending = False
+
+    def record_failure(self) -> None:
+        """Count a failed request and open the circuit when it keeps failing."""
+        self._failures += 1
+        loop = asyncio.get_running_loop()
+        if self._trial_pending:
+            self._trial_pending = False
+            self._cooldown = min(self._cooldown * 2, CIRCUIT_MAX_COOLDOWN)
+            self._open_until = loop.time() + self._cooldown
+        elif self._failures >= CIRCUIT_FAILURE_THRESHOLD and self._open_until is None:
+            LOGGER.warning(
+                "Enode API failed %s times in a row, pausing requests for %s s",
+                self._failures,
+                self._cooldown,
+            )
+            self._open_until = loop.time() + self._cooldown
+
+    @staticmethod
+    def backoff(attempt: int, retry_after: float | None = None) -> float:
+        """Return a jittered delay before retrying a failed request."""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, BACKOFF_BASE)  # noqa: S311
+        return random.uniform(0, min(BACKOFF_BASE * 2**attempt, BACKOFF_MAX))  # noqa: S311
+
+    def _check_circuit(self) -> bool:
+        """Fail fast while the circuit is open, returning whether this is a trial."""
+        if self._open_until is None:
+            return False
+        if self._trial_pending or asyncio.get_running_loop().time() < self._open_until:
+            msg = "Enode API circuit is open after repeated failures"
+            raise CircuitOpenError(msg)
+        self._trial_pending = True
+        return True
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = asyncio.get_running_loop().time()
+        if self._updated is not None and now > self._paused_until:
+            elapsed = now - max(self._updated, self._paused_until)
+            self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+        self._updated = now
+
+    def _take(self) -> bool:
+        """Take a token if one is available."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def _dispatch(self) -> None:
+        """Release waiters while tokens last and schedule the next wakeup."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._waiters:
+            _, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._take():
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+        if self._waiters:
+            loop = asyncio.get_running_loop()
+            delay = max(
+                (1 - self._tokens) / self._rate,
+                self._paused_until - loop.time(),
+            )
+            self._wakeup = loop.call_later(max(delay, 0.0), self._dispatch)
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> float | None:
+    """Return the Retry-After header in seconds, if present."""
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max((retry_at - datetime.now(tz=UTC)).total_seconds(), 0.0)
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> float | None:
+    """Return a numeric rate limit header, with or without the X- prefix."""
+    value = headers.get(name, headers.get(f"X-{name}"))
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
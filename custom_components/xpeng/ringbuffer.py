@@ -0,0 +1,62 @@
+"""Fixed size ring buffer of float rows."""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+class RingBuffer:
+    """
+    Buffer of fixed width float rows backed by a single preallocated array.
+
+    Once full the oldest rows are overwritten, so memory stays constant no
+    matter how many rows are appended.
+    """
+
+    __slots__ = ("_capacity", "_count", "_data", "_start", "_width")
+
+    def __init__(self, width: int, capacity: int) -> None:
+        """Allocate room for the given number of rows up front."""
+        self._width = width
+        self._capacity = capacity
+        self._data = array("d", bytes(8 * width * capacity))
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of buffered rows."""
+        return self._count
+
+    def __iter__(self) -> Iterator[tuple[float, ...]]:
+        """Yield the rows from oldest to newest."""
+        for offset in range(self._count):
+            yield self._row((self._start + offset) % self._capacity)
+
+    def append(self, *values: float) -> None:
+        """Add a row, overwriting the oldest one when full."""
+        index = (self._start + self._count) % self._capacity * self._width
+        self._data[index : index + self._width] = array("d", values)
+        if self._count < self._capacity:
+            self._count += 1
+        else:
+            self._start = (self._start + 1) % self._capacity
+
+    def last(self) -> tuple[float, ...] | None:
+        """Return the newest row, if any."""
+        if not self._count:
+            return None
+        return self._row((self._start + self._count - 1) % self._capacity)
+
+    def clear(self) -> None:
+        """Drop all rows, keeping the allocated memory."""
+        self._start = 0
+        self._count = 0
+
+    def _row(self, slot: int) -> tuple[float, ...]:
+        """Return the row stored in a slot."""
+        index = slot * self._width
+        return tuple(self._data[index : index + self._width])
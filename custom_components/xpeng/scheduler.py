@@ -0,0 +1,68 @@
+"""Per-vehicle refresh scheduling for xpeng."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .enode_models import Vehicle
+
+CHARGING_INTERVAL = timedelta(seconds=30)
+ACTIVE_INTERVAL = timedelta(minutes=1)
+PLUGGED_IN_INTERVAL = timedelta(minutes=5)
+IDLE_INTERVAL = timedelta(minutes=15)
+UNREACHABLE_INTERVAL = timedelta(minutes=1)
+MAX_UNREACHABLE_INTERVAL = timedelta(hours=1)
+MAX_BACKOFF_EXPONENT = 6
+# A vehicle seen this recently is probably being driven.
+ACTIVE_LAST_SEEN = timedelta(minutes=10)
+
+
+class XpengVehicleScheduler:
+    """Decide when each vehicle is due to be refreshed."""
+
+    def __init__(self) -> None:
+        """Create an empty schedule."""
+        self._due: dict[str, datetime] = {}
+        self._failures: dict[str, int] = {}
+
+    def interval_for(self, vehicle: Vehicle, now: datetime) -> timedelta:
+        """Return how long to wait before refreshing the vehicle again."""
+        if not vehicle.is_reachable:
+            return self._backoff(vehicle.id)
+        self._failures.pop(vehicle.id, None)
+        if vehicle.charge_state.is_charging:
+            return CHARGING_INTERVAL
+        if vehicle.last_seen and now - vehicle.last_seen < ACTIVE_LAST_SEEN:
+            return ACTIVE_INTERVAL
+        if vehicle.charge_state.is_plugged_in:
+            return PLUGGED_IN_INTERVAL
+        return IDLE_INTERVAL
+
+    def schedule(self, vehicle: Vehicle, now: datetime) -> None:
+        """Schedule the next refresh of a freshly fetched vehicle."""
+        self._due[vehicle.id] = now + self.interval_for(vehicle, now)
+
+    def schedule_failure(self, vehicle_id: str, now: datetime) -> None:
+        """Back off a vehicle whose refresh failed."""
+        self._due[vehicle_id] = now + self._backoff(vehicle_id)
+
+    def remove(self, vehicle_id: str) -> None:
+        """Forget a vehicle that is no longer on the account."""
+        self._due.pop(vehicle_id, None)
+        self._failures.pop(vehicle_id, None)
+
+    def due(self, now: datetime) -> list[str]:
+        """Return the ids of the vehicles that should be refreshed now."""
+        return [vehicle_id for vehicle_id, due in self._due.items() if due <= now]
+
+    def next_due(self) -> datetime | None:
+        """Return when the next vehicle becomes due, if any."""
+        return min(self._due.values(), default=None)
+
+    def _backoff(self, vehicle_id: str) -> timedelta:
+        """Return an exponentially growing interval for an unreachable vehicle."""
+        failures = self._failures.get(vehicle_id, 0)
+        self._failures[vehicle_id] = min(failures + 1, MAX_BACKOFF_EXPONENT)
+        return min(UNREACHABLE_INTERVAL * 2**failures, MAX_UNREACHABLE_INTERVAL)
@@ -2,16 +2,21 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
+    SensorEntityDescription,
     SensorStateClass,
 )
 from homeassistant.const import (
     PERCENTAGE,
-    #    UnitOfEnergy,
+    EntityCategory,
+    UnitOfEnergy,
+    UnitOfInformation,
     UnitOfLength,
     UnitOfPower,
     #    UnitOfPressure,
@@ -19,19 +24,35 @@ from homeassistant.const import (
     #    UnitOfTemperature,
     UnitOfTime,
 )
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.icon import icon_for_battery_level
-
-from .entity import XpengEntity
+from homeassistant.helpers.restore_state import ExtraStoredData
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .charging import ChargingSessionTracker
+from .const import ATTR_ESTIMATED, DOMAIN, EVENT_CHARGING_SESSION_ENDED, LOGGER
+from .coordinator import XpengDataUpdateCoordinator
+from .entity import (
+    XpengEntity,
+    XpengEntityDescription,
+    async_add_vehicle_entities,
+    described,
+)
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
     from homeassistant.core import HomeAssistant
     from homeassistant.helpers.entity_platform import AddEntitiesCallback
+    from homeassistant.helpers.typing import StateType
 
     from .data import XpengConfigEntry
-
-import logging
-
-_LOGGER = logging.getLogger(__name__)
+    from .enode_models import ChargeState, Vehicle
+    from .metrics import XpengMetrics
+    from .smart_charging import XpengChargePlanner
 
 
 async def async_setup_entry(
@@ -40,125 +61,416 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the sensor platform."""
-    entities = []
-    for vehicle_id, vehicle in enumerate(entry.runtime_data.client.vehicles):
-        _LOGGER.debug("Setting up sensors for %s", vehicle)
-        entities.append(XpengCarBattery(vehicle_id, entry.runtime_data.coordinator))
-        entities.append(
-            XpengCarBatteryTarget(vehicle_id, entry.runtime_data.coordinator)
-        )
-        entities.append(XpengCarRange(vehicle_id, entry.runtime_data.coordinator))
-        entities.append(XpengCarChargeRate(vehicle_id, entry.runtime_data.coordinator))
-        entities.append(
-            XpengCarChargeTimeRemaining(vehicle_id, entry.runtime_data.coordinator)
-        )
-
-    async_add_entities(entities, update_before_add=True)
-
-
-class XpengCarBattery(XpengEntity, SensorEntity):
-    """Representation of the Xpeng car battery sensor."""
-
-    entity_name = "battery"
-    _attr_device_class = SensorDeviceClass.BATTERY
-    _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_native_unit_of_measurement = PERCENTAGE
-    _attr_icon = "mdi:battery"
+    async_add_vehicle_entities(
+        entry,
+        async_add_entities,
+        (*described(XpengCarSensor, SENSORS), XpengCarChargeEnergy),
+    )
+    if entry.runtime_data.planner is not None:
+        async_add_vehicle_entities(entry, async_add_entities, (XpengCarChargePlan,))
+    async_add_entities(
+        XpengMetricSensor(entry, description) for description in METRIC_SENSORS
+    )
+
+
+def _battery_icon(vehicle: Vehicle) -> str:
+    """Return the battery icon for the level and charging state."""
+    return icon_for_battery_level(
+        battery_level=vehicle.charge_state.battery_level,
+        charging=vehicle.charge_state.is_charging,
+    )
+
+
+def _estimated(reported: float | None, charge_state: ChargeState) -> dict | None:
+    """Return the attributes flagging a value Enode left empty as estimated."""
+    if reported is not None or not charge_state.is_charging:
+        return None
+    return {ATTR_ESTIMATED: True}
+
+
+def _charge_rate(
+    vehicle: Vehicle, coordinator: XpengDataUpdateCoordinator
+) -> float | None:
+    """Return the charge rate, estimated when Enode leaves it empty."""
+    charge_state = vehicle.charge_state
+    if charge_state.charge_rate is not None or not charge_state.is_charging:
+        return charge_state.charge_rate or 0
+    curve = coordinator.curves and coordinator.curves.get(vehicle.id)
+    if curve is None or (power := curve.power(charge_state.battery_level)) is None:
+        return None
+    return round(power, 2)
+
+
+def _charge_time_remaining(
+    vehicle: Vehicle, coordinator: XpengDataUpdateCoordinator
+) -> float | None:
+    """Return the remaining time, estimated when Enode leaves it empty."""
+    charge_state = vehicle.charge_state
+    if charge_state.charge_time_remaining is not None or not charge_state.is_charging:
+        return charge_state.charge_time_remaining or 0
+    curve = coordinator.curves and coordinator.curves.get(vehicle.id)
+    if curve is None or (minutes := curve.time_to_limit(charge_state)) is None:
+        return None
+    return round(minutes)
+
+
+@dataclass(frozen=True, kw_only=True)
+class XpengSensorEntityDescription(SensorEntityDescription, XpengEntityDescription):
+    """Describes a sensor of a vehicle."""
+
+    value_fn: Callable[[Vehicle, XpengDataUpdateCoordinator], StateType]
+    icon_fn: Callable[[Vehicle], str] | None = None
+
+
+SENSORS = (
+    XpengSensorEntityDescription(
+        key="battery",
+        name="battery",
+        icon="mdi:battery",
+        device_class=SensorDeviceClass.BATTERY,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        deadband_key="battery",
+        value_fields=("charge_state.battery_level",),
+        watched_fields=("charge_state.battery_level", "charge_state.is_charging"),
+        # usable_battery_level matches the Xpeng app and car display
+        value_fn=lambda vehicle, _: vehicle.charge_state.battery_level,
+        icon_fn=_battery_icon,
+        attributes_fn=lambda vehicle, _: {
+            "raw_soc": vehicle.charge_state.battery_level
+        },
+    ),
+    XpengSensorEntityDescription(
+        key="battery_target",
+        name="battery target",
+        device_class=SensorDeviceClass.BATTERY,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        watched_fields=("charge_state.charge_limit",),
+        value_fn=lambda vehicle, _: vehicle.charge_state.charge_limit,
+        icon_fn=lambda vehicle: icon_for_battery_level(
+            battery_level=vehicle.charge_state.charge_limit
+        ),
+    ),
+    XpengSensorEntityDescription(
+        key="range",
+        name="range",
+        icon="mdi:gauge",
+        device_class=SensorDeviceClass.DISTANCE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfLength.KILOMETERS,
+        deadband_key="range",
+        value_fields=("charge_state.range",),
+        watched_fields=("charge_state.range",),
+        value_fn=lambda vehicle, _: vehicle.charge_state.range,
+    ),
+    XpengSensorEntityDescription(
+        key="charge_rate",
+        name="charge rate",
+        icon="mdi:flash",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        watched_fields=(
+            "charge_state.charge_rate",
+            "charge_state.battery_level",
+            "charge_state.is_charging",
+        ),
+        value_fn=_charge_rate,
+        attributes_fn=lambda vehicle, _: _estimated(
+            vehicle.charge_state.charge_rate, vehicle.charge_state
+        ),
+    ),
+    XpengSensorEntityDescription(
+        key="charge_time_remaining",
+        name="charge time remaining",
+        icon="mdi:flash",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MINUTES,
+        deadband_key="charge_time_remaining",
+        value_fields=(
+            "charge_state.charge_time_remaining",
+            "charge_state.battery_level",
+            "charge_state.charge_limit",
+        ),
+        watched_fields=(
+            "charge_state.charge_time_remaining",
+            "charge_state.battery_level",
+            "charge_state.charge_limit",
+            "charge_state.is_charging",
+        ),
+        value_fn=_charge_time_remaining,
+        attributes_fn=lambda vehicle, _: _estimated(
+            vehicle.charge_state.charge_time_remaining, vehicle.charge_state
+        ),
+    ),
+)
 
-    @staticmethod
-    def has_battery() -> bool:
-        """Return whether the device has a battery."""
-        return True
 
-    @property
-    def native_value(self) -> int:
-        """Return battery level."""
-        # usable_battery_level matches the Xpeng app and car display
-        return self.vehicle.charge_state.battery_level
+class XpengCarSensor(XpengEntity, SensorEntity):
+    """Representation of a Xpeng car sensor."""
+
+    entity_description: XpengSensorEntityDescription
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Compute the value and icon from the vehicle data."""
+        super()._async_update_attrs()
+        vehicle = self.vehicle
+        description = self.entity_description
+        self._attr_native_value = description.value_fn(vehicle, self.coordinator.fleet)
+        if description.icon_fn is not None:
+            self._attr_icon = description.icon_fn(vehicle)
+
+
+@dataclass
+class XpengChargingExtraStoredData(ExtraStoredData):
+    """Charging tracker state kept across restarts."""
+
+    tracker: dict[str, Any]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the tracker state."""
+        return self.tracker
+
+
+class XpengCarChargeEnergy(XpengEntity, RestoreSensor):
+    """Energy charged into the Xpeng car, integrated from the charge rate."""
+
+    entity_name = "charge energy"
+    watched_fields = (
+        "charge_state.last_updated",
+        "charge_state.is_charging",
+        "charge_state.is_plugged_in",
+    )
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_suggested_display_precision = 2
+    _attr_icon = "mdi:battery-charging"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Create the sensor with an empty charging tracker."""
+        super().__init__(*args, **kwargs)
+        self._tracker = ChargingSessionTracker()
+
+    async def async_added_to_hass(self) -> None:
+        """Continue counting from the state saved before the restart."""
+        await super().async_added_to_hass()
+        if (last := await self.async_get_last_extra_data()) is not None:
+            try:
+                self._tracker.restore(last.as_dict())
+            except (KeyError, TypeError, ValueError) as exception:
+                LOGGER.warning("Discarding saved charging state: %s", exception)
+        self._record()
+        self._async_update_attrs()
 
     @property
-    def icon(self) -> str:
-        """Return icon for the battery."""
-        charging = self.vehicle.charge_state.is_charging
-
-        return icon_for_battery_level(
-            battery_level=self.native_value, charging=charging
+    def extra_restore_state_data(self) -> XpengChargingExtraStoredData:
+        """Return the tracker state to save for the next start."""
+        return XpengChargingExtraStoredData(self._tracker.as_dict())
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Show the energy so far and the summary of the last finished session."""
+        super()._async_update_attrs()
+        self._attr_native_value = round(self._tracker.total_energy, 3)
+        self._attr_extra_state_attributes = (
+            {
+                "charging": self._tracker.in_session,
+                "last_session": self._tracker.last_session.as_dict(),
+            }
+            if self._tracker.last_session is not None
+            else None
         )
 
-    @property
-    def extra_state_attributes(self) -> dict:
-        """Return device state attributes."""
-        return {
-            "raw_soc": self.vehicle.charge_state.battery_level,
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Feed every new charge state sample to the tracker."""
+        self._record()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _record(self) -> None:
+        """Integrate the current charge state, announcing finished sessions."""
+        session = self._tracker.update(self.vehicle.charge_state)
+        if session is not None:
+            self.hass.bus.async_fire(
+                EVENT_CHARGING_SESSION_ENDED,
+                {"vehicle_id": self._vehicle_id, **session.as_dict()},
+            )
+
+
+class XpengCarChargePlan(XpengEntity, SensorEntity):
+    """Next planned charging start of the Xpeng car, with the whole plan."""
+
+    entity_name = "charge plan"
+    watched_fields = ("charge_state.is_plugged_in",)
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_icon = "mdi:calendar-clock"
+    _unrecorded_attributes = frozenset({"plan"})
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Create the sensor, the planner is attached once it is added."""
+        super().__init__(*args, **kwargs)
+        self._planner: XpengChargePlanner | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Write the state whenever the fleet was planned again."""
+        self._planner = self.platform.config_entry.runtime_data.planner
+        await super().async_added_to_hass()
+        self.async_on_remove(self._planner.async_add_listener(self._async_plan_updated))
+
+    @callback
+    def _async_plan_updated(self) -> None:
+        """Show the new plan."""
+        self._async_update_attrs()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Show when the current or next window starts, and the whole plan."""
+        super()._async_update_attrs()
+        self._attr_native_value = None
+        self._attr_extra_state_attributes = None
+        if self._planner is None or self._planner.plan is None:
+            return
+        plan = self._planner.plan
+        if (row := plan.index(self._vehicle_id)) is None:
+            return
+        now = dt_util.utcnow().timestamp()
+        self._attr_native_value = next(
+            (
+                dt_util.utc_from_timestamp(start)
+                for start, end in plan.windows(row)
+                if end > now
+            ),
+            None,
+        )
+        self._attr_extra_state_attributes = {
+            "price_entity": self._planner.price_entity,
+            **plan.summary(row),
         }
 
 
-class XpengCarBatteryTarget(XpengEntity, SensorEntity):
-    """Representation of the Xpeng car battery target charge level."""
-
-    entity_name = "battery target"
-    _attr_device_class = SensorDeviceClass.BATTERY
-    _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_native_unit_of_measurement = PERCENTAGE
-    _attr_icon = "mdi:battery"
-
-    @staticmethod
-    def has_battery() -> bool:
-        """Return whether the device has a battery."""
-        return True
-
-    @property
-    def native_value(self) -> int:
-        """Return battery level."""
-        # usable_battery_level matches the Xpeng app and car display
-        return self.vehicle.charge_state.charge_limit
-
-    @property
-    def icon(self) -> str:
-        """Return icon for the battery."""
-        return icon_for_battery_level(battery_level=self.native_value)
-
-
-class XpengCarRange(XpengEntity, SensorEntity):
-    """Representation of the Xpeng car range sensor."""
-
-    entity_name = "range"
-    _attr_device_class = SensorDeviceClass.DISTANCE
-    _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_native_unit_of_measurement = UnitOfLength.KILOMETERS
-    _attr_icon = "mdi:gauge"
-
-    @property
-    def native_value(self) -> float:
-        """Return range."""
-        return self.vehicle.charge_state.range
-
-
-class XpengCarChargeRate(XpengEntity, SensorEntity):
-    """Representation of the Xpeng car charging rate."""
-
-    entity_name = "charge rate"
-    _attr_device_class = SensorDeviceClass.POWER
-    _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
-    _attr_icon = "mdi:flash"
-
-    @property
-    def native_value(self) -> float:
-        """Return range."""
-        return self.vehicle.charge_state.charge_rate or 0
-
+def _milliseconds(seconds: float | None) -> float | None:
+    """Convert a latency in seconds to rounded milliseconds."""
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+@dataclass(frozen=True, kw_only=True)
+class XpengMetricSensorEntityDescription(SensorEntityDescription):
+    """Describes an Enode API metric sensor."""
+
+    value_fn: Callable[[XpengMetrics], StateType]
+
+
+METRIC_SENSORS = (
+    XpengMetricSensorEntityDescription(
+        key="request_latency_p95",
+        name="request latency p95",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: _milliseconds(metrics.request_latency.quantile(0.95)),
+    ),
+    XpengMetricSensorEntityDescription(
+        key="cycle_duration_p95",
+        name="update duration p95",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: _milliseconds(metrics.cycle_duration.quantile(0.95)),
+    ),
+    XpengMetricSensorEntityDescription(
+        key="requests",
+        name="requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.requests,
+    ),
+    XpengMetricSensorEntityDescription(
+        key="failures",
+        name="failed requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.failures,
+    ),
+    XpengMetricSensorEntityDescription(
+        key="retries",
+        name="retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.retries,
+    ),
+    XpengMetricSensorEntityDescription(
+        key="timeouts",
+        name="timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.timeouts,
+    ),
+    XpengMetricSensorEntityDescription(
+        key="bytes_received",
+        name="data received",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        suggested_unit_of_measurement=UnitOfInformation.KILOBYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.bytes_received,
+    ),
+    XpengMetricSensorEntityDescription(
+        key="wire_bytes",
+        name="data on the wire",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        suggested_unit_of_measurement=UnitOfInformation.KILOBYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.wire_bytes,
+    ),
+    XpengMetricSensorEntityDescription(
+        key="connection_reuse",
+        name="connection reuse",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda metrics: (
+            None
+            if (reuse := metrics.connection_reuse) is None
+            else round(reuse * 100, 1)
+        ),
+    ),
+    XpengMetricSensorEntityDescription(
+        key="state_writes",
+        name="state writes per update",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.last_cycle_writes,
+    ),
+)
 
-class XpengCarChargeTimeRemaining(XpengEntity, SensorEntity):
-    """Representation of the Xpeng remaining charge time."""
 
-    entity_name = "charge time remaining"
-    _attr_device_class = SensorDeviceClass.DURATION
-    _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_native_unit_of_measurement = UnitOfTime.MINUTES
-    _attr_icon = "mdi:flash"
+class XpengMetricSensor(CoordinatorEntity[XpengDataUpdateCoordinator], SensorEntity):
+    """Performance metric of the Enode API client, disabled by default."""
+
+    entity_description: XpengMetricSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        entry: XpengConfigEntry,
+        description: XpengMetricSensorEntityDescription,
+    ) -> None:
+        """Create a metric sensor on the service device of the entry."""
+        super().__init__(entry.runtime_data.coordinator)
+        self.entity_description = description
+        self._attr_name = f"Enode {description.name}"
+        self._attr_unique_id = slugify(f"{entry.entry_id} {description.key}")
+        self._attr_device_info = DeviceInfo(
+            name=f"Enode {entry.title}",
+            identifiers={(DOMAIN, entry.entry_id)},
+            manufacturer="Enode",
+            entry_type=DeviceEntryType.SERVICE,
+        )
 
     @property
-    def native_value(self) -> float:
-        """Return range."""
-        return self.vehicle.charge_state.charge_time_remaining or 0
+    def native_value(self) -> StateType:
+        """Return the current value of the metric."""
+        return self.entity_description.value_fn(self.coordinator.metrics)
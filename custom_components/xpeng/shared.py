@@ -0,0 +1,264 @@
+"""Enode accounts shared by config entries with the same client credentials."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import CONF_CLIENT_ID, CONF_CLIENT_SECRET
+from homeassistant.core import callback
+from homeassistant.exceptions import (
+    ConfigEntryAuthFailed,
+    ConfigEntryError,
+    ConfigEntryNotReady,
+)
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+from homeassistant.util.ssl import get_default_context
+
+from .api import (
+    XpengApiClient,
+    XpengApiClientAuthenticationError,
+    XpengApiClientError,
+)
+from .const import DOMAIN, LOGGER, STORAGE_VERSION
+from .coordinator import XpengDataUpdateCoordinator
+from .estimator import XpengChargeCurves
+from .metrics import XpengMetrics
+from .snapshot import XpengFleetSnapshot
+from .transport import create_session
+from .webhook import async_setup_webhook
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from homeassistant.core import HomeAssistant
+
+    from .data import XpengConfigEntry
+
+
+def token_store(hass: HomeAssistant, client_id: str) -> Store:
+    """Return the store holding the oauth token of an Enode client."""
+    return Store(
+        hass, STORAGE_VERSION, f"{DOMAIN}.{slugify(client_id)}.token", private=True
+    )
+
+
+@dataclass
+class XpengAccount:
+    """One Enode client with its token, poll loop and parsed fleet."""
+
+    client: XpengApiClient
+    coordinator: XpengDataUpdateCoordinator
+    # Entries sharing the account have to agree on it.
+    client_secret: str
+    _on_release: list[Callable[[], Any]] = field(default_factory=list)
+
+    def async_on_release(self, func: Callable[[], Any]) -> None:
+        """Call a function, sync or async, when the last entry unsubscribes."""
+        self._on_release.append(func)
+
+    async def async_release(self) -> None:
+        """Stop polling and run the release callbacks."""
+        await self.coordinator.async_shutdown()
+        while self._on_release:
+            result = self._on_release.pop()()
+            if inspect.isawaitable(result):
+                await result
+        self.client.shutdown()
+
+
+class XpengAccountRegistry:
+    """Hands out one shared account per Enode client id, reference counted."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Create an empty registry."""
+        self._hass = hass
+        self._accounts: dict[str, XpengAccount] = {}
+        self._lock = asyncio.Lock()
+
+    async def async_subscribe(self, entry: XpengConfigEntry) -> XpengAccount:
+        """Return the account for an entry, creating it for the first one."""
+        client_id = entry.data[CONF_CLIENT_ID]
+        async with self._lock:
+            account = self._accounts.get(client_id)
+            if account is None:
+                account = await self._async_create_account(entry)
+                self._accounts[client_id] = account
+            elif account.client_secret != entry.data[CONF_CLIENT_SECRET]:
+                msg = f"Client secret differs from the other entries of {client_id}"
+                raise ConfigEntryError(msg)
+            else:
+                LOGGER.debug("Sharing Enode client %s with %s", client_id, entry.title)
+            account.coordinator.entry_ids.add(entry.entry_id)
+            return account
+
+    async def async_unsubscribe(self, entry: XpengConfigEntry) -> None:
+        """Drop an entry from its account and release it after the last one."""
+        client_id = entry.data[CONF_CLIENT_ID]
+        async with self._lock:
+            account = self._accounts.get(client_id)
+            if account is None:
+                return
+            account.coordinator.entry_ids.discard(entry.entry_id)
+            if not account.coordinator.entry_ids:
+                del self._accounts[client_id]
+                await account.async_release()
+
+    def is_in_use(self, client_id: str) -> bool:
+        """Return whether an entry still uses the given client id."""
+        return client_id in self._accounts
+
+    async def _async_create_account(self, entry: XpengConfigEntry) -> XpengAccount:
+        """
+        Authenticate, fetch the fleet and start receiving updates.
+
+        When a snapshot of the fleet exists the account is handed out right
+        away with that snapshot, and the fleet is fetched in the background.
+        The token is fetched while the snapshot and curves are loaded.
+        """
+        start = time.perf_counter()
+        metrics = XpengMetrics()
+        # A session of its own, so connections to Enode are kept alive and
+        # the transfer can be measured.
+        session = create_session(metrics, get_default_context(), SERVER_SOFTWARE)
+        client = XpengApiClient(
+            client_id=entry.data[CONF_CLIENT_ID],
+            client_secret=entry.data[CONF_CLIENT_SECRET],
+            session=session,
+            token_store=token_store(self._hass, entry.data[CONF_CLIENT_ID]),
+            metrics=metrics,
+            # Pages are decoded while they arrive, for hosts short on memory.
+            streaming=True,
+        )
+        token = self._hass.async_create_task(
+            _async_prefetch_token(client),
+            f"{DOMAIN} token of {entry.data[CONF_CLIENT_ID]}",
+        )
+        snapshot = XpengFleetSnapshot(self._hass, entry.data[CONF_CLIENT_ID])
+        curves = XpengChargeCurves(self._hass, entry.data[CONF_CLIENT_ID])
+        vehicles, _ = await asyncio.gather(snapshot.async_load(), curves.async_load())
+        loaded = time.perf_counter()
+        coordinator = XpengDataUpdateCoordinator(
+            hass=self._hass,
+            logger=LOGGER,
+            name=DOMAIN,
+            client=client,
+            snapshot=snapshot,
+            curves=curves,
+        )
+        account = XpengAccount(
+            client=client,
+            coordinator=coordinator,
+            client_secret=entry.data[CONF_CLIENT_SECRET],
+        )
+        # Released last, after everything that may still send a request.
+        account.async_on_release(session.close)
+        account.async_on_release(token.cancel)
+
+        if vehicles is not None:
+            coordinator.async_restore(vehicles)
+            task = self._hass.async_create_background_task(
+                self._async_revalidate(entry, account, token),
+                f"{DOMAIN} refresh of {entry.data[CONF_CLIENT_ID]}",
+            )
+            account.async_on_release(task.cancel)
+            LOGGER.debug(
+                "Restored %s vehicles of %s in %.3f s",
+                len(vehicles),
+                entry.data[CONF_CLIENT_ID],
+                loaded - start,
+            )
+            return account
+
+        try:
+            # Reuses the persisted token when it is still valid, so a restart
+            # or reload does not wait on the OAuth round-trip. Fetched again
+            # here when the prefetch failed, to raise why.
+            await token
+            await client.async_get_token()
+            authenticated = time.perf_counter()
+            # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
+            await coordinator.async_first_refresh()
+            refreshed = time.perf_counter()
+            if await async_setup_webhook(self._hass, entry, account):
+                coordinator.async_enable_push()
+        except XpengApiClientAuthenticationError as exception:
+            await account.async_release()
+            raise ConfigEntryAuthFailed(exception) from exception
+        except XpengApiClientError as exception:
+            await account.async_release()
+            raise ConfigEntryNotReady(exception) from exception
+        except Exception:
+            await account.async_release()
+            raise
+        LOGGER.debug(
+            "Fetched %s vehicles of %s in %.3f s: storage %.3f s, token %.3f s, "
+            "fleet %.3f s, webhook %.3f s",
+            len(coordinator.data),
+            entry.data[CONF_CLIENT_ID],
+            time.perf_counter() - start,
+            loaded - start,
+            authenticated - loaded,
+            refreshed - authenticated,
+            time.perf_counter() - refreshed,
+        )
+        return account
+
+    async def _async_revalidate(
+        self,
+        entry: XpengConfigEntry,
+        account: XpengAccount,
+        token: asyncio.Task[None],
+    ) -> None:
+        """Replace the restored fleet with live data and start receiving pushes."""
+        start = time.perf_counter()
+        await token
+        await account.coordinator.async_refresh()
+        LOGGER.debug(
+            "Refreshed the restored fleet of %s in %.3f s",
+            entry.data[CONF_CLIENT_ID],
+            time.perf_counter() - start,
+        )
+        if not account.coordinator.last_update_success:
+            LOGGER.warning(
+                "Unable to refresh the fleet, showing the last known state: %s",
+                account.coordinator.last_exception,
+            )
+            await _async_wait_for_refresh(account.coordinator)
+        if await async_setup_webhook(self._hass, entry, account):
+            account.coordinator.async_enable_push()
+
+
+async def _async_wait_for_refresh(coordinator: XpengDataUpdateCoordinator) -> None:
+    """Wait until the coordinator refreshed successfully."""
+    refreshed = asyncio.Event()
+
+    @callback
+    def _async_check_refresh() -> None:
+        if coordinator.last_update_success:
+            refreshed.set()
+
+    remove_listener = coordinator.async_add_listener(_async_check_refresh)
+    try:
+        await refreshed.wait()
+    finally:
+        remove_listener()
+
+
+async def _async_prefetch_token(client: XpengApiClient) -> None:
+    """Get a token ahead of the first refresh, which tries again on failure."""
+    with contextlib.suppress(XpengApiClientError):
+        await client.async_get_token()
+
+
+def async_get_registry(hass: HomeAssistant) -> XpengAccountRegistry:
+    """Return the account registry stored under hass.data[DOMAIN]."""
+    if DOMAIN not in hass.data:
+        hass.data[DOMAIN] = XpengAccountRegistry(hass)
+    return hass.data[DOMAIN]
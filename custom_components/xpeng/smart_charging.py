@@ -0,0 +1,209 @@
+"""Charging plans of a config entry, following an electricity price sensor."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import (
+    async_track_point_in_utc_time,
+    async_track_state_change_event,
+)
+from homeassistant.util import dt as dt_util
+
+from .actions import ActionKind
+from .const import (
+    CONF_CHARGE_CONTROL,
+    CONF_POWER_LIMIT,
+    CONF_PRICE_ENTITY,
+    CONF_SMART_CHARGING,
+    LOGGER,
+)
+from .entity import is_affected
+from .planner import ChargePlan, FleetDemand, PriceSeries, plan_charging
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from datetime import datetime
+
+    import numpy as np
+    from homeassistant.core import CALLBACK_TYPE, Event, EventStateChangedData
+
+    from .data import XpengConfigEntry
+
+# Vehicle fields a charging plan depends on.
+PLAN_FIELDS = (
+    "charge_state.battery_level",
+    "charge_state.battery_capacity",
+    "charge_state.charge_limit",
+    "charge_state.is_plugged_in",
+    "charge_state.max_current",
+    "smart_charging_policy.deadline",
+    "smart_charging_policy.minimum_charge_limit",
+)
+
+
+class XpengChargePlanner:
+    """
+    Keep a charging plan for the vehicles of an entry, planned on prices.
+
+    The fleet is planned again when the price sensor or a planned vehicle
+    changes. With charge control enabled, charging of plugged in vehicles is
+    started and stopped through the action queue at the slot boundaries.
+    """
+
+    def __init__(self, entry: XpengConfigEntry) -> None:
+        """Create a planner from the smart charging options of an entry."""
+        self._entry = entry
+        self._read_options()
+        self.plan: ChargePlan | None = None
+        self._listeners: list[CALLBACK_TYPE] = []
+        self._cancel_timer: CALLBACK_TYPE | None = None
+        self._unsubscribe_prices: CALLBACK_TYPE | None = None
+
+    def _read_options(self) -> None:
+        """Take the smart charging options of the entry."""
+        options = self._entry.options.get(CONF_SMART_CHARGING, {})
+        self.price_entity: str = options[CONF_PRICE_ENTITY]
+        self._power_limit: float = options.get(CONF_POWER_LIMIT, 0.0)
+        self._control: bool = options.get(CONF_CHARGE_CONTROL, False)
+
+    @callback
+    def async_start(self) -> Callable[[], None]:
+        """Plan now and follow the price sensor and the coordinator."""
+        unsubscribe_vehicles = self._entry.runtime_data.coordinator.async_add_listener(
+            self._async_vehicles_changed
+        )
+        self._async_track_prices()
+        self.async_replan()
+
+        @callback
+        def _stop() -> None:
+            unsubscribe_vehicles()
+            if self._unsubscribe_prices is not None:
+                self._unsubscribe_prices()
+                self._unsubscribe_prices = None
+            self._cancel()
+
+        return _stop
+
+    @callback
+    def async_update_options(self) -> None:
+        """Plan again on changed options, following a new price sensor."""
+        price_entity = self.price_entity
+        self._read_options()
+        if self.price_entity != price_entity:
+            self._async_track_prices()
+        self.async_replan()
+
+    @callback
+    def _async_track_prices(self) -> None:
+        """Follow the state of the price sensor."""
+        if self._unsubscribe_prices is not None:
+            self._unsubscribe_prices()
+        self._unsubscribe_prices = async_track_state_change_event(
+            self._entry.runtime_data.coordinator.hass,
+            self.price_entity,
+            self._async_price_changed,
+        )
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Call back whenever the plan changed."""
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+
+    @callback
+    def async_replan(self) -> None:
+        """Plan every vehicle of the entry on the current prices."""
+        runtime_data = self._entry.runtime_data
+        coordinator = runtime_data.coordinator
+        state = coordinator.hass.states.get(self.price_entity)
+        prices = PriceSeries.from_attributes(state.attributes if state else {})
+        if not len(prices):
+            LOGGER.debug("No prices in %s, not planning", self.price_entity)
+            self.plan = None
+        else:
+            vehicles = [
+                vehicle
+                for vehicle in (coordinator.data or {}).values()
+                if runtime_data.user_id in (None, vehicle.user_id)
+            ]
+            self.plan = plan_charging(
+                prices,
+                FleetDemand.from_vehicles(vehicles, float(prices.ends[-1])),
+                dt_util.utcnow().timestamp(),
+                self._power_limit or None,
+            )
+        self._async_notify()
+        self._async_follow_plan()
+
+    @callback
+    def _async_notify(self) -> None:
+        """Tell the listeners that the plan changed."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def _async_price_changed(self, _event: Event[EventStateChangedData]) -> None:
+        """Plan again on new prices."""
+        self.async_replan()
+
+    @callback
+    def _async_vehicles_changed(self) -> None:
+        """Plan again when a vehicle changed in a way that affects its plan."""
+        changes = self._entry.runtime_data.coordinator.changes
+        if any(is_affected(PLAN_FIELDS, change) for change in changes.values()):
+            self.async_replan()
+
+    @callback
+    def _async_slot_started(self, _now: datetime) -> None:
+        """Move on to the next slot of the plan."""
+        self._async_notify()
+        self._async_follow_plan()
+
+    @callback
+    def _async_follow_plan(self) -> None:
+        """Start or stop charging as planned, until the next slot boundary."""
+        self._cancel()
+        if self.plan is None:
+            return
+        now = dt_util.utcnow().timestamp()
+        if self._control:
+            self._async_control(self.plan.charging_at(now))
+        if (next_change := self.plan.next_change(now)) is not None:
+            self._cancel_timer = async_track_point_in_utc_time(
+                self._entry.runtime_data.coordinator.hass,
+                self._async_slot_started,
+                dt_util.utc_from_timestamp(next_change),
+            )
+
+    @callback
+    def _async_control(self, charging: np.ndarray) -> None:
+        """Queue start and stop actions for vehicles not charging as planned."""
+        coordinator = self._entry.runtime_data.coordinator
+        for vehicle_id, planned in zip(
+            self.plan.vehicle_ids, charging.tolist(), strict=True
+        ):
+            vehicle = coordinator.data.get(vehicle_id)
+            if vehicle is None or not vehicle.charge_state.is_plugged_in:
+                continue
+            capabilities = vehicle.capabilities
+            if not (
+                capabilities.start_charging.is_capable
+                and capabilities.stop_charging.is_capable
+            ):
+                continue
+            desired = coordinator.actions.desired(vehicle_id, ActionKind.CHARGING)
+            current = vehicle.charge_state.is_charging if desired is None else desired
+            if current != planned:
+                coordinator.actions.async_request(
+                    vehicle_id, ActionKind.CHARGING, planned
+                )
+
+    @callback
+    def _cancel(self) -> None:
+        """Cancel the timer of the next slot boundary."""
+        if self._cancel_timer is not None:
+            self._cancel_timer()
+            self._cancel_timer = None
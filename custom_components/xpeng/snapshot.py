@@ -0,0 +1,67 @@
+"""Last known fleet, persisted so entities come up without waiting on Enode."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN, LOGGER, SNAPSHOT_SAVE_DELAY, STORAGE_VERSION
+from .enode_models import Vehicle
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+
+class XpengFleetSnapshot:
+    """
+    The fleet of an Enode client as of the last successful update.
+
+    Saves are debounced through the store, so a burst of polls and pushed
+    updates only costs a single write of the latest fleet.
+    """
+
+    def __init__(self, hass: HomeAssistant, client_id: str) -> None:
+        """Create the snapshot of the given Enode client."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass,
+            STORAGE_VERSION,
+            f"{DOMAIN}.{slugify(client_id)}.snapshot",
+            private=True,
+        )
+        self._vehicles: dict[str, Vehicle] = {}
+
+    async def async_load(self) -> dict[str, Vehicle] | None:
+        """Return the persisted fleet keyed by vehicle id, if there is one."""
+        data = await self._store.async_load()
+        if not data:
+            return None
+        try:
+            vehicles = [Vehicle.from_json(vehicle) for vehicle in data["vehicles"]]
+        except (KeyError, TypeError, ValueError) as exception:
+            LOGGER.warning("Discarding unreadable fleet snapshot: %s", exception)
+            return None
+        LOGGER.debug(
+            "Restored %s vehicles saved at %s", len(vehicles), data.get("saved_at")
+        )
+        return {vehicle.id: vehicle for vehicle in vehicles}
+
+    @callback
+    def async_schedule_save(self, vehicles: dict[str, Vehicle]) -> None:
+        """Save the fleet once updates have settled."""
+        self._vehicles = vehicles
+        self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Delete the persisted fleet."""
+        await self._store.async_remove()
+
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the latest fleet in the Enode wire format."""
+        return {
+            "saved_at": dt_util.utcnow().isoformat(),
+            "vehicles": [vehicle.to_json() for vehicle in self._vehicles.values()],
+        }
@@ -0,0 +1,71 @@
+"""Xpeng switches."""
+
+from typing import Any
+
+from homeassistant.components.switch import SwitchEntity
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .actions import ActionKind
+from .data import XpengConfigEntry
+from .entity import XpengEntity, async_add_vehicle_entities
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,  # noqa: ARG001 Unused function argument: `hass`
+    entry: XpengConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the switch platform."""
+    async_add_vehicle_entities(entry, async_add_entities, (XpengCarChargingSwitch,))
+
+
+class XpengCarChargingSwitch(XpengEntity, SwitchEntity):
+    """Representation of Xpeng car charging switch."""
+
+    entity_name = "charge"
+    watched_fields = ("charge_state.is_charging",)
+    _attr_icon = "mdi:ev-station"
+
+    async def async_added_to_hass(self) -> None:
+        """Write the state again once queued actions have finished."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.fleet.actions.async_subscribe(
+                self._vehicle_id, self.async_write_ha_state
+            )
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return whether the vehicle can start and stop charging."""
+        capabilities = self.vehicle.capabilities if super().available else None
+        return (
+            capabilities is not None
+            and capabilities.start_charging.is_capable
+            and capabilities.stop_charging.is_capable
+        )
+
+    @property
+    def is_on(self) -> bool:
+        """Return the requested state while it is being sent to the vehicle."""
+        desired = self.coordinator.fleet.actions.desired(
+            self._vehicle_id, ActionKind.CHARGING
+        )
+        if desired is not None:
+            return desired
+        return self.vehicle.charge_state.is_charging
+
+    async def async_turn_on(self, **kwargs: Any) -> None:  # noqa: ARG002
+        """Start charging."""
+        self.coordinator.fleet.actions.async_request(
+            self._vehicle_id, ActionKind.CHARGING, value=True
+        )
+        self.async_write_ha_state()
+
+    async def async_turn_off(self, **kwargs: Any) -> None:  # noqa: ARG002
+        """Stop charging."""
+        self.coordinator.fleet.actions.async_request(
+            self._vehicle_id, ActionKind.CHARGING, value=False
+        )
+        self.async_write_ha_state()
@@ -0,0 +1,64 @@
+"""Deadband and rate limiting of numeric state writes."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from .const import (
+    CONF_DEADBAND,
+    CONF_DEADBAND_TYPE,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_MIN_WRITE_INTERVAL,
+    DEADBAND_PERCENT,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+
+@dataclass(slots=True, frozen=True)
+class StateWriteFilter:
+    """
+    Decide whether a new numeric value is worth a state write.
+
+    Values within the deadband of the last written value are dropped, writes
+    are spaced at least min_interval seconds apart, and a heartbeat forces a
+    write every heartbeat seconds. Zero disables each of them.
+    """
+
+    deadband: float = 0.0
+    percent: bool = False
+    min_interval: float = 0.0
+    heartbeat: float = 0.0
+
+    @classmethod
+    def from_options(cls, options: Mapping[str, Any], key: str) -> StateWriteFilter:
+        """Create the filter of a sensor from the config entry options."""
+        section = options.get(key, {})
+        return cls(
+            deadband=section.get(CONF_DEADBAND, 0.0),
+            percent=section.get(CONF_DEADBAND_TYPE) == DEADBAND_PERCENT,
+            min_interval=options.get(CONF_MIN_WRITE_INTERVAL, 0.0),
+            heartbeat=options.get(CONF_HEARTBEAT_INTERVAL, 0.0),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether the filter drops any writes at all."""
+        return bool(self.deadband or self.min_interval)
+
+    def outside_deadband(self, written: Any, value: Any) -> bool:
+        """Return whether a value moved far enough from the written one."""
+        if not isinstance(written, int | float) or not isinstance(value, int | float):
+            return written != value
+        threshold = self.deadband
+        if self.percent:
+            threshold = abs(written) * self.deadband / 100
+        return abs(value - written) > threshold
+
+    def delay(self, written_at: float | None, now: float) -> float:
+        """Return how long a write has to wait for the minimum interval."""
+        if written_at is None:
+            return 0.0
+        return max(written_at + self.min_interval - now, 0.0)
@@ -0,0 +1,168 @@
+"""Dedicated HTTP transport for the Enode API hosts."""
+
+from __future__ import annotations
+
+import zlib
+from typing import TYPE_CHECKING
+
+import aiohttp
+from aiohttp import hdrs
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+if TYPE_CHECKING:
+    import ssl
+    from collections.abc import AsyncIterator, Callable
+    from types import SimpleNamespace
+
+    from .metrics import XpengMetrics
+
+# Connections kept open to a single Enode host and to all of them, requests
+# beyond that wait for a free connection.
+CONNECTIONS_PER_HOST = 8
+CONNECTION_LIMIT = 16
+# Seconds an idle connection is kept open for the next request.
+KEEPALIVE_TIMEOUT = 60
+# Seconds a resolved Enode host name is reused.
+DNS_CACHE_TTL = 300
+# Bytes read from the connection at a time when a body is streamed.
+READ_CHUNK_SIZE = 65536
+
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+_DECODE_ERRORS = (zlib.error,) if brotli is None else (zlib.error, brotli.error)
+
+
+class ContentDecodeError(Exception):
+    """A response body that does not match its content encoding."""
+
+
+class ContentDecoder:
+    """Remove the content encoding of a body that arrives in chunks."""
+
+    def __init__(self, encoding: str | None) -> None:
+        """Create a decoder for the value of a Content-Encoding header."""
+        self._encoding = encoding = (encoding or "identity").strip().lower()
+        self._decompress: Callable[[bytes], bytes] | None = None
+        self._flush: Callable[[], bytes] | None = None
+        if encoding in ("gzip", "deflate"):
+            # Deflate bodies detect a zlib or gzip header, raw deflate is not
+            # accepted. Gzip bodies have to carry the gzip header.
+            decompressor = zlib.decompressobj(
+                wbits=(16 if encoding == "gzip" else 32) + zlib.MAX_WBITS
+            )
+            self._decompress = decompressor.decompress
+            self._flush = decompressor.flush
+        elif encoding == "br" and brotli is not None:
+            self._decompress = brotli.Decompressor().process
+        elif encoding != "identity":
+            msg = f"Unsupported content encoding {encoding}"
+            raise ContentDecodeError(msg)
+
+    def decode(self, chunk: bytes) -> bytes:
+        """Return the decoded content of the next chunk."""
+        if self._decompress is None:
+            return chunk
+        try:
+            return self._decompress(chunk)
+        except _DECODE_ERRORS as exception:
+            msg = f"Unable to decode {self._encoding} content - {exception}"
+            raise ContentDecodeError(msg) from exception
+
+    def flush(self) -> bytes:
+        """Return the content still held back at the end of the body."""
+        return self._flush() if self._flush is not None else b""
+
+
+def decode_content(body: bytes, encoding: str | None) -> bytes:
+    """Return a response body with its content encoding removed."""
+    decoder = ContentDecoder(encoding)
+    return decoder.decode(body) + decoder.flush()
+
+
+async def async_read_body(
+    session: aiohttp.ClientSession, response: aiohttp.ClientResponse
+) -> tuple[int, bytes]:
+    """
+    Return the size of a response body on the wire and its decoded content.
+
+    Sessions that decompress on their own only report the wire size when
+    the server sent a Content-Length.
+    """
+    body = await response.read()
+    if session.auto_decompress:
+        return int(response.headers.get(hdrs.CONTENT_LENGTH, len(body))), body
+    return len(body), decode_content(body, response.headers.get(hdrs.CONTENT_ENCODING))
+
+
+async def async_iter_body(
+    session: aiohttp.ClientSession, response: aiohttp.ClientResponse
+) -> AsyncIterator[tuple[int, bytes]]:
+    """
+    Yield the size on the wire and decoded content of every chunk of a body.
+
+    Sessions that decompress on their own report the decoded size instead.
+    """
+    decoder = ContentDecoder(
+        None if session.auto_decompress else response.headers.get(hdrs.CONTENT_ENCODING)
+    )
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        yield len(chunk), decoder.decode(chunk)
+    yield 0, decoder.flush()
+
+
+def create_session(
+    metrics: XpengMetrics,
+    ssl_context: ssl.SSLContext | bool = True,  # noqa: FBT002
+    user_agent: str | None = None,
+) -> aiohttp.ClientSession:
+    """
+    Create a session of its own for the Enode hosts.
+
+    Connections are kept alive and limited per host, host names are cached,
+    and responses are compressed. The body is decompressed by the client,
+    so the metrics can tell bytes on the wire from decoded bytes, and the
+    connections opened from the ones reused.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTIONS_PER_HOST,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        ssl=ssl_context,
+    )
+    headers = {hdrs.ACCEPT_ENCODING: ACCEPT_ENCODING}
+    if user_agent is not None:
+        headers[hdrs.USER_AGENT] = user_agent
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=headers,
+        auto_decompress=False,
+        trace_configs=[_connection_trace(metrics)],
+    )
+
+
+def _connection_trace(metrics: XpengMetrics) -> aiohttp.TraceConfig:
+    """Return a trace config counting opened and reused connections."""
+    trace_config = aiohttp.TraceConfig()
+
+    async def _on_connection_created(
+        _session: aiohttp.ClientSession,
+        _context: SimpleNamespace,
+        _params: aiohttp.TraceConnectionCreateEndParams,
+    ) -> None:
+        metrics.connections_opened += 1
+
+    async def _on_connection_reused(
+        _session: aiohttp.ClientSession,
+        _context: SimpleNamespace,
+        _params: aiohttp.TraceConnectionReuseconnParams,
+    ) -> None:
+        metrics.connections_reused += 1
+
+    trace_config.on_connection_create_end.append(_on_connection_created)
+    trace_config.on_connection_reuseconn.append(_on_connection_reused)
+    return trace_config
@@ -0,0 +1,219 @@
+"""Trip detection and simplified location history."""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+from .enode_models import format_datetime
+from .ringbuffer import RingBuffer
+
+if TYPE_CHECKING:
+    from datetime import timedelta
+
+    from .enode_models import Location
+
+EARTH_RADIUS = 6371008.8
+# Moves shorter than this, in meters, are GPS noise of a parked car.
+NOISE_DISTANCE = 50.0
+# Track points may deviate this far, in meters, from the simplified line.
+SIMPLIFY_TOLERANCE = 25.0
+# Points considered at once when simplifying, bounds the work per sample.
+SIMPLIFY_WINDOW = 32
+# Simplified track points kept per trip, the oldest are overwritten first.
+TRACK_BUFFER_SIZE = 512
+# A trip ends once the car has not moved for this many seconds.
+TRIP_IDLE_TIMEOUT = 600.0
+
+Point = tuple[float, float]
+
+
+def distance(start: Point, end: Point) -> float:
+    """Return the great circle distance in meters between two points."""
+    lat1, lon1 = map(math.radians, start)
+    lat2, lon2 = map(math.radians, end)
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def segment_distance(point: Point, start: Point, end: Point) -> float:
+    """Return the distance in meters from a point to a line segment."""
+    # An equirectangular projection around the segment start is accurate
+    # enough for the few hundred meters between track points.
+    scale = math.cos(math.radians(start[0]))
+
+    def _project(other: Point) -> tuple[float, float]:
+        return (
+            math.radians(other[1] - start[1]) * scale * EARTH_RADIUS,
+            math.radians(other[0] - start[0]) * EARTH_RADIUS,
+        )
+
+    px, py = _project(point)
+    ex, ey = _project(end)
+    length = ex * ex + ey * ey
+    if not length:
+        return math.hypot(px, py)
+    fraction = min(max((px * ex + py * ey) / length, 0.0), 1.0)
+    return math.hypot(px - fraction * ex, py - fraction * ey)
+
+
+class PolylineSimplifier:
+    """
+    Online simplification of a track, in the spirit of Douglas-Peucker.
+
+    A point is only kept once the points seen since the last kept point can
+    no longer be replaced by a straight line within the tolerance.
+    """
+
+    def __init__(
+        self,
+        tolerance: float = SIMPLIFY_TOLERANCE,
+        capacity: int = TRACK_BUFFER_SIZE,
+    ) -> None:
+        """Create an empty simplifier."""
+        self._tolerance = tolerance
+        self._kept = RingBuffer(2, capacity)
+        self._window: list[Point] = []
+
+    def reset(self, start: Point) -> None:
+        """Start a new track at the given point."""
+        self._kept.clear()
+        self._kept.append(*start)
+        self._window.clear()
+
+    def add(self, point: Point) -> None:
+        """Add the next point of the track."""
+        anchor = self._kept.last()
+        if len(self._window) >= SIMPLIFY_WINDOW or any(
+            segment_distance(candidate, anchor, point) > self._tolerance
+            for candidate in self._window
+        ):
+            self._kept.append(*self._window[-1])
+            self._window.clear()
+        self._window.append(point)
+
+    def points(self) -> list[Point]:
+        """Return the simplified track including the latest point."""
+        return [*self._kept, *self._window[-1:]]
+
+
+@dataclass(slots=True, frozen=True)
+class Trip:
+    """Summary of a finished trip."""
+
+    started: datetime
+    ended: datetime
+    start: Point
+    end: Point
+    distance: float
+    track: tuple[Point, ...]
+
+    @property
+    def duration(self) -> timedelta:
+        """Return the time between leaving and arriving."""
+        return self.ended - self.started
+
+    def as_dict(self, *, include_track: bool = False) -> dict[str, Any]:
+        """Return the summary as state attributes or event data."""
+        data: dict[str, Any] = {
+            "started": format_datetime(self.started),
+            "ended": format_datetime(self.ended),
+            "start": list(self.start),
+            "end": list(self.end),
+            "distance_km": round(self.distance / 1000, 2),
+            "duration_s": int(self.duration.total_seconds()),
+        }
+        if include_track:
+            data["track"] = [[round(lat, 5), round(lon, 5)] for lat, lon in self.track]
+        return data
+
+
+@dataclass(slots=True, frozen=True)
+class LocationUpdate:
+    """Outcome of feeding a location sample to the trip tracker."""
+
+    moved: bool
+    trip: Trip | None = None
+
+
+_NOT_MOVED = LocationUpdate(moved=False)
+
+
+class TripTracker:
+    """
+    Follow the location of one vehicle and cut it into trips.
+
+    The position only changes when the car moves beyond the GPS noise
+    threshold. A trip starts with the first such move and ends when the car
+    has not moved for TRIP_IDLE_TIMEOUT, judged by the location timestamps.
+    """
+
+    def __init__(self) -> None:
+        """Create a tracker that has not seen the vehicle yet."""
+        self.position: Point | None = None
+        self.last_trip: Trip | None = None
+        self._simplifier = PolylineSimplifier()
+        self._seen_at = 0.0
+        self._moved_at = 0.0
+        self._trip_started: float | None = None
+        self._trip_start: Point | None = None
+        self._trip_distance = 0.0
+
+    @property
+    def in_trip(self) -> bool:
+        """Return whether the vehicle is on a trip."""
+        return self._trip_started is not None
+
+    def update(self, location: Location) -> LocationUpdate:
+        """Add a location sample, returning whether the car moved."""
+        point = (location.latitude, location.longitude)
+        if location.last_updated is None:
+            return _NOT_MOVED
+        seen_at = location.last_updated.timestamp()
+        if self.position is None:
+            self.position = point
+            self._seen_at = self._moved_at = seen_at
+            return LocationUpdate(moved=True)
+        if seen_at <= self._seen_at:
+            return _NOT_MOVED
+        previous_seen_at, self._seen_at = self._seen_at, seen_at
+        idle = seen_at - self._moved_at >= TRIP_IDLE_TIMEOUT
+
+        moved = distance(self.position, point)
+        if moved < NOISE_DISTANCE:
+            if self.in_trip and idle:
+                return LocationUpdate(moved=False, trip=self._finish())
+            return _NOT_MOVED
+
+        finished = None
+        if self.in_trip and idle:
+            # Not seen moving for a while, the last trip ended where we lost it.
+            finished = self._finish()
+        if not self.in_trip:
+            self._trip_started = previous_seen_at
+            self._trip_start = self.position
+            self._trip_distance = 0.0
+            self._simplifier.reset(self.position)
+        self._trip_distance += moved
+        self._simplifier.add(point)
+        self.position = point
+        self._moved_at = seen_at
+        return LocationUpdate(moved=True, trip=finished)
+
+    def _finish(self) -> Trip:
+        """Close the current trip at the last position it moved to."""
+        self.last_trip = Trip(
+            started=datetime.fromtimestamp(self._trip_started, tz=UTC),
+            ended=datetime.fromtimestamp(self._moved_at, tz=UTC),
+            start=self._trip_start,
+            end=self.position,
+            distance=self._trip_distance,
+            track=tuple(self._simplifier.points()),
+        )
+        self._trip_started = None
+        return self.last_trip
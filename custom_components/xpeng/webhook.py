@@ -0,0 +1,169 @@
+"""Enode webhook push ingestion for xpeng."""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import secrets
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import web
+from homeassistant.components import webhook
+from homeassistant.const import CONF_WEBHOOK_ID
+from homeassistant.helpers.network import NoURLAvailableError
+
+from .api import XpengApiClientError
+from .const import (
+    CONF_WEBHOOK_SECRET,
+    DOMAIN,
+    LOGGER,
+    WEBHOOK_EVENT_VEHICLE_UPDATED,
+    WEBHOOK_SIGNATURE_HEADER,
+)
+from .enode_models import Vehicle, json_loads
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Mapping
+
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import XpengDataUpdateCoordinator
+    from .data import XpengConfigEntry
+    from .shared import XpengAccount
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    """Return the Enode signature header value for a webhook body."""
+    digest = hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+    return f"sha1={digest}"
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    """Check that a webhook body was signed with our shared secret."""
+    if not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+def parse_vehicle_events(body: bytes) -> list[Vehicle]:
+    """Return the vehicles carried by the vehicle update events in a body."""
+    events: list[dict[str, Any]] = json_loads(body)
+    if not isinstance(events, list):
+        msg = f"Expected a list of events, got {type(events).__name__}"
+        raise ValueError(msg)  # noqa: TRY004 answered like invalid JSON
+    vehicles = []
+    for event in events:
+        kind = event.get("event") if isinstance(event, dict) else None
+        if kind != WEBHOOK_EVENT_VEHICLE_UPDATED:
+            LOGGER.debug("Ignoring webhook event %s", kind)
+            continue
+        try:
+            vehicles.append(Vehicle.from_json(event["vehicle"]))
+        except (KeyError, TypeError, ValueError) as exception:
+            LOGGER.warning("Discarding malformed vehicle event: %s", exception)
+    return vehicles
+
+
+def drop_outdated(
+    vehicles: list[Vehicle], known: Mapping[str, Vehicle]
+) -> list[Vehicle]:
+    """
+    Return the latest pushed state of every vehicle that is not outdated.
+
+    Enode does not guarantee delivery order, so events last seen before
+    the vehicle we already have are ignored.
+    """
+    latest: dict[str, Vehicle] = {}
+    for vehicle in vehicles:
+        current = latest.get(vehicle.id) or known.get(vehicle.id)
+        if (
+            current is not None
+            and current.last_seen is not None
+            and vehicle.last_seen is not None
+            and vehicle.last_seen < current.last_seen
+        ):
+            LOGGER.debug("Ignoring outdated webhook event for %s", vehicle.id)
+            continue
+        latest[vehicle.id] = vehicle
+    return list(latest.values())
+
+
+def webhook_handler(
+    secret: str, coordinator: XpengDataUpdateCoordinator
+) -> Callable[[HomeAssistant, str, web.Request], Awaitable[web.Response]]:
+    """Return a webhook handler applying signed events to the coordinator."""
+
+    async def _handle_webhook(
+        hass: HomeAssistant,  # noqa: ARG001 Unused function argument: `hass`
+        webhook_id: str,  # noqa: ARG001 Unused function argument: `webhook_id`
+        request: web.Request,
+    ) -> web.Response:
+        """Apply a batch of signed Enode events to the coordinator."""
+        body = await request.read()
+        if not verify_signature(
+            secret, body, request.headers.get(WEBHOOK_SIGNATURE_HEADER)
+        ):
+            LOGGER.warning("Rejected webhook call with an invalid signature")
+            return web.Response(status=HTTPStatus.UNAUTHORIZED)
+
+        try:
+            vehicles = parse_vehicle_events(body)
+        except ValueError as exception:
+            LOGGER.warning("Rejected webhook call with invalid JSON: %s", exception)
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
+
+        for vehicle in drop_outdated(vehicles, coordinator.data or {}):
+            coordinator.async_apply_vehicle_update(vehicle)
+        return web.Response(status=HTTPStatus.OK)
+
+    return _handle_webhook
+
+
+async def async_setup_webhook(
+    hass: HomeAssistant, entry: XpengConfigEntry, account: XpengAccount
+) -> bool:
+    """Register the account webhook with Home Assistant and Enode."""
+    if CONF_WEBHOOK_ID not in entry.data:
+        hass.config_entries.async_update_entry(
+            entry,
+            data={
+                **entry.data,
+                CONF_WEBHOOK_ID: webhook.async_generate_id(),
+                CONF_WEBHOOK_SECRET: secrets.token_hex(32),
+            },
+        )
+    webhook_id = entry.data[CONF_WEBHOOK_ID]
+    secret = entry.data[CONF_WEBHOOK_SECRET]
+
+    try:
+        url = webhook.async_generate_url(hass, webhook_id, allow_internal=False)
+    except NoURLAvailableError:
+        LOGGER.info("No external URL available, falling back to polling")
+        return False
+
+    webhook.async_register(
+        hass,
+        DOMAIN,
+        entry.title,
+        webhook_id,
+        webhook_handler(secret, account.coordinator),
+        allowed_methods=["POST"],
+    )
+    account.async_on_release(lambda: webhook.async_unregister(hass, webhook_id))
+
+    try:
+        enode_webhook_id = await account.client.async_upsert_webhook(url, secret)
+    except XpengApiClientError as exception:
+        LOGGER.warning("Unable to register webhook with Enode: %s", exception)
+        return False
+
+    async def _delete_enode_webhook() -> None:
+        """Stop Enode from pushing to a webhook that no longer exists."""
+        try:
+            await account.client.async_delete_webhook(enode_webhook_id)
+        except XpengApiClientError as exception:
+            LOGGER.debug("Unable to delete Enode webhook: %s", exception)
+
+    account.async_on_release(_delete_enode_webhook)
+    return True
@@ -0,0 +1,258 @@
+"""
+Benchmark full coordinator update cycles against a local fake Enode server.
+
+Runs the real XpengApiClient and XpengDataUpdateCoordinator in a bare Home
+Assistant instance. Every fleet size runs in its own process so the peak
+RSS figures do not bleed into each other. Results are printed and written
+as JSON, tagged with the current commit, so runs can be compared.
+
+With --replay, a recording made by enode_traffic.py is served instead of
+a synthetic fleet, and every cycle moves the replay clock forward by
+--step seconds, so a long recording runs in minutes.
+
+Usage: python scripts/benchmark_cycle.py [--sizes 1 100 1000 10000]
+                                         [--cycles 5] [--changed 0.1]
+                                         [--replay RECORDING] [--step 60]
+                                         [--output benchmark.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+from fake_enode import FakeEnodeServer, ReplayEnodeServer, make_fleet
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import frame
+
+from custom_components.xpeng import api
+from custom_components.xpeng.binary_sensor import BINARY_SENSORS
+from custom_components.xpeng.const import LOGGER
+from custom_components.xpeng.coordinator import XpengDataUpdateCoordinator
+from custom_components.xpeng.device_tracker import TRACKERS
+from custom_components.xpeng.entity import is_affected
+from custom_components.xpeng.sensor import SENSORS, XpengCarChargeEnergy
+
+if TYPE_CHECKING:
+    from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+# Everything an entity of a vehicle is created from. The charge energy sensor
+# has no description and sets its watched fields on the class.
+ENTITY_DESCRIPTIONS = (*SENSORS, *BINARY_SENSORS, *TRACKERS, XpengCarChargeEnergy)
+
+
+class _Timings:
+    """Accumulates HTTP and decode time for one cycle."""
+
+    def __init__(self) -> None:
+        """Start with empty counters."""
+        self.http = 0.0
+        self.decode = 0.0
+
+
+def _trace_config(timings: _Timings) -> aiohttp.TraceConfig:
+    """Return a trace config adding request durations to the timings."""
+    trace_config = aiohttp.TraceConfig()
+
+    async def _on_request_start(
+        session: aiohttp.ClientSession,  # noqa: ARG001
+        context: SimpleNamespace,
+        params: aiohttp.TraceRequestStartParams,  # noqa: ARG001
+    ) -> None:
+        context.start = time.perf_counter()
+
+    async def _on_request_end(
+        session: aiohttp.ClientSession,  # noqa: ARG001
+        context: SimpleNamespace,
+        params: aiohttp.TraceRequestEndParams,  # noqa: ARG001
+    ) -> None:
+        timings.http += time.perf_counter() - context.start
+
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    return trace_config
+
+
+def _time_decoder(timings: _Timings) -> None:
+    """Account every vehicle the client decodes."""
+    decode = api.XpengApiClient._decode_vehicle  # noqa: SLF001
+
+    def _timed(client: api.XpengApiClient, data: dict[str, Any]) -> api.Vehicle:
+        start = time.perf_counter()
+        try:
+            return decode(client, data)
+        finally:
+            timings.decode += time.perf_counter() - start
+
+    api.XpengApiClient._decode_vehicle = _timed  # noqa: SLF001
+
+
+async def _run_single(
+    vehicles: int, cycles: int, changed: float, replay: Path | None, step: float
+) -> dict[str, Any]:
+    """Run the benchmark for one fleet size or a recording and return its results."""
+    server = (
+        ReplayEnodeServer(replay, speed=None)
+        if replay is not None
+        else FakeEnodeServer(make_fleet(vehicles))
+    )
+    base_url = await server.start()
+    timings = _Timings()
+    _time_decoder(timings)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        frame.async_setup(hass)
+        async with aiohttp.ClientSession(
+            trace_configs=[_trace_config(timings)]
+        ) as session:
+            client = api.XpengApiClient(
+                "id", "secret", session, base_url=base_url, oauth_url=base_url
+            )
+            start = time.perf_counter()
+            await client.async_get_token()
+            token_latency = time.perf_counter() - start
+
+            coordinator = XpengDataUpdateCoordinator(hass, LOGGER, "benchmark", client)
+            # Push mode turns every refresh into a full fleet fetch.
+            coordinator.async_enable_push()
+
+            results = []
+            for cycle in range(cycles):
+                if cycle:
+                    server.advance(step if replay is not None else changed)
+                timings.http = timings.decode = 0.0
+                bytes_sent = server.bytes_sent
+                start = time.perf_counter()
+                await coordinator.async_refresh()
+                elapsed = time.perf_counter() - start
+                writes = sum(
+                    is_affected(
+                        description.watched_fields,
+                        coordinator.changes.get(vehicle_id),
+                    )
+                    for vehicle_id in coordinator.data
+                    for description in ENTITY_DESCRIPTIONS
+                )
+                results.append(
+                    {
+                        "cycle_s": elapsed,
+                        "http_s": timings.http,
+                        "from_json_s": timings.decode,
+                        "bytes": server.bytes_sent - bytes_sent,
+                        "state_writes": writes,
+                    }
+                )
+            client.shutdown()
+        await hass.async_stop(force=True)
+    await server.stop()
+
+    return {
+        "vehicles": len(coordinator.data or {}),
+        "token_latency_s": token_latency,
+        "cycles": results,
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def _git_commit() -> str | None:
+    """Return the current commit, to tell benchmark runs apart."""
+    result = subprocess.run(  # noqa: S603
+        ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return result.stdout.strip() or None
+
+
+def _print_result(result: dict[str, Any]) -> None:
+    """Print the steady state cycles of one fleet size."""
+    steady = result["cycles"][1:] or result["cycles"]
+
+    def _mean(key: str) -> float:
+        return sum(cycle[key] for cycle in steady) / len(steady)
+
+    print(
+        f"{result['vehicles']:>8} "
+        f"{result['token_latency_s'] * 1000:>9.1f} "
+        f"{_mean('cycle_s') * 1000:>9.1f} "
+        f"{_mean('http_s') * 1000:>9.1f} "
+        f"{_mean('from_json_s') * 1000:>9.1f} "
+        f"{_mean('bytes') / 1024:>10.0f} "
+        f"{_mean('state_writes'):>7.0f} "
+        f"{result['peak_rss_kib'] / 1024:>8.1f}"
+    )
+
+
+def main() -> None:
+    """Parse arguments and run every fleet size in a fresh process."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--changed", type=float, default=0.1)
+    parser.add_argument("--replay", type=Path)
+    parser.add_argument("--step", type=float, default=60)
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        result = asyncio.run(
+            _run_single(args.single, args.cycles, args.changed, args.replay, args.step)
+        )
+        print(json.dumps(result))
+        return
+
+    print(
+        f"{'vehicles':>8} {'token ms':>9} {'cycle ms':>9} {'http ms':>9} "
+        f"{'json ms':>9} {'KiB':>10} {'writes':>7} {'RSS MiB':>8}"
+    )
+    results = []
+    replay = [] if args.replay is None else ["--replay", str(args.replay)]
+    # A recording has a fleet of its own, run it once.
+    for vehicles in args.sizes if args.replay is None else [0]:
+        output = subprocess.run(  # noqa: S603
+            [
+                sys.executable,
+                __file__,
+                "--single",
+                str(vehicles),
+                "--cycles",
+                str(args.cycles),
+                "--changed",
+                str(args.changed),
+                "--step",
+                str(args.step),
+                *replay,
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        _print_result(result)
+        results.append(result)
+
+    args.output.write_text(
+        json.dumps({"commit": _git_commit(), "results": results}, indent=2)
+    )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark decoding /vehicles responses into the Enode models.
+
+Compares the baseline (the previous dataclass models, vendored in
+baseline_models.py) with the plain path (stdlib json, cold timestamp cache,
+as every integration start sees it) and the fast path (orjson when
+installed, warm timestamp cache, as every poll after the first sees it).
+
+Usage: python scripts/benchmark_decode.py [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import baseline_models
+from fake_enode import make_fleet
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.xpeng import enode_models
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+FLEET_SIZES = (1, 100, 10_000)
+
+
+def _decode_baseline(body: bytes) -> baseline_models.EnodeResponse:
+    """Decode with the standard library into the previous models."""
+    return baseline_models.EnodeResponse.from_json(json.loads(body))
+
+
+def _decode_plain(body: bytes) -> enode_models.EnodeResponse:
+    """Decode with the standard library and nothing memoized."""
+    enode_models._parse_iso_datetime.cache_clear()  # noqa: SLF001
+    return enode_models.EnodeResponse.from_json(json.loads(body))
+
+
+def _decode_fast(body: bytes) -> enode_models.EnodeResponse:
+    """Decode the way the API client does in steady state."""
+    return enode_models.EnodeResponse.from_json(enode_models.json_loads(body))
+
+
+def _best_rate(
+    decode: Callable[[bytes], object],
+    body: bytes,
+    vehicles: int,
+    repeat: int,
+) -> float:
+    """Return the best observed vehicles per second over a number of runs."""
+    iterations = max(1, 10_000 // vehicles)
+    decode(body)
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            decode(body)
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return vehicles / best
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"json_loads: {enode_models.json_loads.__module__}")
+    print(
+        f"{'vehicles':>8} {'baseline/s':>12} {'plain/s':>12} {'fast/s':>12}"
+        f" {'plain':>7} {'fast':>7}"
+    )
+    for vehicles in FLEET_SIZES:
+        body = json.dumps(
+            {
+                "data": make_fleet(vehicles),
+                "pagination": {"after": None, "before": None},
+            }
+        ).encode()
+        baseline = _best_rate(_decode_baseline, body, vehicles, args.repeat)
+        plain = _best_rate(_decode_plain, body, vehicles, args.repeat)
+        fast = _best_rate(_decode_fast, body, vehicles, args.repeat)
+        print(
+            f"{vehicles:>8} {baseline:>12,.0f} {plain:>12,.0f} {fast:>12,.0f}"
+            f" {plain / baseline:>6.1f}x {fast / baseline:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark the paginated vehicle fetch against a local fake Enode server.
+
+Usage: python scripts/benchmark_fetch.py [--vehicles 10000] [--page-size 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import aiohttp
+from fake_enode import FakeEnodeServer, make_fleet
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.xpeng import api
+
+
+async def _run(vehicles: int, page_size: int) -> None:
+    """Fetch the fleet streaming and collected, and report the cost of each."""
+    server = FakeEnodeServer(make_fleet(vehicles))
+    base_url = await server.start()
+
+    async with aiohttp.ClientSession() as session:
+        client, streamed_client = (
+            api.XpengApiClient(
+                "id",
+                "secret",
+                session,
+                page_size=page_size,
+                base_url=base_url,
+                oauth_url=base_url,
+                streaming=streaming,
+            )
+            for streaming in (False, True)
+        )
+        await client.async_get_token()
+        await streamed_client.async_get_token()
+
+        async def _stream() -> int:
+            return sum([1 async for _ in client.async_iter_vehicles()])
+
+        async def _collect() -> int:
+            return len(await client.async_get_data())
+
+        async def _stream_decoded() -> int:
+            return sum([1 async for _ in streamed_client.async_iter_vehicles()])
+
+        for name, fetch in (
+            ("streaming", _stream),
+            ("collected", _collect),
+            ("streamed decode", _stream_decoded),
+        ):
+            requests = server.requests
+            tracemalloc.start()
+            start = time.perf_counter()
+            count = await fetch()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{name:>15}: {count} vehicles in {elapsed:.3f} s "
+                f"({count / elapsed:,.0f}/s), {server.requests - requests} requests, "
+                f"peak {peak / 1024 / 1024:.1f} MiB"
+            )
+
+    await server.stop()
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vehicles", type=int, default=10_000)
+    parser.add_argument("--page-size", type=int, default=api.DEFAULT_PAGE_SIZE)
+    args = parser.parse_args()
+    asyncio.run(_run(args.vehicles, args.page_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Record Enode traffic to a compressed JSONL file, or replay a recording.
+
+Recording polls the real Enode API with the integration's own client and
+writes every exchange, one JSON object per line. Tokens, secrets and what
+diagnostics redact are replaced, identifiers by stable aliases so vehicles
+can still be told apart and their requests replayed. Replaying serves a
+recording through a local fake Enode server, at the original speed or
+faster.
+
+Usage: python scripts/enode_traffic.py record --client-id ID --client-secret SECRET
+                                              [--interval 60] [--duration 3600]
+                                              [--output enode_traffic.jsonl.gz]
+                                              [--base-url URL] [--oauth-url URL]
+       python scripts/enode_traffic.py replay enode_traffic.jsonl.gz
+                                              [--speed 60] [--port 8080]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+from fake_enode import ReplayEnodeServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.xpeng import api
+from custom_components.xpeng.diagnostics import TO_REDACT
+
+if TYPE_CHECKING:
+    from types import SimpleNamespace
+
+REDACTED_KEYS = frozenset({"access_token", "refresh_token", "secret", *TO_REDACT})
+
+
+class Redactor:
+    """
+    Replaces the values of redacted keys in recorded exchanges.
+
+    Text is replaced by an alias that is the same for the same value
+    throughout a recording, also where it appears in a request path.
+    Numbers such as coordinates become 0, so they still decode.
+    """
+
+    def __init__(self) -> None:
+        """Start without any aliases."""
+        self._aliases: dict[str, str] = {}
+
+    def _alias(self, value: str) -> str:
+        """Return the alias of a value, creating it on first use."""
+        if value not in self._aliases:
+            self._aliases[value] = f"REDACTED-{len(self._aliases) + 1}"
+        return self._aliases[value]
+
+    def _replace(self, value: Any) -> Any:
+        """Return the replacement of a redacted value."""
+        if isinstance(value, str):
+            return self._alias(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return 0
+        return value if value is None else "REDACTED"
+
+    def redact(self, value: Any) -> Any:
+        """Return a JSON value with the values of redacted keys replaced."""
+        if isinstance(value, dict):
+            return {
+                key: self._replace(item) if key in REDACTED_KEYS else self.redact(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [self.redact(item) for item in value]
+        return value
+
+    def redact_path(self, path: str) -> str:
+        """Return a request path with the segments seen as redacted values aliased."""
+        return "/".join(
+            self._aliases.get(segment, segment) for segment in path.split("/")
+        )
+
+
+class TrafficRecorder:
+    """Writes the exchanges of an aiohttp session to a gzipped JSONL file."""
+
+    def __init__(self, path: Path) -> None:
+        """Open the recording for writing."""
+        self._file = gzip.open(path, "wt", encoding="utf-8")  # noqa: SIM115
+        self._start = time.monotonic()
+        self._redactor = Redactor()
+        self.exchanges = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Return a trace config recording every completed request."""
+        trace_config = aiohttp.TraceConfig()
+
+        async def _on_request_start(
+            session: aiohttp.ClientSession,  # noqa: ARG001
+            context: SimpleNamespace,
+            params: aiohttp.TraceRequestStartParams,  # noqa: ARG001
+        ) -> None:
+            context.start = time.monotonic()
+
+        async def _on_request_end(
+            session: aiohttp.ClientSession,  # noqa: ARG001
+            context: SimpleNamespace,
+            params: aiohttp.TraceRequestEndParams,
+        ) -> None:
+            # The body is cached on the response, the client reads it again.
+            body = await params.response.read()
+            exchange = {
+                "time": context.start - self._start,
+                "elapsed": time.monotonic() - context.start,
+                "method": params.method,
+                "status": params.response.status,
+                "body": None,
+            }
+            try:
+                exchange["body"] = (
+                    self._redactor.redact(json.loads(body)) if body else None
+                )
+            except ValueError:
+                # Error pages from proxies, e.g. an HTML 502, are kept as text.
+                exchange["text"] = body.decode(errors="replace")
+            # The path may hold identifiers only aliased once a body named them.
+            exchange["path"] = self._redactor.redact_path(params.url.path)
+            exchange["query"] = dict(params.url.query)
+            self.write(exchange)
+
+        trace_config.on_request_start.append(_on_request_start)
+        trace_config.on_request_end.append(_on_request_end)
+        return trace_config
+
+    def write(self, exchange: dict[str, Any]) -> None:
+        """Append an exchange to the recording."""
+        self._file.write(json.dumps(exchange, separators=(",", ":")) + "\n")
+        self.exchanges += 1
+
+    def close(self) -> None:
+        """Flush and close the recording."""
+        self._file.close()
+
+
+async def _record(args: argparse.Namespace) -> None:
+    """Poll the real Enode API and record the traffic."""
+    recorder = TrafficRecorder(args.output)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + args.duration
+    try:
+        async with aiohttp.ClientSession(
+            trace_configs=[recorder.trace_config()]
+        ) as session:
+            client = api.XpengApiClient(
+                args.client_id,
+                args.client_secret,
+                session,
+                base_url=args.base_url,
+                oauth_url=args.oauth_url,
+            )
+            while loop.time() < deadline:
+                try:
+                    vehicles = await client.async_get_data()
+                except api.XpengApiClientError as exception:
+                    print(f"Poll failed: {exception}")
+                else:
+                    print(f"Polled {len(vehicles)} vehicles")
+                await asyncio.sleep(min(args.interval, max(deadline - loop.time(), 0)))
+            client.shutdown()
+    finally:
+        recorder.close()
+    print(f"Recorded {recorder.exchanges} exchanges to {args.output}")
+
+
+async def _replay(args: argparse.Namespace) -> None:
+    """Serve a recording until it has been replayed completely."""
+    server = ReplayEnodeServer(args.recording, speed=args.speed)
+    url = await server.start(port=args.port)
+    print(f"Replaying {args.recording} at {args.speed}x on {url}")
+    try:
+        while not server.is_finished():  # noqa: ASYNC110 follows the replay clock
+            await asyncio.sleep(1)
+    finally:
+        await server.stop()
+    print(f"Replay finished after {server.requests} requests")
+
+
+def main() -> None:
+    """Parse arguments and record or replay."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="record real Enode traffic")
+    record.add_argument("--client-id", required=True)
+    record.add_argument("--client-secret", required=True)
+    record.add_argument("--interval", type=float, default=60)
+    record.add_argument("--duration", type=float, default=3600)
+    record.add_argument("--output", type=Path, default=Path("enode_traffic.jsonl.gz"))
+    record.add_argument("--base-url", default=api.ENODE_URL)
+    record.add_argument("--oauth-url", default=api.ENODE_OAUTH_URL)
+
+    replay = commands.add_parser("replay", help="serve a recording")
+    replay.add_argument("recording", type=Path)
+    replay.add_argument("--speed", type=float, default=1.0)
+    replay.add_argument("--port", type=int, default=8080)
+
+    args = parser.parse_args()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_record(args) if args.command == "record" else _replay(args))
+
+
+if __name__ == "__main__":
+    main()
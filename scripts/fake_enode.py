@@ -0,0 +1,277 @@
+"""
+Fake Enode API servers for local benchmarks.
+
+FakeEnodeServer serves a synthetic fleet over the same routes the
+integration uses, ReplayEnodeServer serves traffic recorded with
+enode_traffic.py. Either way the real API client can be exercised without
+touching the production service.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+    from pathlib import Path
+
+# How far ahead of the replay clock to look for a request that was not
+# recorded yet, e.g. the next page of a fleet poll in progress.
+REPLAY_LOOKAHEAD = 30.0
+
+CAPABILITIES = (
+    "information",
+    "chargeState",
+    "location",
+    "odometer",
+    "setMaxCurrent",
+    "startCharging",
+    "stopCharging",
+    "smartCharging",
+)
+
+
+def _isoformat(value: datetime) -> str:
+    """Format a timestamp the way Enode does."""
+    return value.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def make_vehicle(index: int, now: datetime | None = None) -> dict[str, Any]:
+    """Return a realistic Enode vehicle payload for the given fleet index."""
+    now = now or datetime.now(tz=UTC)
+    charging = index % 10 == 0
+    updated = _isoformat(now - timedelta(seconds=index % 600))
+    return {
+        "id": f"vehicle-{index:06d}",
+        "userId": f"user-{index // 4:06d}",
+        "vendor": "XPENG",
+        "isReachable": index % 50 != 0,
+        "lastSeen": updated,
+        "information": {
+            "displayName": f"Car {index}",
+            "vin": f"LNXPENG{index:010d}",
+            "brand": "XPENG",
+            "model": "G6",
+            "year": 2024,
+        },
+        "chargeState": {
+            "chargeRate": 11.0 if charging else None,
+            "chargeTimeRemaining": 95 if charging else None,
+            "isFullyCharged": False,
+            "isPluggedIn": charging or index % 3 == 0,
+            "isCharging": charging,
+            "batteryLevel": 20 + index % 80,
+            "range": 100 + index % 400,
+            "batteryCapacity": 87.5,
+            "chargeLimit": 80,
+            "lastUpdated": updated,
+            "powerDeliveryState": "PLUGGED_IN:CHARGING" if charging else "UNPLUGGED",
+            "maxCurrent": 16,
+        },
+        "smartChargingPolicy": {
+            "deadline": None,
+            "isEnabled": False,
+            "minimumChargeLimit": 0,
+        },
+        "location": {
+            "id": None,
+            "latitude": 59.9 + (index % 1000) / 10000,
+            "longitude": 10.7 + (index % 1000) / 10000,
+            "lastUpdated": updated,
+        },
+        "odometer": {
+            "distance": 10000.0 + index,
+            "lastUpdated": updated,
+        },
+        "capabilities": {
+            name: {"isCapable": True, "interventionIds": []} for name in CAPABILITIES
+        },
+        "scopes": ["vehicle:read:data", "vehicle:read:location"],
+    }
+
+
+def make_fleet(count: int) -> list[dict[str, Any]]:
+    """Return a synthetic fleet of the given size."""
+    now = datetime.now(tz=UTC)
+    return [make_vehicle(index, now) for index in range(count)]
+
+
+class _EnodeServer:
+    """An in-process aiohttp server accounting for what it sends."""
+
+    def __init__(self) -> None:
+        """Create the application, subclasses add their routes."""
+        self.requests = 0
+        self.bytes_sent = 0
+        self._runner: web.AppRunner | None = None
+        self.app = web.Application()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base url."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        sockets = site._server.sockets  # noqa: SLF001
+        return f"http://{host}:{sockets[0].getsockname()[1]}"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def _respond(self, body: bytes, status: int = 200) -> web.Response:
+        """Send a JSON body and account for it."""
+        self.requests += 1
+        self.bytes_sent += len(body)
+        if not body:
+            return web.Response(status=status)
+        return web.Response(body=body, status=status, content_type="application/json")
+
+    def _json(self, payload: Any) -> web.Response:
+        """Serialize a payload and send it."""
+        return self._respond(json.dumps(payload).encode())
+
+
+class FakeEnodeServer(_EnodeServer):
+    """Mimics the Enode API with a synthetic fleet."""
+
+    def __init__(self, vehicles: list[dict[str, Any]]) -> None:
+        """Create a server for the given vehicle payloads."""
+        super().__init__()
+        self.vehicles = vehicles
+        self._tick = 0
+        self._by_id = {vehicle["id"]: vehicle for vehicle in vehicles}
+        self.app.router.add_post("/oauth2/token", self._token)
+        self.app.router.add_get("/vehicles", self._vehicles)
+        self.app.router.add_get("/vehicles/{vehicle_id}", self._vehicle)
+
+    def advance(self, fraction: float) -> None:
+        """Move a fraction of the fleet forward in time, like a live account."""
+        if not self.vehicles or fraction <= 0:
+            return
+        now = _isoformat(datetime.now(tz=UTC))
+        step = max(1, round(1 / fraction))
+        for vehicle in self.vehicles[self._tick % step :: step]:
+            charge_state = vehicle["chargeState"]
+            charge_state["batteryLevel"] = min(100, charge_state["batteryLevel"] + 1)
+            charge_state["lastUpdated"] = now
+            vehicle["lastSeen"] = now
+        self._tick += 1
+
+    async def _token(self, request: web.Request) -> web.Response:  # noqa: ARG002
+        """Hand out a token that outlives any benchmark."""
+        return self._json({"access_token": "fake-token", "expires_in": 3600})
+
+    async def _vehicles(self, request: web.Request) -> web.Response:
+        """Serve one page of the fleet."""
+        page_size = int(request.query.get("pageSize", "50"))
+        start = int(request.query.get("after", "0"))
+        end = start + page_size
+        return self._json(
+            {
+                "data": self.vehicles[start:end],
+                "pagination": {
+                    "after": str(end) if end < len(self.vehicles) else None,
+                    "before": str(start) if start else None,
+                },
+            }
+        )
+
+    async def _vehicle(self, request: web.Request) -> web.Response:
+        """Serve a single vehicle."""
+        vehicle = self._by_id.get(request.match_info["vehicle_id"])
+        if vehicle is None:
+            raise web.HTTPNotFound
+        return self._json(vehicle)
+
+
+def read_traffic(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the exchanges of a recording made by enode_traffic.py, in order."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            yield json.loads(line)
+
+
+def request_key(method: str, path: str, query: Mapping[str, str]) -> tuple:
+    """Return what identifies a request when replaying it."""
+    return method.upper(), path, tuple(sorted(query.items()))
+
+
+class ReplayEnodeServer(_EnodeServer):
+    """
+    Serves recorded Enode traffic along a replay clock.
+
+    Every request is answered with the latest recorded response to the same
+    request at the current replay time. The clock runs at a multiple of real
+    time, or only moves through advance when speed is None. The recording is
+    streamed, so memory does not depend on how long it is.
+    """
+
+    def __init__(self, path: Path, speed: float | None = 1.0) -> None:
+        """Create a server replaying the given recording."""
+        super().__init__()
+        self._records = read_traffic(path)
+        self._pending: dict[str, Any] | None = next(self._records, None)
+        self._latest: dict[tuple, tuple[int, bytes]] = {}
+        self._speed = speed
+        self._offset = 0.0
+        self._started_at: float | None = None
+        self.app.router.add_route("*", "/{path:.*}", self._replay)
+
+    @property
+    def clock(self) -> float:
+        """Return the recording time being replayed, in seconds."""
+        if self._speed is None or self._started_at is None:
+            return self._offset
+        elapsed = asyncio.get_running_loop().time() - self._started_at
+        return self._offset + elapsed * self._speed
+
+    def is_finished(self) -> bool:
+        """Return whether the replay clock has passed the whole recording."""
+        self._catch_up(self.clock)
+        return self._pending is None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and the replay clock."""
+        url = await super().start(host, port)
+        self._started_at = asyncio.get_running_loop().time()
+        return url
+
+    def advance(self, seconds: float) -> None:
+        """Move the replay clock forward."""
+        self._offset += seconds
+
+    def _catch_up(self, until: float, key: tuple | None = None) -> None:
+        """Apply recorded responses up to a time, or until key was recorded."""
+        while self._pending is not None and self._pending["time"] <= until:
+            record = self._pending
+            self._pending = next(self._records, None)
+            record_key = request_key(record["method"], record["path"], record["query"])
+            if "text" in record:
+                body = record["text"].encode()
+            elif record["body"] is None:
+                body = b""
+            else:
+                body = json.dumps(record["body"]).encode()
+            self._latest[record_key] = (record["status"], body)
+            if record_key == key:
+                return
+
+    async def _replay(self, request: web.Request) -> web.Response:
+        """Answer with the latest recorded response to the same request."""
+        key = request_key(request.method, request.path, request.query)
+        clock = self.clock
+        self._catch_up(clock)
+        if key not in self._latest:
+            self._catch_up(clock + REPLAY_LOOKAHEAD, key)
+        if key not in self._latest:
+            raise web.HTTPNotFound
+        status, body = self._latest[key]
+        return self._respond(body, status)
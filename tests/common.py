@@ -0,0 +1,66 @@
+"""Helpers shared by the tests."""
+
+from __future__ import annotations
+
+from typing import Any
+
+EARLIER = "2025-01-01T12:00:00.000Z"
+LATER = "2025-01-01T12:05:00.000Z"
+CAPABILITIES = (
+    "information",
+    "chargeState",
+    "location",
+    "odometer",
+    "setMaxCurrent",
+    "startCharging",
+    "stopCharging",
+    "smartCharging",
+)
+
+
+def vehicle_payload(last_seen: str, battery_level: int = 50) -> dict[str, Any]:
+    """Return an Enode vehicle payload last seen at the given time."""
+    return {
+        "id": "vehicle",
+        "userId": "user",
+        "vendor": "XPENG",
+        "isReachable": True,
+        "lastSeen": last_seen,
+        "information": {
+            "displayName": "Car",
+            "vin": "LNXPENG0000000001",
+            "brand": "XPENG",
+            "model": "G6",
+            "year": 2024,
+        },
+        "chargeState": {
+            "chargeRate": None,
+            "chargeTimeRemaining": None,
+            "isFullyCharged": False,
+            "isPluggedIn": False,
+            "isCharging": False,
+            "batteryLevel": battery_level,
+            "range": 300,
+            "batteryCapacity": 87.5,
+            "chargeLimit": 80,
+            "lastUpdated": last_seen,
+            "powerDeliveryState": "UNPLUGGED",
+            "maxCurrent": 16,
+        },
+        "smartChargingPolicy": {
+            "deadline": None,
+            "isEnabled": False,
+            "minimumChargeLimit": 0,
+        },
+        "location": {
+            "id": None,
+            "latitude": 59.9,
+            "longitude": 10.7,
+            "lastUpdated": last_seen,
+        },
+        "odometer": {"distance": 10000.0, "lastUpdated": last_seen},
+        "capabilities": {
+            name: {"isCapable": True, "interventionIds": []} for name in CAPABILITIES
+        },
+        "scopes": ["vehicle:read:data", "vehicle:read:location"],
+    }
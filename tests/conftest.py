@@ -0,0 +1,31 @@
+"""Fixtures shared by the tests."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.xpeng.api import XpengApiClient
+from custom_components.xpeng.const import LOGGER
+from custom_components.xpeng.coordinator import XpengDataUpdateCoordinator
+from custom_components.xpeng.enode_models import Vehicle
+from custom_components.xpeng.metrics import XpengMetrics
+
+from .common import EARLIER, vehicle_payload
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+
+@pytest.fixture
+def coordinator(hass: HomeAssistant) -> XpengDataUpdateCoordinator:
+    """Return a coordinator in push mode holding one vehicle seen EARLIER."""
+    client = MagicMock(spec=XpengApiClient)
+    client.metrics = XpengMetrics()
+    coordinator = XpengDataUpdateCoordinator(hass, LOGGER, "test", client)
+    coordinator.async_enable_push()
+    vehicle = Vehicle.from_json(vehicle_payload(EARLIER))
+    coordinator.data = {vehicle.id: vehicle}
+    return coordinator
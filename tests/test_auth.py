@@ -0,0 +1,34 @@
+"""Tests for the OAuth token manager."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from custom_components.xpeng.auth import XpengTokenManager
+
+
+async def test_concurrent_callers_share_the_stored_token() -> None:
+    """Callers arriving while the store loads wait for it instead of fetching."""
+    loaded = asyncio.Event()
+    expires_at = datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(hours=1)
+
+    async def _async_load() -> dict[str, str]:
+        await loaded.wait()
+        return {"access_token": "stored", "expires_at": expires_at.isoformat()}
+
+    store = MagicMock()
+    store.async_load = AsyncMock(side_effect=_async_load)
+    session = MagicMock()
+    session.post = AsyncMock()
+    manager = XpengTokenManager("https://oauth/token", "id", "secret", session, store)
+
+    callers = [asyncio.create_task(manager.async_get_token()) for _ in range(3)]
+    await asyncio.sleep(0)
+    loaded.set()
+
+    assert await asyncio.gather(*callers) == ["stored"] * 3
+    store.async_load.assert_awaited_once()
+    session.post.assert_not_awaited()
+    manager.stop()
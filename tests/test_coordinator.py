@@ -0,0 +1,42 @@
+"""Tests for the fleet coordinator."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.xpeng.enode_models import Vehicle
+
+from .common import vehicle_payload
+
+if TYPE_CHECKING:
+    from freezegun.api import FrozenDateTimeFactory
+    from homeassistant.core import HomeAssistant
+
+    from custom_components.xpeng.coordinator import XpengDataUpdateCoordinator
+
+
+async def test_push_does_not_delay_reconcile_poll(
+    hass: HomeAssistant,
+    freezer: FrozenDateTimeFactory,
+    coordinator: XpengDataUpdateCoordinator,
+) -> None:
+    """The reconciling poll runs on time while vehicles keep being pushed."""
+    with patch.object(
+        coordinator, "_async_update_data", return_value=coordinator.data
+    ) as update:
+        unsubscribe = coordinator.async_add_listener(lambda: None)
+        for minute in (10, 20, 30):
+            freezer.tick(timedelta(minutes=10))
+            coordinator.async_apply_vehicle_update(
+                Vehicle.from_json(
+                    vehicle_payload(f"2025-01-01T12:{minute}:00.000Z", minute)
+                )
+            )
+            async_fire_time_changed(hass)
+            await hass.async_block_till_done()
+            assert update.call_count == (1 if minute == 30 else 0)
+        unsubscribe()
@@ -0,0 +1,63 @@
+"""Tests for the charging planner."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from custom_components.xpeng.planner import FleetDemand, PriceSeries, plan_charging
+
+HOUR = 3600.0
+POWER = 11.04
+
+
+def _prices(*prices: float) -> PriceSeries:
+    """Return hourly slots starting at 0 with the given prices."""
+    starts = np.arange(len(prices)) * HOUR
+    return PriceSeries(starts=starts, ends=starts + HOUR, prices=np.array(prices))
+
+
+def _demand(energy: float, urgent_energy: float, deadline: float) -> FleetDemand:
+    """Return the demand of a single vehicle charging at POWER."""
+    return FleetDemand(
+        vehicle_ids=("vehicle",),
+        energy=np.array([energy]),
+        urgent_energy=np.array([urgent_energy]),
+        power=np.array([POWER]),
+        deadlines=np.array([deadline]),
+    )
+
+
+def test_cheapest_slots_without_urgent_energy() -> None:
+    """Energy above the minimum charge limit goes into the cheapest slots."""
+    plan = plan_charging(_prices(5, 4, 1, 2, 3), _demand(20.0, 0.0, 5 * HOUR), 0.0)
+
+    assert plan.selected[0].tolist() == [False, False, True, True, False]
+    assert plan.shortfall[0] == 0
+
+
+def test_urgent_energy_in_earliest_slots() -> None:
+    """Energy below the minimum charge limit is charged first, whatever the price."""
+    plan = plan_charging(
+        _prices(5, 4, 3, 2, 1, 1, 1, 1), _demand(30.0, 15.0, 8 * HOUR), 0.0
+    )
+
+    # 15 kWh urgent takes the first two slots, the rest the cheapest ones.
+    assert plan.selected[0, :2].all()
+    assert plan.charged[0, :2].sum() >= 15.0
+    assert plan.selected[0, 2:4].tolist() == [False, False]
+    assert np.isclose(plan.charged[0].sum(), 30.0)
+    assert plan.shortfall[0] == 0
+
+
+def test_urgent_energy_with_power_limit() -> None:
+    """A power limit does not push urgent energy out of the earliest slots."""
+    plan = plan_charging(
+        _prices(5, 4, 3, 2, 1, 1, 1, 1),
+        _demand(20.0, 10.0, 8 * HOUR),
+        0.0,
+        power_limit=POWER,
+    )
+
+    assert plan.selected[0, 0]
+    assert np.isclose(plan.charged[0].sum(), 20.0)
+    assert plan.shortfall[0] == 0
@@ -0,0 +1,162 @@
+"""Tests for the webhook signature check, event ordering and handler."""
+
+from __future__ import annotations
+
+import json
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from aiohttp import web
+
+from custom_components.xpeng.const import (
+    WEBHOOK_EVENT_VEHICLE_UPDATED,
+    WEBHOOK_SIGNATURE_HEADER,
+)
+from custom_components.xpeng.webhook import (
+    drop_outdated,
+    parse_vehicle_events,
+    sign_payload,
+    verify_signature,
+    webhook_handler,
+)
+
+from .common import EARLIER, LATER, vehicle_payload
+
+if TYPE_CHECKING:
+    from aiohttp.test_utils import TestClient
+    from homeassistant.core import HomeAssistant
+    from pytest_homeassistant_custom_component.typing import ClientSessionGenerator
+
+    from custom_components.xpeng.coordinator import XpengDataUpdateCoordinator
+
+SECRET = "0123456789abcdef"  # noqa: S105
+
+
+def _body(*vehicles: dict[str, Any]) -> bytes:
+    """Return a webhook body with a vehicle update event per vehicle."""
+    return json.dumps(
+        [
+            {"event": WEBHOOK_EVENT_VEHICLE_UPDATED, "vehicle": vehicle}
+            for vehicle in vehicles
+        ]
+    ).encode()
+
+
+def test_signed_payload_is_accepted() -> None:
+    """A body signed with the shared secret passes the check."""
+    body = _body(vehicle_payload(LATER))
+
+    assert verify_signature(SECRET, body, sign_payload(SECRET, body))
+
+
+def test_tampered_payload_is_rejected() -> None:
+    """A body changed after signing fails the check."""
+    signature = sign_payload(SECRET, _body(vehicle_payload(LATER)))
+
+    assert not verify_signature(SECRET, _body(vehicle_payload(LATER, 10)), signature)
+
+
+def test_foreign_or_missing_signature_is_rejected() -> None:
+    """A body signed with another secret, or not at all, fails the check."""
+    body = _body(vehicle_payload(LATER))
+
+    assert not verify_signature(SECRET, body, sign_payload("other", body))
+    assert not verify_signature(SECRET, body, None)
+    assert not verify_signature(SECRET, body, "")
+
+
+def test_out_of_order_event_is_ignored() -> None:
+    """An event last seen before the stored vehicle does not replace it."""
+    (stored,) = parse_vehicle_events(_body(vehicle_payload(LATER, 60)))
+    vehicles = parse_vehicle_events(_body(vehicle_payload(EARLIER, 40)))
+
+    assert drop_outdated(vehicles, {stored.id: stored}) == []
+
+
+def test_latest_event_of_a_batch_wins() -> None:
+    """Of several events for a vehicle, only the latest one is applied."""
+    (stored,) = parse_vehicle_events(_body(vehicle_payload(EARLIER, 40)))
+    vehicles = parse_vehicle_events(
+        _body(vehicle_payload(LATER, 60), vehicle_payload(EARLIER, 50))
+    )
+
+    (applied,) = drop_outdated(vehicles, {stored.id: stored})
+    assert applied.charge_state.battery_level == 60
+
+
+@pytest.fixture
+async def webhook_client(
+    hass: HomeAssistant,
+    aiohttp_client: ClientSessionGenerator,
+    coordinator: XpengDataUpdateCoordinator,
+) -> TestClient:
+    """Return a client of a server passing every POST to the webhook handler."""
+    handler = webhook_handler(SECRET, coordinator)
+
+    async def _handle(request: web.Request) -> web.Response:
+        return await handler(hass, "webhook_id", request)
+
+    app = web.Application()
+    app.router.add_post("/", _handle)
+    return await aiohttp_client(app)
+
+
+async def _post(client: TestClient, body: bytes, signature: str | None) -> HTTPStatus:
+    """Post a body with the given signature header, returning the status."""
+    headers = {WEBHOOK_SIGNATURE_HEADER: signature} if signature else {}
+    response = await client.post("/", data=body, headers=headers)
+    return HTTPStatus(response.status)
+
+
+def _battery_level(coordinator: XpengDataUpdateCoordinator) -> int | None:
+    """Return the battery level the coordinator holds for the vehicle."""
+    return coordinator.data["vehicle"].charge_state.battery_level
+
+
+async def test_handler_applies_signed_events(
+    webhook_client: TestClient, coordinator: XpengDataUpdateCoordinator
+) -> None:
+    """A signed event replaces the stored vehicle."""
+    body = _body(vehicle_payload(LATER, 60))
+
+    assert await _post(webhook_client, body, sign_payload(SECRET, body)) == (
+        HTTPStatus.OK
+    )
+    assert _battery_level(coordinator) == 60
+
+
+async def test_handler_rejects_unsigned_events(
+    webhook_client: TestClient, coordinator: XpengDataUpdateCoordinator
+) -> None:
+    """Events without a valid signature are refused and not applied."""
+    body = _body(vehicle_payload(LATER, 60))
+
+    assert await _post(webhook_client, body, None) == HTTPStatus.UNAUTHORIZED
+    assert await _post(webhook_client, body, sign_payload("other", body)) == (
+        HTTPStatus.UNAUTHORIZED
+    )
+    assert _battery_level(coordinator) == 50
+
+
+async def test_handler_rejects_malformed_bodies(
+    webhook_client: TestClient, coordinator: XpengDataUpdateCoordinator
+) -> None:
+    """Signed bodies that are not a list of events are refused."""
+    for body in (b"not json", b'{"event": "user:vehicle:updated"}'):
+        assert await _post(webhook_client, body, sign_payload(SECRET, body)) == (
+            HTTPStatus.BAD_REQUEST
+        )
+    assert _battery_level(coordinator) == 50
+
+
+async def test_handler_ignores_out_of_order_events(
+    webhook_client: TestClient, coordinator: XpengDataUpdateCoordinator
+) -> None:
+    """A signed event older than the stored vehicle is accepted but not applied."""
+    body = _body(vehicle_payload("2025-01-01T11:55:00.000Z", 30))
+
+    assert await _post(webhook_client, body, sign_payload(SECRET, body)) == (
+        HTTPStatus.OK
+    )
+    assert _battery_level(coordinator) == 50